@@ -0,0 +1,139 @@
+import asyncio
+import importlib.util
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from metrics import count, span
+
+DEFAULT_RATE = 2.0
+DEFAULT_MAX_RATE = 8.0
+DEFAULT_CONCURRENCY = 4
+RETRY_STATUSES = (429, 503)
+
+
+def is_available():
+    # aiohttp là phụ thuộc tùy chọn và chỉ được import khi thật sự tải trang (nạp mất ~0.2s).
+    return importlib.util.find_spec("aiohttp") is not None
+
+
+def parse_retry_after(value, default):
+    # Retry-After có thể là số giây hoặc một mốc thời gian HTTP.
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class AdaptiveTokenBucket:
+    # Token bucket với tốc độ tự điều chỉnh: tăng dần sau mỗi lần thành công, giảm một nửa
+    # và tạm dừng toàn bộ các request tới host khi bị trả 429/503 (tôn trọng Retry-After).
+    def __init__(self, rate=DEFAULT_RATE, capacity=2, min_rate=0.2, max_rate=DEFAULT_MAX_RATE, increase=0.25):
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttled(self, retry_after):
+        now = time.monotonic()
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0
+        self._updated = now
+        self._blocked_until = max(self._blocked_until, now + retry_after)
+
+
+async def _fetch_one(session, bucket, url, retries):
+    import aiohttp
+
+    for attempt in range(retries + 1):
+        await bucket.acquire()
+        try:
+            # Thời gian chờ token bucket nằm ngoài span, span chỉ đo độ trễ của chính request.
+            with span("fetch", url=url, backend="http", attempt=attempt + 1) as fetch_span:
+                async with session.get(url) as response:
+                    fetch_span.set(status=response.status)
+                    if response.status in RETRY_STATUSES:
+                        wait = parse_retry_after(response.headers.get("Retry-After"), default=2.0 ** attempt)
+                        print(f"  {response.status} từ {urlparse(url).netloc}, chờ {wait:.1f}s rồi thử lại: {url}")
+                        count("http_retry", url=url, status=response.status, wait=wait)
+                        bucket.on_throttled(wait)
+                        continue
+                    if response.status != 200:
+                        print(f"  Lỗi HTTP {response.status}: {url}")
+                        return None
+                    html = await response.text()
+                    fetch_span.set(bytes=len(html))
+                    bucket.on_success()
+                    return html
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"  Lỗi kết nối (lần {attempt + 1}): {url} - {e}")
+            count("http_retry", url=url, error=type(e).__name__)
+            await asyncio.sleep(min(2.0 ** attempt, 30))
+    return None
+
+
+async def fetch_pages_async(urls, user_agent=None, rate=DEFAULT_RATE, max_rate=DEFAULT_MAX_RATE,
+                            max_concurrency=DEFAULT_CONCURRENCY, retries=3, timeout=30):
+    buckets = {}
+    for url in urls:
+        host = urlparse(url).netloc
+        if host not in buckets:
+            buckets[host] = AdaptiveTokenBucket(rate=rate, max_rate=max_rate)
+    import aiohttp
+
+    headers = {"User-Agent": user_agent} if user_agent else None
+    connector = aiohttp.TCPConnector(limit=max_concurrency)
+    async with aiohttp.ClientSession(connector=connector, headers=headers,
+                                     timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        pages = await asyncio.gather(*(_fetch_one(session, buckets[urlparse(url).netloc], url, retries) for url in urls))
+    return dict(zip(urls, pages))
+
+
+def fetch_pages(urls, needs_js=None, **kwargs):
+    # Tải song song các URL qua một pool kết nối HTTP. Trả về (pages, need_browser):
+    # pages là {url: html}, need_browser là các URL cần trình duyệt, do không tải được
+    # hoặc do needs_js(html) cho biết nội dung phải chạy JavaScript mới có.
+    if not urls:
+        return {}, []
+    if not is_available():
+        return {}, list(urls)
+    fetched = asyncio.run(fetch_pages_async(list(urls), **kwargs))
+    pages = {}
+    need_browser = []
+    for url, html in fetched.items():
+        if html is None or (needs_js is not None and needs_js(html)):
+            need_browser.append(url)
+        else:
+            pages[url] = html
+    return pages, need_browser
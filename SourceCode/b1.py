@@ -1,31 +1,32 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup, Comment
+# Selenium, webdriver_manager và bs4 được import trong hàm dùng chúng: chạy từ cache không cần tới.
 import pandas as pd
+import os
 import time
-import re
+from driver_pool import DriverPool
+from page_cache import cache_from_args
+from fbref_extract import extract_table_fast
+from changeset import diff_results, file_sha256, is_empty_changeset, write_changeset
+from stats_loader import RESULTS_CSV, RESULTS_TYPED, list_partitions, partition_dir, write_typed_results
+from column_schema import FBREF_TO_CSV_COLUMN_MAP, IDENTITY_SOURCES, OUTPUT_COLUMNS
+from metrics import count, metrics_from_args, span
+from crawl_plan import DEFAULT_COMPETITION, STAT_TABLES, current_season, plan_fbref
+from stage_args import scrape_parser
 
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/95.0.4638.54 Safari/537.36'
 
-URL_CONFIG = {
-    "standard": {"url": "https://fbref.com/en/comps/9/stats/Premier-League-Stats", "table_id": "stats_standard"},
-    "keepers": {"url": "https://fbref.com/en/comps/9/keepers/Premier-League-Stats", "table_id": "stats_keepers"},
-    "shooting": {"url": "https://fbref.com/en/comps/9/shooting/Premier-League-Stats", "table_id": "stats_shooting"},
-    "passing": {"url": "https://fbref.com/en/comps/9/passing/Premier-League-Stats", "table_id": "stats_passing"},
-    "passing_types": {"url": "https://fbref.com/en/comps/9/passing_types/Premier-League-Stats", "table_id": "stats_passing_types"},
-    "gca": {"url": "https://fbref.com/en/comps/9/gca/Premier-League-Stats", "table_id": "stats_gca"},
-    "defense": {"url": "https://fbref.com/en/comps/9/defense/Premier-League-Stats", "table_id": "stats_defense"},
-    "possession": {"url": "https://fbref.com/en/comps/9/possession/Premier-League-Stats", "table_id": "stats_possession"},
-    "misc": {"url": "https://fbref.com/en/comps/9/misc/Premier-League-Stats", "table_id": "stats_misc"},
-}
-
-def get_driver():
+# Giải mặc định, mùa hiện tại; các giải/mùa khác được lập kế hoạch bởi crawl_plan (--leagues/--seasons).
+URL_CONFIG = {task.category: {"url": task.url, "table_id": task.table_id}
+              for task in plan_fbref([DEFAULT_COMPETITION], [None])}
+
+def get_driver(headless=False):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
+
     options = webdriver.ChromeOptions()
     options.add_argument(f'user-agent={USER_AGENT}')
+    if headless:
+        options.add_argument('--headless=new')
     options.add_argument('--disable-gpu')
     options.add_argument('--no-sandbox')
     options.add_argument('--disable-dev-shm-usage')
@@ -42,20 +43,39 @@ def get_driver():
     return driver
 
 def get_page_source_with_selenium(url, driver, table_id_hint):
-    driver.get(url)
-    try:
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, f"div#div_{table_id_hint} table, table#{table_id_hint}"))
-        )
-    except Exception as e:
-        pass
-    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-    time.sleep(0.5)
-    driver.execute_script("window.scrollTo(0, 0);")
-    time.sleep(0.5)
-    return driver.page_source
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    with span("fetch", url=url, backend="selenium") as fetch_span:
+        driver.get(url)
+        try:
+            WebDriverWait(driver, 20).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, f"div#div_{table_id_hint} table, table#{table_id_hint}"))
+            )
+        except Exception as e:
+            count("wait_timeout", url=url)
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        time.sleep(0.5)
+        driver.execute_script("window.scrollTo(0, 0);")
+        time.sleep(0.5)
+        page_source = driver.page_source
+        fetch_span.set(bytes=len(page_source))
+    return page_source
 
 def extract_table_from_html_fbref(html_content, table_id):
+    with span("parse", table=table_id, bytes=len(html_content)) as parse_span:
+        df = extract_table_fast(html_content, table_id)
+        parser = "fast"
+        if df is None:
+            df = extract_table_from_html_fbref_bs4(html_content, table_id)
+            parser = "bs4"
+        parse_span.set(rows=len(df), parser=parser)
+    return df
+
+def extract_table_from_html_fbref_bs4(html_content, table_id):
+    from bs4 import BeautifulSoup, Comment
+
     soup = BeautifulSoup(html_content, 'html.parser')
     table_html = None
     comment = soup.find(string=lambda text: isinstance(text, Comment) and f'id="{table_id}"' in text)
@@ -85,152 +105,196 @@ def extract_table_from_html_fbref(html_content, table_id):
     df = pd.DataFrame(data_rows)
     return df
 
-FBREF_TO_CSV_COLUMN_MAP = {
-    'player': 'Player', 'nationality': 'Nation', 'team': 'Squad', 'position': 'Position',
-    'age': 'Age', 'minutes': 'Minutes', 'games': 'Matches played', 'games_starts': 'Starts',
-    'goals': 'Goals', 'assists': 'Assists', 'cards_yellow': 'Yellow cards', 'cards_red': 'Red cards',
-    'xg': 'Expected: xG', 'xg_assist': 'Expected: xAG',
-    'progressive_carries': 'Progression: PrgC', 'progressive_passes': 'Progression: PrgP', 'progressive_passes_received': 'Progression: PrgR',
-    'goals_per90': 'Per 90: Gls', 'assists_per90': 'Per 90: Ast', 'xg_per90': 'Per 90: xG',
-    'gk_xg_against_per90': 'Per 90: xGA',
-    'gk_goals_against_per90': 'Performance: GA90', 'gk_save_pct': 'Performance: Save%', 'gk_clean_sheets_pct': 'Performance: CS%', 'gk_pens_save_pct': 'Penalty Kicks: Save%',
-    'shots_on_target_pct': 'Standard: SoT%', 'shots_on_target_per90': 'Standard: SoT/90', 'goals_per_shot': 'Standard: G/Sh', 'average_shot_distance': 'Standard: Dist',
-    'passes_completed': 'Total: Cmp', 'passes_pct': 'Total: Cmp%', 'passes_progressive_distance': 'Total: TotDist',
-    'passes_pct_short': 'Short: Cmp%', 'passes_pct_medium': 'Medium: Cmp%', 'passes_pct_long': 'Long: Cmp%',
-    'assisted_shots': 'Expected: KP', 'passes_into_final_third': 'Expected: 1/3', 'passes_into_penalty_area': 'Expected: PPA', 'crosses_into_penalty_area': 'Expected: CrsPA',
-    'sca': 'SCA', 'sca_per90': 'SCA90', 'gca': 'GCA', 'gca_per90': 'GCA90',
-    'tackles': 'Tackles: Tkl', 'tackles_won': 'Tackles: TklW',
-    'challenges_attempted': 'Challenges: Att', 'challenges_lost': 'Challenges: Lost',
-    'blocks': 'Blocks: Blocks', 'blocked_shots': 'Blocks: Sh', 'blocked_passes': 'Blocks: Pass', 'interceptions': 'Blocks: Int',
-    'touches': 'Touches: Touches', 'touches_def_pen_area': 'Touches: Def Pen', 'touches_def_3rd': 'Touches: Def 3rd',
-    'touches_mid_3rd': 'Touches: Mid 3rd', 'touches_att_3rd': 'Touches Att 3rd', 'touches_att_pen_area': 'Touches Att Pen',
-    'take_ons_attempted': 'TakeOns: Att', 'take_ons_successful_pct': 'TakeOns: Succ%', 'take_ons_tackled_pct': 'TakeOns: Tkld%',
-    'carries': 'Carries: Carries', 'carries_progressive_distance': 'Carries: PrgDist',
-    'carries_into_final_third': 'Carries: 1/3', 'carries_into_penalty_area': 'Carries: CPA',
-    'carries_miscontrols': 'Carries: Mis', 'carries_dispossessed': 'Carries: Dis',
-    'passes_received': 'Receiving: Rec', 'fouls': 'Performance: Fls', 'fouled': 'Performance: Fld', 'offsides': 'Performance: Off', 'crosses': 'Performance: Crs', 'ball_recoveries': 'Performance: Recov',
-    'aerials_won': 'Aerials: Won', 'aerials_lost': 'Aerials: Lost', 'aerials_won_pct': 'Aerials: Won%'
-}
+IDENTITY_COLS_FROM_STANDARD = IDENTITY_SOURCES
 
-if __name__ == "__main__":
-    driver = None
-    all_dataframes = {}
-    try:
-        driver = get_driver()
-        for stat_category, config in URL_CONFIG.items():
-            url = config["url"]
-            table_id = config["table_id"]
-            html_source = get_page_source_with_selenium(url, driver, table_id)
-            df_table = extract_table_from_html_fbref(html_source, table_id)
-            if not df_table.empty:
-                all_dataframes[stat_category] = df_table
-            time.sleep(1)
-    finally:
-        if driver:
-            driver.quit()
-    if not all_dataframes:
-        print("Không trích xuất được dữ liệu nào. Kết thúc chương trình.") 
-        exit()
-    final_df = all_dataframes.get("standard", pd.DataFrame()).copy()
-    if final_df.empty:
-        print("Bảng 'standard' không có dữ liệu hoặc không được trích xuất, không thể tiếp tục.") 
-        exit()
-    if 'player' not in final_df.columns:
-        print("Cột 'player' (tên cầu thủ gốc) không tồn tại trong bảng 'standard'. Kiểm tra lại quá trình trích xuất.")
-        exit()
-    
-    identity_cols_from_standard = ['nationality', 'position', 'team', 'age', 'games', 'games_starts', 'minutes']
+def minutes_to_numeric(series):
+    return pd.to_numeric(series.astype(str).str.replace(',', '', regex=False), errors='coerce')
+
+def merge_category_tables(all_dataframes):
+    # Mỗi bảng chỉ được đánh index theo 'player' một lần rồi ghép tất cả bằng một lần concat,
+    # thay cho chuỗi pd.merge lặp lại (mỗi lần merge đều sao chép toàn bộ bảng đang lớn dần).
+    standard_df = all_dataframes["standard"]
+    if 'minutes' in standard_df.columns:
+        sort_keys = pd.DataFrame({'player': standard_df['player'], 'minutes': minutes_to_numeric(standard_df['minutes'])})
+        order = sort_keys.sort_values(['player', 'minutes'], ascending=[True, False], kind='stable', na_position='last').index
+        standard_df = standard_df.loc[order]
+    standard_df = standard_df.drop_duplicates(subset=['player'], keep='first').set_index('player')
+
+    frames = [standard_df]
+    seen_cols = set(standard_df.columns)
     for stat_category, df_to_merge in all_dataframes.items():
-        if stat_category == "standard":
+        if stat_category == "standard" or df_to_merge.empty or 'player' not in df_to_merge.columns:
             continue
-        if df_to_merge.empty:
+        new_cols = [col for col in df_to_merge.columns
+                    if col in FBREF_TO_CSV_COLUMN_MAP and col != 'player'
+                    and col not in IDENTITY_COLS_FROM_STANDARD and col not in seen_cols]
+        if not new_cols:
             continue
-        if 'player' not in df_to_merge.columns:
-            continue  
-        cols_to_bring_from_secondary_table = ['player']
-        for col in df_to_merge.columns:
-            if col != 'player' and col not in identity_cols_from_standard:
-                cols_to_bring_from_secondary_table.append(col)
-        seen_merge_cols = set()
-        unique_cols_to_bring = [x for x in cols_to_bring_from_secondary_table if not (x in seen_merge_cols or seen_merge_cols.add(x))]
-        if not unique_cols_to_bring or 'player' not in unique_cols_to_bring :
-             continue
-        df_to_merge_subset = df_to_merge[unique_cols_to_bring].copy()
-        final_df = pd.merge(final_df, df_to_merge_subset, on="player", how="left", suffixes=('', f'_{stat_category}_dup'))
-    
-    raw_minutes_col = 'minutes'
-    if raw_minutes_col in final_df.columns and 'player' in final_df.columns:
-        final_df['temp_minutes_numeric'] = final_df[raw_minutes_col].astype(str).str.replace(',', '', regex=False)
-        final_df['temp_minutes_numeric'] = pd.to_numeric(final_df['temp_minutes_numeric'], errors='coerce')
-        final_df.sort_values(['player', 'temp_minutes_numeric'], ascending=[True, False], inplace=True)
-        final_df.drop_duplicates(subset=['player'], keep='first', inplace=True)
-        final_df.drop(columns=['temp_minutes_numeric'], inplace=True)
-    elif 'player' in final_df.columns:
-        final_df.drop_duplicates(subset=['player'], keep='first', inplace=True)  
-    
-    cols_to_rename = {fbref_col: csv_col for fbref_col, csv_col in FBREF_TO_CSV_COLUMN_MAP.items() if fbref_col in final_df.columns}
-    final_df.rename(columns=cols_to_rename, inplace=True)
-    if 'Nation' in final_df.columns:
-        def extract_nation_code(nation_text):
-            if isinstance(nation_text, str):
-                match = re.search(r'([A-Z]+)$', nation_text)
-                if match: return match.group(1)
-                if len(nation_text) == 3 and nation_text.isupper(): return nation_text
-            return nation_text 
-        final_df['Nation'] = final_df['Nation'].apply(extract_nation_code)
-
-    if 'Age' in final_df.columns:
-        final_df['Age'] = final_df['Age'].astype(str).apply(
-            lambda x: x.split('-')[0] if isinstance(x, str) and '-' in x else x
-        )
+        seen_cols.update(new_cols)
+        if 'team' in df_to_merge.columns and 'team' in standard_df.columns:
+            # Cầu thủ chuyển đội giữa mùa có nhiều dòng: ưu tiên dòng cùng đội với dòng đã giữ ở bảng 'standard'.
+            same_team = df_to_merge['team'].eq(df_to_merge['player'].map(standard_df['team']))
+            df_to_merge = df_to_merge.loc[same_team.sort_values(ascending=False, kind='stable').index]
+        df_to_merge = df_to_merge.drop_duplicates(subset=['player'], keep='first').set_index('player')
+        frames.append(df_to_merge[new_cols].reindex(standard_df.index))
+    final_df = pd.concat(frames, axis=1)
+    final_df.index.name = 'player'
+    return final_df.reset_index()
+
+def build_results_table(final_df):
+    final_df = final_df.rename(columns={fbref_col: csv_col for fbref_col, csv_col in FBREF_TO_CSV_COLUMN_MAP.items() if fbref_col in final_df.columns})
+    if 'Nation' in final_df.columns and pd.api.types.is_string_dtype(final_df['Nation']):
+        nation = final_df['Nation']
+        final_df['Nation'] = nation.str.extract(r'([A-Z]+)$', expand=False).fillna(nation)
+    if 'Age' in final_df.columns and pd.api.types.is_string_dtype(final_df['Age']):
+        final_df['Age'] = final_df['Age'].str.split('-', n=1).str[0]
     if 'Minutes' in final_df.columns:
-        final_df['Minutes_temp_filter'] = final_df['Minutes'].astype(str).str.replace(',', '', regex=False)
-        final_df['Minutes_temp_filter'] = pd.to_numeric(final_df['Minutes_temp_filter'], errors='coerce')
-        final_df.dropna(subset=['Minutes_temp_filter'], inplace=True)
-        final_df = final_df[final_df['Minutes_temp_filter'] > 90].copy()
-        final_df.drop(columns=['Minutes_temp_filter'], inplace=True)
+        final_df = final_df[minutes_to_numeric(final_df['Minutes']) > 90]
     if 'Player' in final_df.columns and not final_df.empty:
-        try:
-            final_df['FirstNameTemp'] = final_df['Player'].astype(str).apply(
-                lambda x: x.split(' ')[0] if x and ' ' in x else (x if x else "N/A_Player")
-            )
-            final_df.sort_values(by='FirstNameTemp', ascending=True, inplace=True)
-            final_df.drop(columns=['FirstNameTemp'], inplace=True)
-        except Exception as e:
-            pass
-        
-    output_column_order_from_map = ['Player'] + [col for col in FBREF_TO_CSV_COLUMN_MAP.values() if col != 'Player']
-    seen_cols_output = set()
-    final_ordered_columns = []
-    for col in output_column_order_from_map:
-        if col not in seen_cols_output:
-            final_ordered_columns.append(col)
-            seen_cols_output.add(col)
-            
-    results_df_cols_dict = {}
-    df_index = final_df.index if not final_df.empty else None
-    for col_name in final_ordered_columns:
-        if col_name in final_df.columns:
-            results_df_cols_dict[col_name] = final_df[col_name]
-        else:
-            results_df_cols_dict[col_name] = pd.Series(["N/a"] * len(final_df), name=col_name, index=df_index) if not final_df.empty else "N/a"
-            
-    if not final_df.empty or any(isinstance(v, pd.Series) for v in results_df_cols_dict.values()):
-        results_df = pd.DataFrame(results_df_cols_dict)
-        existing_ordered_columns = [col for col in final_ordered_columns if col in results_df.columns]
-        if existing_ordered_columns:
-             results_df = results_df[existing_ordered_columns]
-    else:
-        results_df = pd.DataFrame(columns=final_ordered_columns)
-        if all(isinstance(v, str) and v == "N/a" for v in results_df_cols_dict.values()) and results_df_cols_dict:
-             temp_data = {col: ["N/a"] for col in final_ordered_columns}
-             results_df = pd.DataFrame(temp_data)
+        first_names = final_df['Player'].astype(str).str.split(' ', n=1).str[0]
+        final_df = final_df.loc[first_names.sort_values(kind='stable').index]
 
-    results_df.fillna("N/a", inplace=True)
+    results_df = final_df.reindex(columns=OUTPUT_COLUMNS).fillna("N/a")
     for col in results_df.columns:
-        results_df[col] = results_df[col].apply(lambda x: "N/a" if str(x).strip() == "" else x)
+        if pd.api.types.is_string_dtype(results_df[col]):
+            values = results_df[col].astype(str)
+            results_df[col] = values.mask(values.str.strip().eq(''), "N/a")
+    return results_df
+
+def collect_tables(tasks, page_cache, args):
+    # tasks: {key: (url, table_id)}, trả về {key: DataFrame}. Mọi tác vụ (của mọi giải, mùa, bảng) dùng chung
+    # một DriverPool nên số trình duyệt mở đồng thời luôn bị giới hạn bởi --workers, và HostThrottle
+    # giữ khoảng cách giữa các lần tải cùng host cho toàn bộ lượt cào.
+    tables = {}
+    to_fetch = {}
+    for key, (url, table_id) in tasks.items():
+        html_source = page_cache.get(url)
+        if html_source is None:
+            count("cache_miss")
+            to_fetch[key] = url
+            continue
+        count("cache_hit")
+        df_table = extract_table_from_html_fbref(html_source, table_id)
+        if not df_table.empty:
+            tables[key] = df_table
+        else:
+            to_fetch[key] = url
+    if to_fetch and args.offline:
+        print(f"Chế độ offline: {len(to_fetch)} bảng không có trong cache, bỏ qua.")
+        to_fetch = {}
+    if to_fetch:
+        with DriverPool(lambda: get_driver(headless=True), max_workers=args.workers, per_host_delay=args.host_delay) as pool:
+            fetch_page = lambda driver, key, url: get_page_source_with_selenium(url, driver, tasks[key][1])
+            for key, html_source in pool.fetch_all(to_fetch, fetch_page):
+                if not html_source:
+                    continue
+                df_table = extract_table_from_html_fbref(html_source, tasks[key][1])
+                if not df_table.empty:
+                    tables[key] = df_table
+                    page_cache.put(to_fetch[key], html_source)
+    return tables
+
+def results_from_tables(all_dataframes, label="results.csv"):
+    # Ghép các bảng của một giải/mùa thành bảng kết quả; None (kèm thông báo) nếu thiếu bảng 'standard'.
+    all_dataframes = {stat_category: all_dataframes[stat_category] for stat_category in STAT_TABLES if stat_category in all_dataframes}
+    if not all_dataframes:
+        print(f"Không trích xuất được dữ liệu nào cho {label}.")
+        return None
+    final_df = all_dataframes.get("standard", pd.DataFrame())
+    if final_df.empty:
+        print(f"Bảng 'standard' của {label} không có dữ liệu hoặc không được trích xuất, không thể tiếp tục.")
+        return None
+    if 'player' not in final_df.columns:
+        print("Cột 'player' (tên cầu thủ gốc) không tồn tại trong bảng 'standard'. Kiểm tra lại quá trình trích xuất.")
+        return None
+    with span("merge", tables=len(all_dataframes)) as merge_span:
+        merged_df = merge_category_tables(all_dataframes)
+        merge_span.set(rows=len(merged_df))
+    with span("build_results") as build_span:
+        results_df = build_results_table(merged_df)
+        build_span.set(rows=len(results_df))
+    return results_df
+
+def crawl_partitions(leagues, seasons, page_cache, args):
+    # Một lượt cào cho mọi cặp (giải, mùa); mỗi cặp được ghi vào phân vùng riêng trong --data-root.
+    # Mùa đã kết thúc không còn thay đổi: phân vùng đã có sẵn được giữ nguyên (trừ khi --refresh-partitions),
+    # nên thêm một giải hoặc một mùa chỉ cào đúng phần mới.
+    this_season = current_season()
+    existing = {(league, season) for league, season, _ in list_partitions(args.data_root, leagues, seasons)}
+    pending = []
+    for league in leagues:
+        for season in seasons:
+            if args.refresh_partitions or season == this_season or (league, season) not in existing:
+                pending.append((league, season))
+            else:
+                print(f"Giữ nguyên phân vùng {league}/{season} (mùa đã kết thúc, đã có dữ liệu).")
+    tasks = {}
+    for league, season in pending:
+        for task in plan_fbref([league], [season]):
+            tasks[(league, season, task.category)] = (task.url, task.table_id)
+    if not pending:
+        print("Mọi phân vùng đã có dữ liệu, không cần cào.")
+        return 0
+    print(f"Kế hoạch cào: {len(pending)} phân vùng, {len(tasks)} trang.")
+    tables_by_partition = {}
+    for (league, season, category), df_table in collect_tables(tasks, page_cache, args).items():
+        tables_by_partition.setdefault((league, season), {})[category] = df_table
+    written = 0
+    for league, season in pending:
+        results_df = results_from_tables(tables_by_partition.get((league, season), {}), label=f"{league}/{season}")
+        if results_df is None:
+            continue
+        output_dir = partition_dir(league, season, args.data_root)
+        os.makedirs(output_dir, exist_ok=True)
+        with span("write_results", rows=len(results_df), league=league, season=season):
+            results_df.to_csv(os.path.join(output_dir, RESULTS_CSV), index=False, encoding='utf-8-sig')
+            write_typed_results(results_df, os.path.join(output_dir, RESULTS_TYPED))
+        print(f"  {league}/{season}: {len(results_df)} cầu thủ -> {output_dir}")
+        written += 1
+    if written:
+        print(f"✅ Lưu thành công dữ liệu ({written}/{len(pending)} phân vùng)")
+    return written
+
+def parse_args(argv=None, prog=None):
+    return scrape_parser(prog).parse_args(argv)
+
+def main(argv=None, prog=None):
+    args = parse_args(argv, prog)
+    metrics_from_args(args)
+    page_cache = cache_from_args(args)
+    if args.leagues is not None or args.seasons is not None:
+        leagues = list(dict.fromkeys(args.leagues or [DEFAULT_COMPETITION]))
+        seasons = list(dict.fromkeys(args.seasons or [current_season()]))
+        crawl_partitions(leagues, seasons, page_cache, args)
+        return
+    tasks = {stat_category: (config["url"], config["table_id"]) for stat_category, config in URL_CONFIG.items()}
+    results_df = results_from_tables(collect_tables(tasks, page_cache, args))
+    if results_df is None:
+        return
+    changeset = None
+    if args.incremental and os.path.exists("results.csv"):
+        previous_df = pd.read_csv("results.csv", dtype=str, keep_default_na=False, encoding='utf-8-sig')
+        base_sha256 = file_sha256("results.csv")
+        try:
+            changeset = diff_results(previous_df, results_df)
+        except ValueError as e:
+            # Không có changeset: bước sau sẽ tính lại toàn bộ thay vì dùng kết quả cũ.
+            print(f"Không tạo được changeset: {e}")
+        if changeset is not None and is_empty_changeset(changeset):
+            write_changeset(changeset, base_sha256, base_sha256)
+            print("Không có cầu thủ nào thay đổi, giữ nguyên results.csv.")
+            return
+        if changeset is not None:
+            print(f"Thay đổi: {len(changeset['added'])} cầu thủ mới, {len(changeset['changed'])} cập nhật, {len(changeset['removed'])} bị loại.")
     try:
-        results_df.to_csv("results.csv", index=False, encoding='utf-8-sig')
+        with span("write_results", rows=len(results_df)):
+            results_df.to_csv("results.csv", index=False, encoding='utf-8-sig')
+            write_typed_results(results_df)
+        if changeset is not None:
+            write_changeset(changeset, base_sha256, file_sha256("results.csv"))
         print("✅ Lưu thành công dữ liệu")
     except Exception as e:
         print(f"❌ Lỗi khi lưu file: {e}")
+
+if __name__ == "__main__":
+    main()
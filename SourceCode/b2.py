@@ -1,34 +1,144 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import os
+from changeset import file_sha256, usable_changeset
+from stats_loader import float64_values, load_selected_results
+from crawl_plan import partitions_from_args
+from column_schema import columns_for, stat_columns, text_columns
+from metrics import metrics_from_args, span
+from histogram_render import build_histogram_jobs, render_histograms
+from stage_args import stats_parser
+from streaming_stats import (DEFAULT_CHUNKSIZE, DEFAULT_EXACT_LIMIT, DEFAULT_RELATIVE_ACCURACY, GroupStatistics,
+                             aggregate_sources, sources_from_partitions)
+
+SOURCE_HASH_FILE = "bai2_results/source.sha256"
 
 
 def identify_statistic_columns(df, exclude_cols=None):
+    # Cột thống kê lấy từ COLUMN_SCHEMA; chỉ giữ những cột có dữ liệu cho hơn một nửa số cầu thủ.
     if exclude_cols is None:
-        exclude_cols = ['Player', 'Nation', 'Team', 'Squad', 'Position']
-    potential_stat_cols = []
-    for col in df.columns:
-        if col not in exclude_cols:
-            try:
-                numeric_col = pd.to_numeric(df[col].astype(str).str.replace('%', '', regex=False), errors='coerce')
-                if numeric_col.notna().sum() > len(df) / 2:
-                    potential_stat_cols.append(col)
-            except:
-                continue
-    return potential_stat_cols
-
-def clean_numeric_column(series):
-    series_str = series.astype(str).str.replace('%', '', regex=False).str.strip()
-    series_str.replace(['', 'N/a', 'NaN', 'nan', 'None'], np.nan, inplace=True)
-    return pd.to_numeric(series_str, errors='coerce')
-
-def main_exercise_2():
+        exclude_cols = text_columns()
+    return [col for col in stat_columns()
+            if col in df.columns and col not in exclude_cols and df[col].notna().sum() > len(df) / 2]
+
+def read_processed_sha256(path=SOURCE_HASH_FILE):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def forget_processed_sha256(path=SOURCE_HASH_FILE):
+    # results2.csv sắp được ghi lại: bỏ hash cũ để --incremental không dùng lại các dòng không khớp với results.csv.
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def load_reusable_team_rows(stat_cols, results2_path="bai2_results/results2.csv"):
+    # Với --incremental: giữ lại dòng của các đội không có cầu thủ nào thay đổi theo changeset của Bài 1.
+    changeset = usable_changeset("results.csv", read_processed_sha256())
+    if changeset is None or not os.path.exists(results2_path):
+        return {}
+    df_previous = pd.read_csv(results2_path, encoding="utf-8-sig")
+    expected_columns = ["Group"] + [f"{measure} of {stat}" for stat in stat_cols for measure in ("Median", "Mean", "Std")]
+    if list(df_previous.columns) != expected_columns:
+        return {}
+    changed_teams = set(changeset["teams"])
+    return {row["Group"]: row for row in df_previous.to_dict("records")
+            if row["Group"] != "all" and row["Group"] not in changed_teams}
+
+MEASURES = [("median", "Median"), ("mean", "Mean"), ("std", "Std")]
+
+def compute_group_statistics(df, stat_cols, group_cols, include_all=True, overall_from=None):
+    # Một lần groupby().agg cho cả median/mean/std của mọi chỉ số và mọi nhóm.
+    # Dòng "all" (tính trên overall_from, mặc định là df) đứng đầu, sau đó các nhóm theo thứ tự xuất hiện.
+    if isinstance(group_cols, str):
+        group_cols = [group_cols]
+    values = float64_values(df, stat_cols)
+    funcs = [func for func, _ in MEASURES]
+    grouped = values.groupby([df[col] for col in group_cols], sort=False, observed=True).agg(funcs)
+    if len(group_cols) > 1:
+        grouped.index = [" | ".join(map(str, key)) for key in grouped.index]
+    frames = [grouped]
+    if include_all:
+        overall_values = values if overall_from is None else float64_values(overall_from, stat_cols)
+        overall = overall_values.agg(funcs).unstack().to_frame().T
+        overall.index = ["all"]
+        frames.insert(0, overall)
+    result = pd.concat(frames)
+    labels = dict(MEASURES)
+    result.columns = [f"{labels[func]} of {stat}" for stat, func in result.columns]
+    result = result.round(2)
+    result.index.name = "Group"
+    return result.reset_index()
+
+def top_bottom_n(df, stat_cols, n=3, group_cols=None, label_col="Player"):
+    # Trả về bảng dạng dài: (nhóm..., Statistic, Direction, Rank, label_col, Value).
+    # Không nhóm: np.argpartition trên cả ma trận chỉ số một lần; có nhóm: một lần sort trên dữ liệu dạng dài.
+    # Khi bằng điểm, cầu thủ xuất hiện trước trong bảng được xếp trước.
+    if group_cols:
+        return _top_bottom_n_grouped(df, stat_cols, n, list(group_cols), label_col)
+    values = float64_values(df, stat_cols).to_numpy()
+    labels = df[label_col].to_numpy()
+    n_rows = len(values)
+    k = min(n, n_rows)
+    records = []
+    if k == 0:
+        return pd.DataFrame(records, columns=["Statistic", "Direction", "Rank", label_col, "Value"])
+    missing = np.isnan(values)
+    for direction, sign in (("top", -1.0), ("bottom", 1.0)):
+        keys = np.where(missing, np.inf, sign * values)
+        kth = np.partition(keys, k - 1, axis=0)[k - 1]
+        for j, stat in enumerate(stat_cols):
+            candidates = np.flatnonzero((keys[:, j] <= kth[j]) & ~missing[:, j])
+            chosen = candidates[np.lexsort((candidates, keys[candidates, j]))][:k]
+            records.extend((stat, direction, rank, labels[i], values[i, j]) for rank, i in enumerate(chosen, 1))
+    return pd.DataFrame(records, columns=["Statistic", "Direction", "Rank", label_col, "Value"])
+
+def _top_bottom_n_grouped(df, stat_cols, n, group_cols, label_col):
+    long_df = pd.concat([df[group_cols + [label_col]], float64_values(df, stat_cols)], axis=1).reset_index(drop=True)
+    long_df["_row"] = long_df.index
+    long_df = long_df.melt(id_vars=group_cols + [label_col, "_row"], value_vars=stat_cols,
+                           var_name="Statistic", value_name="Value").dropna(subset=["Value"])
+    long_df["Value"] = long_df["Value"].astype("float64")
+    frames = []
+    for direction, ascending in (("top", False), ("bottom", True)):
+        ordered = long_df.sort_values(group_cols + ["Statistic", "Value", "_row"],
+                                      ascending=[True] * len(group_cols) + [True, ascending, True], kind="stable")
+        picked = ordered.groupby(group_cols + ["Statistic"], sort=False).head(n).copy()
+        picked["Direction"] = direction
+        picked["Rank"] = picked.groupby(group_cols + ["Statistic"], sort=False).cumcount() + 1
+        frames.append(picked)
+    result = pd.concat(frames, ignore_index=True)
+    return result[group_cols + ["Statistic", "Direction", "Rank", label_col, "Value"]]
+
+def format_top_n_report(top_df, stat_cols, n, label_col="Player"):
+    lines = []
+    grouped = {key: part for key, part in top_df.groupby(["Statistic", "Direction"], sort=False)}
+    for stat in stat_cols:
+        lines.append(f"\n--- Chỉ số: {stat} ---\n")
+        if (stat, "top") not in grouped:
+            lines.append("Không có đủ dữ liệu cầu thủ hợp lệ.\n")
+            continue
+        for direction, title in (("top", f"\nTop {n} Cao nhất:\n"), ("bottom", f"Top {n} Thấp nhất:\n")):
+            part = grouped[(stat, direction)]
+            lines.append(title)
+            lines.extend(f"  {label}: {value:.2f}\n" for label, value in zip(part[label_col], part["Value"]))
+    return "".join(lines)
+
+def main_exercise_2(incremental=False, top_n=3, top_by=None, team_histograms=False, plot_workers=None, partitions=None,
+                    plots=True, compact=False):
     
     # --- 0. Đọc dữ liệu từ Bài 1 ---
     
     try:
-        df = pd.read_csv("results.csv", na_values=["N/a", "NaN", "", " "])
+        with span("load_results") as load_span:
+            # Cột nhóm của --top-by (ví dụ Nation) không nằm trong columns_for('stats') nên được đọc thêm.
+            columns = columns_for('stats')
+            columns += [col for col in top_by or [] if col not in columns]
+            df = load_selected_results(columns=columns, partitions=partitions, compact=compact)
+            load_span.set(rows=len(df))
     except FileNotFoundError:
         print("Lỗi: File 'results.csv' không tìm thấy.")
         return
@@ -39,6 +149,17 @@ def main_exercise_2():
     if df.empty:
         print("Lỗi: File 'results.csv' rỗng.")
         return
+    if partitions is not None:
+        # Changeset của Bài 1 chỉ áp dụng cho results.csv, không cho dữ liệu phân vùng.
+        incremental = False
+        if df['Season'].nunique() > 1 and 'Squad' in df.columns:
+            # Cùng một đội ở nhiều mùa được thống kê riêng từng mùa.
+            df['Team'] = df['Squad'].astype(str) + " (" + df['Season'].astype(str) + ")"
+    missing_top_by = [col for col in top_by or [] if col not in df.columns]
+    if missing_top_by:
+        print(f"Lỗi: --top-by: không có cột {', '.join(map(repr, missing_top_by))} trong results.csv "
+              f"(ví dụ có thể dùng: Squad, Position, Nation).")
+        return
     team_column_name = 'Team' if 'Team' in df.columns else 'Squad'
     if team_column_name not in df.columns:
         print(f"Lỗi: Không tìm thấy cột đội bóng trong results.csv.")
@@ -48,63 +169,41 @@ def main_exercise_2():
     if not stat_cols_to_analyze:
         print("Không xác định được cột thống kê nào để phân tích.")
         return
-    for col in stat_cols_to_analyze:
-        df[col] = clean_numeric_column(df[col])
 
     if not os.path.exists("bai2_results"):
         os.makedirs("bai2_results")
     if not os.path.exists("bai2_results/histograms"):
         os.makedirs("bai2_results/histograms")
 
-    # --- 1. Top 3 cầu thủ Cao nhất/Thấp nhất cho mỗi chỉ số ---
+    # --- 1. Top N cầu thủ Cao nhất/Thấp nhất cho mỗi chỉ số ---
     
     try:
+        with span("top_n", n=top_n, stats=len(stat_cols_to_analyze)):
+            top_df = top_bottom_n(df, stat_cols_to_analyze, n=top_n)
         with open("bai2_results/top_3.txt", "w", encoding="utf-8") as f_top3:
-            for stat in stat_cols_to_analyze:
-                df_stat_cleaned = df[['Player', stat]].copy() 
-                df_stat_cleaned.dropna(subset=[stat], inplace=True) 
-
-                if df_stat_cleaned.empty:
-                    f_top3.write(f"\n--- Chỉ số: {stat} ---\n")
-                    f_top3.write("Không có đủ dữ liệu cầu thủ hợp lệ.\n")
-                    continue
-                df_sorted_highest = df_stat_cleaned.sort_values(by=stat, ascending=False)
-                df_sorted_lowest = df_stat_cleaned.sort_values(by=stat, ascending=True)
-
-                f_top3.write(f"\n--- Chỉ số: {stat} ---\n")
-                f_top3.write("\nTop 3 Cao nhất:\n")
-                for i, row in df_sorted_highest.head(3).iterrows():
-                    f_top3.write(f"  {row['Player']}: {row[stat]:.2f}\n")
-                
-                f_top3.write("Top 3 Thấp nhất:\n")
-                for i, row in df_sorted_lowest.head(3).iterrows():
-                    f_top3.write(f"  {row['Player']}: {row[stat]:.2f}\n")
+            f_top3.write(format_top_n_report(top_df, stat_cols_to_analyze, top_n))
         print("Hoàn thành: top_3.txt đã được tạo.")
+        if top_by:
+            top_by_df = top_bottom_n(df, stat_cols_to_analyze, n=top_n, group_cols=top_by)
+            top_by_path = f"bai2_results/top_{top_n}_by_{'_'.join(top_by)}.csv"
+            top_by_df.to_csv(top_by_path, index=False, encoding="utf-8-sig")
+            print(f"Hoàn thành: {top_by_path} đã được tạo.")
     except Exception as e:
         print(f"Lỗi khi tạo file top_3.txt: {e}")
 
     # --- 2. Median, Mean, Standard Deviation (lưu vào results2.csv) ---
     
-    results2_data = []
-    all_players_stats = {"Group": "all"}
-    for stat in stat_cols_to_analyze:
-        all_players_stats[f"Median of {stat}"] = round (df[stat].median(), 2)
-        all_players_stats[f"Mean of {stat}"] = round (df[stat].mean(), 2)
-        all_players_stats[f"Std of {stat}"] = round (df[stat].std(), 2)
-    results2_data.append(all_players_stats)
-
-    teams = df[team_column_name].unique()
-    for team in teams:
-        if pd.isna(team): continue
-        df_team = df[df[team_column_name] == team]
-        team_stats = {"Group": team}
-        for stat in stat_cols_to_analyze:
-            team_stats[f"Median of {stat}"] = round (df_team[stat].median(), 2)
-            team_stats[f"Mean of {stat}"] = round (df_team[stat].mean(), 2)
-            team_stats[f"Std of {stat}"] = round (df_team[stat].std(), 2)
-        results2_data.append(team_stats)
-
-    df_results2 = pd.DataFrame(results2_data)
+    reusable_team_rows = load_reusable_team_rows(stat_cols_to_analyze) if incremental else {}
+    df_to_compute = df[~df[team_column_name].isin(list(reusable_team_rows))] if reusable_team_rows else df
+    with span("group_stats", rows=len(df_to_compute), reused_teams=len(reusable_team_rows)):
+        df_results2 = compute_group_statistics(df_to_compute, stat_cols_to_analyze, team_column_name, overall_from=df)
+    if reusable_team_rows:
+        rows_by_group = {row["Group"]: row for row in df_results2.to_dict("records")}
+        rows_by_group.update(reusable_team_rows)
+        group_order = ["all"] + [team for team in df[team_column_name].unique() if not pd.isna(team)]
+        df_results2 = pd.DataFrame([rows_by_group[group] for group in group_order], columns=df_results2.columns)
+    # Hash chỉ được ghi lại ở cuối khi results2.csv được tính từ results.csv (không phải dữ liệu phân vùng).
+    forget_processed_sha256()
     try:
         df_results2.to_csv("bai2_results/results2.csv", index=False, encoding="utf-8-sig")
         print("Hoàn thành: results2.csv đã được tạo.")
@@ -113,33 +212,25 @@ def main_exercise_2():
 
     # --- 3. Vẽ Biểu đồ Histogram ---
     
-    for stat in stat_cols_to_analyze:
-        plt.figure(figsize=(10, 6))
-        df[stat].dropna().plot(kind='hist', bins=20, alpha=0.7, label='All Players', density=True)
-        plt.title(f"Phân bổ của chỉ số: {stat} (Toàn bộ cầu thủ)")
-        plt.xlabel(stat)
-        plt.ylabel("Tần suất (chuẩn hóa)")
-        plt.legend()
-        try:
-            plt.savefig(f"bai2_results/histograms/hist_all_players_{stat.replace(':', '').replace('/', '_')}.png")
-        except Exception as e:
-            print(f"Lỗi khi lưu histogram (chỉ số {stat}): {e}")
-        plt.close()
-    print("Hoàn thành: Biểu đồ Histogram đã được tạo.")
+    histogram_dir = "bai2_results/histograms"
+    if plots:
+        with span("histograms") as histogram_span:
+            histogram_jobs = build_histogram_jobs(df, stat_cols_to_analyze, histogram_dir,
+                                                  team_column=team_column_name if team_histograms else None)
+            rendered, skipped = render_histograms(histogram_jobs, histogram_dir, workers=plot_workers)
+            histogram_span.set(rendered=rendered, skipped=skipped)
+        print(f"Hoàn thành: Biểu đồ Histogram đã được tạo ({rendered} vẽ mới, {skipped} không đổi).")
 
     # --- 4. Xác định Đội có Điểm số Cao nhất & Phân tích Đội xuất sắc nhất ---
     
     highest_scoring_teams_summary = []
-    for stat in stat_cols_to_analyze:
-        if df[stat].dropna().empty: continue
-        try:
-            team_mean_stat = df.groupby(team_column_name)[stat].mean().sort_values(ascending=False)
-            if not team_mean_stat.empty:
-                top_team_for_stat = team_mean_stat.index[0]
-                top_score_for_stat = team_mean_stat.iloc[0]
-                highest_scoring_teams_summary.append(f"Chỉ số '{stat}': Đội cao nhất là {top_team_for_stat} (Trung bình: {top_score_for_stat:.2f})")
-        except Exception as e:
-            highest_scoring_teams_summary.append(f"Chỉ số '{stat}': Lỗi khi tính toán ({e})")
+    with span("best_team"):
+        team_means = float64_values(df, stat_cols_to_analyze).groupby(df[team_column_name], observed=True).mean()
+        team_means = team_means.loc[:, team_means.notna().any()]
+        best_teams = team_means.idxmax()
+        best_scores = team_means.max()
+    for stat in team_means.columns:
+        highest_scoring_teams_summary.append(f"Chỉ số '{stat}': Đội cao nhất là {best_teams[stat]} (Trung bình: {best_scores[stat]:.2f})")
 
     try:
         with open("bai2_results/top_3.txt", "a", encoding="utf-8") as f_top3:
@@ -149,7 +240,63 @@ def main_exercise_2():
     except Exception as e:
         print(f"Lỗi khi ghi tóm tắt đội điểm cao nhất: {e}")  
         
+    source_sha256 = file_sha256("results.csv") if partitions is None else None
+    if source_sha256:
+        with open(SOURCE_HASH_FILE, "w", encoding="utf-8") as f:
+            f.write(source_sha256)
+        
     print("\n✅ Lưu thành công dữ liệu")
 
+def main_exercise_2_streaming(sources=(), state_paths=(), chunksize=DEFAULT_CHUNKSIZE, workers=1, save_state=None,
+                              exact_limit=DEFAULT_EXACT_LIMIT, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+    # Chế độ một lượt cho dữ liệu lớn hơn bộ nhớ: chỉ ghi results2.csv (sai số xem streaming_stats.py).
+    # Trạng thái của từng phần có thể lưu bằng --save-state ở nhiều tiến trình/máy rồi gộp lại bằng --merge-states.
+    if not sources and not state_paths:
+        print("Lỗi: Không có file đầu vào nào (hoặc không có phân vùng nào khớp với --leagues/--seasons).")
+        return
+    try:
+        with span("stream_stats", files=len(sources), states=len(state_paths)) as stream_span:
+            states = [GroupStatistics.load(path) for path in state_paths]
+            if sources:
+                states.insert(0, aggregate_sources(sources, chunksize=chunksize, workers=workers, exact_limit=exact_limit,
+                                                   relative_accuracy=relative_accuracy))
+            merged = states[0]
+            for state in states[1:]:
+                merged.merge(state)
+            stream_span.set(rows=merged.n_rows, groups=len(merged.groups))
+    except (OSError, ValueError) as e:
+        print(f"Lỗi khi tính thống kê streaming: {e}")
+        return
+    if save_state:
+        merged.save(save_state)
+        print(f"Đã lưu trạng thái thống kê vào {save_state}")
+    df_results2 = merged.to_frame()
+    if len(df_results2.columns) == 1:
+        print("Không xác định được cột thống kê nào để phân tích.")
+        return
+    os.makedirs("bai2_results", exist_ok=True)
+    forget_processed_sha256()
+    df_results2.to_csv("bai2_results/results2.csv", index=False, encoding="utf-8-sig")
+    print(f"Hoàn thành: results2.csv đã được tạo từ {merged.n_rows} dòng ({len(merged.groups)} đội).")
+
+def main(argv=None, prog=None):
+    args = stats_parser(prog).parse_args(argv)
+    metrics_from_args(args)
+    partitions = partitions_from_args(args)
+    if args.streaming or args.merge_states:
+        if partitions is not None:
+            sources = sources_from_partitions(partitions)
+        else:
+            inputs = args.inputs if args.inputs is not None else ([] if args.merge_states else ["results.csv"])
+            sources = [(path, None) for path in inputs]
+        main_exercise_2_streaming(sources, args.merge_states, chunksize=args.chunksize, workers=args.jobs,
+                                  save_state=args.save_state, exact_limit=args.exact_limit,
+                                  relative_accuracy=args.median_accuracy)
+        return
+    main_exercise_2(incremental=args.incremental, top_n=args.top_n, top_by=args.top_by,
+                    team_histograms=args.team_histograms, plot_workers=args.plot_workers,
+                    partitions=partitions, plots=not args.no_plots,
+                    compact=args.compact)
+
 if __name__ == '__main__':
-    main_exercise_2()
\ No newline at end of file
+    main()
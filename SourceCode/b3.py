@@ -1,76 +1,37 @@
+# sklearn, matplotlib và seaborn được import trong các hàm cần chúng: --help và --no-plots khởi động nhanh.
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-from sklearn.impute import SimpleImputer
-from sklearn.cluster import KMeans
-from sklearn.decomposition import PCA
-from sklearn.metrics import silhouette_score
-import matplotlib.pyplot as plt
-import seaborn as sns
+import json
 import os
+from functools import partial
+from stats_loader import float64_values, load_selected_results, partition_result_paths
+from column_schema import columns_for, stat_columns, text_columns
+from kmeans_sweep import choose_k, sweep_k
+from cluster_model import DEFAULT_ARTIFACT, ClusterModel
+from similarity_index import DEFAULT_INDEX, SimilarityIndex
+from streaming_cluster import DEFAULT_CHUNKSIZE, assign_streaming, fit_streaming, score_sample
+from metrics import metrics_from_args, span
+from crawl_plan import partitions_from_args
+from stage_args import cluster_parser
+from silhouette_eval import DEFAULT_MEMORY_MB, DEFAULT_SAMPLE_SIZE, evaluate_silhouette
 
 def identify_statistic_columns_for_clustering(df, exclude_cols=None):
+    # Cột thống kê lấy từ COLUMN_SCHEMA; bỏ các cột hoàn toàn trống vì SimpleImputer sẽ loại chúng.
     if exclude_cols is None:
-        exclude_cols = ['Player', 'Nation', 'Squad', 'Position', 'Team']
-    potential_stat_cols = []
-    for col in df.columns:
-        if col not in exclude_cols:
-            try:
-                if pd.api.types.is_numeric_dtype(df[col]):
-                    if df[col].nunique(dropna=True) > 1:
-                        potential_stat_cols.append(col)
-            except Exception:
-                continue
-    return potential_stat_cols
-
-def clean_and_convert_to_numeric(df, stat_cols):
-    df_cleaned = df.copy()
-    for col in stat_cols:
-        if df_cleaned[col].dtype == 'object':
-            df_cleaned[col] = df_cleaned[col].astype(str).str.replace('%', '', regex=False)
-            df_cleaned[col] = pd.to_numeric(df_cleaned[col], errors='coerce')
-        elif not pd.api.types.is_numeric_dtype(df_cleaned[col]):
-             df_cleaned[col] = pd.to_numeric(df_cleaned[col], errors='coerce')
-    return df_cleaned
-
-def main_exercise_3():
-    output_dir_bai3 = "bai3_results"
-    if not os.path.exists(output_dir_bai3):
-        os.makedirs(output_dir_bai3)
-    try:
-        df_input = pd.read_csv("results.csv", na_values=["N/a", "NaN", "", " ", "NA"])
-    except FileNotFoundError:
-        print("Lỗi: File 'results.csv' không tìm thấy.")
-        return
-    except Exception as e:
-        print(f"Lỗi khi đọc file 'results.csv': {e}")
-        return
-    if df_input.empty:
-        print("Lỗi: File 'results.csv' rỗng.")
-        return
+        exclude_cols = text_columns()
+    return [col for col in stat_columns()
+            if col in df.columns and col not in exclude_cols and df[col].notna().any()]
 
-    player_info_df = df_input[['Player', 'Team' if 'Team' in df_input.columns else 'Squad']].copy()
+def write_silhouette_info(sweep_results, output_dir_bai3):
+    silhouette_info_path = os.path.join(output_dir_bai3, "silhouette_info.json")
+    with open(silhouette_info_path, "w", encoding="utf-8") as f:
+        json.dump([dict(result["silhouette_info"] or {"score": result["silhouette"]}, k=result["k"])
+                   for result in sweep_results], f, ensure_ascii=False, indent=1)
 
-    stat_cols_for_clustering = identify_statistic_columns_for_clustering(df_input)
-    if not stat_cols_for_clustering:
-        print("Không xác định được cột thống kê nào phù hợp cho clustering.")
-        return
-    
-    df_stats = df_input[stat_cols_for_clustering].copy()
-    df_stats = clean_and_convert_to_numeric(df_stats, stat_cols_for_clustering)
-    imputer = SimpleImputer(strategy='mean')
-    df_imputed = imputer.fit_transform(df_stats)
-    df_processed = pd.DataFrame(df_imputed, columns=df_stats.columns, index=df_stats.index)
-    scaler = StandardScaler()
-    df_scaled = scaler.fit_transform(df_processed)
-    df_scaled = pd.DataFrame(df_scaled, columns=df_processed.columns, index=df_processed.index)
-
-    wcss = []
-    k_range = range(2, 11)
-    for i in k_range:
-        kmeans_elbow = KMeans(n_clusters=i, init='k-means++', n_init='auto', random_state=42)
-        kmeans_elbow.fit(df_scaled)
-        wcss.append(kmeans_elbow.inertia_)
+def plot_sweep(sweep_results, k_range, output_dir_bai3):
+    import matplotlib.pyplot as plt
+
+    wcss = [result["inertia"] for result in sweep_results]
     
     plt.figure(figsize=(10, 6))
     plt.plot(k_range, wcss, marker='o', linestyle='--')
@@ -83,18 +44,19 @@ def main_exercise_3():
     plt.close()
     print(f"Đã lưu biểu đồ Elbow")
 
-    silhouette_scores = []
-    for i in k_range:
-        kmeans_silhouette = KMeans(n_clusters=i, init='k-means++', n_init='auto', random_state=42)
-        cluster_labels = kmeans_silhouette.fit_predict(df_scaled)
-        try:
-            silhouette_avg = silhouette_score(df_scaled, cluster_labels)
-            silhouette_scores.append(silhouette_avg)
-        except ValueError:
-            silhouette_scores.append(-1)
+    silhouette_scores = [result["silhouette"] for result in sweep_results]
+    silhouette_infos = [result["silhouette_info"] for result in sweep_results]
+    sampled = [info for info in silhouette_infos if info is not None and info["mode"] == "sample"]
             
     plt.figure(figsize=(10, 6))
     plt.plot(k_range, silhouette_scores, marker='o', linestyle='--')
+    if sampled:
+        # Ước lượng từ mẫu: vẽ thêm khoảng tin cậy cho từng k.
+        ks = [k for k, info in zip(k_range, silhouette_infos) if info is not None]
+        scores = [info["score"] for info in silhouette_infos if info is not None]
+        errors = [[info["score"] - info["ci_low"] for info in silhouette_infos if info is not None],
+                  [info["ci_high"] - info["score"] for info in silhouette_infos if info is not None]]
+        plt.errorbar(ks, scores, yerr=errors, fmt='none', capsize=4)
     plt.title('Phân tích Silhouette để xác định k tối ưu')
     plt.xlabel('Số lượng nhóm (k)')
     plt.ylabel('Silhouette Score Trung bình')
@@ -104,26 +66,9 @@ def main_exercise_3():
     plt.close()
     print(f"Đã lưu biểu đồ Silhouette")
 
-    optimal_k_silhouette = -1
-    if any(score > -1 for score in silhouette_scores): # Check if there are valid scores
-        best_silhouette_score = max(s for s in silhouette_scores if s > -1)
-        optimal_k_silhouette = list(k_range)[silhouette_scores.index(best_silhouette_score)]
-    else:
-        print("Không thể tính toán Silhouette Score hợp lệ cho các giá trị k đã thử.")
-        print("Vui lòng chọn k dựa trên biểu đồ Elbow hoặc kiến thức chuyên môn.")
-
-    chosen_k = optimal_k_silhouette if optimal_k_silhouette > 1 else 3 
-    kmeans = KMeans(n_clusters=chosen_k, init='k-means++', n_init='auto', random_state=42)
-    cluster_labels = kmeans.fit_predict(df_scaled)
-    df_results_with_clusters = df_input.loc[df_scaled.index].copy()
-    df_results_with_clusters['Cluster'] = cluster_labels
-    cluster_analysis_df = df_processed.copy()
-    cluster_analysis_df['Cluster'] = cluster_labels
-    cluster_summary = cluster_analysis_df.groupby('Cluster')[stat_cols_for_clustering].mean().round(2)
-    pca = PCA(n_components=2, random_state=42)
-    df_pca = pca.fit_transform(df_scaled)
-    df_pca_plot = pd.DataFrame(data=df_pca, columns=['Principal Component 1', 'Principal Component 2'])
-    df_pca_plot['Cluster'] = cluster_labels
+def plot_pca_clusters(df_pca_plot, chosen_k, output_dir_bai3):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
     plt.figure(figsize=(12, 8))
     sns.scatterplot(
@@ -142,6 +87,142 @@ def main_exercise_3():
     plt.close()
     print(f"Đã lưu biểu đồ PCA 2D")
 
+def main_exercise_3(k_range=range(2, 11), n_jobs=None, silhouette_mode="auto",
+                    silhouette_sample_size=DEFAULT_SAMPLE_SIZE, silhouette_memory_mb=DEFAULT_MEMORY_MB, partitions=None,
+                    plots=True, compact=False):
+    from sklearn.cluster import KMeans
+    from sklearn.decomposition import PCA
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import StandardScaler
+
+    output_dir_bai3 = "bai3_results"
+    if not os.path.exists(output_dir_bai3):
+        os.makedirs(output_dir_bai3)
+    try:
+        df_input = load_selected_results(columns=columns_for('cluster'), partitions=partitions, compact=compact)
+    except FileNotFoundError:
+        print("Lỗi: File 'results.csv' không tìm thấy.")
+        return
+    except Exception as e:
+        print(f"Lỗi khi đọc file 'results.csv': {e}")
+        return
+    if df_input.empty:
+        print("Lỗi: File 'results.csv' rỗng.")
+        return
+
+    player_info_df = df_input[['Player', 'Team' if 'Team' in df_input.columns else 'Squad']].copy()
+
+    stat_cols_for_clustering = identify_statistic_columns_for_clustering(df_input)
+    if not stat_cols_for_clustering:
+        print("Không xác định được cột thống kê nào phù hợp cho clustering.")
+        return
+    
+    with span("preprocess", rows=len(df_input), columns=len(stat_cols_for_clustering)):
+        df_stats = float64_values(df_input, stat_cols_for_clustering)
+        imputer = SimpleImputer(strategy='mean')
+        df_imputed = imputer.fit_transform(df_stats)
+        df_processed = pd.DataFrame(df_imputed, columns=df_stats.columns, index=df_stats.index)
+        scaler = StandardScaler()
+        df_scaled = scaler.fit_transform(df_processed)
+        df_scaled = pd.DataFrame(df_scaled, columns=df_processed.columns, index=df_processed.index)
+    index_path = os.path.join(output_dir_bai3, os.path.basename(DEFAULT_INDEX))
+    with span("similarity_index", rows=len(df_scaled)):
+        SimilarityIndex.from_frame(df_scaled, df_input).save(index_path)
+    print(f"Đã lưu chỉ mục cầu thủ tương tự vào {index_path}")
+
+    silhouette_fn = partial(evaluate_silhouette, mode=silhouette_mode, sample_size=silhouette_sample_size,
+                            memory_mb=silhouette_memory_mb)
+    with span("k_sweep", k_min=min(k_range), k_max=max(k_range)):
+        sweep_results = sweep_k(df_scaled, k_range, n_jobs=n_jobs, silhouette_fn=silhouette_fn)
+    results_by_k = {result["k"]: result for result in sweep_results}
+    write_silhouette_info(sweep_results, output_dir_bai3)
+    if plots:
+        with span("plot_sweep"):
+            plot_sweep(sweep_results, k_range, output_dir_bai3)
+
+    optimal_k_silhouette = choose_k(sweep_results)
+    if optimal_k_silhouette is None:
+        print("Không thể tính toán Silhouette Score hợp lệ cho các giá trị k đã thử.")
+        print("Vui lòng chọn k dựa trên biểu đồ Elbow hoặc kiến thức chuyên môn.")
+
+    chosen_k = optimal_k_silhouette if optimal_k_silhouette is not None and optimal_k_silhouette > 1 else 3 
+    if chosen_k in results_by_k:
+        kmeans = results_by_k[chosen_k]["model"]
+        cluster_labels = results_by_k[chosen_k]["labels"]
+    else:
+        kmeans = KMeans(n_clusters=chosen_k, init='k-means++', n_init='auto', random_state=42)
+        cluster_labels = kmeans.fit_predict(df_scaled)
+    df_results_with_clusters = df_input.loc[df_scaled.index].copy()
+    df_results_with_clusters['Cluster'] = cluster_labels
+    cluster_analysis_df = df_processed.copy()
+    cluster_analysis_df['Cluster'] = cluster_labels
+    cluster_summary = cluster_analysis_df.groupby('Cluster')[stat_cols_for_clustering].mean().round(2)
+    pca = PCA(n_components=2, random_state=42)
+    with span("pca"):
+        df_pca = pca.fit_transform(df_scaled)
+    model_path = os.path.join(output_dir_bai3, os.path.basename(DEFAULT_ARTIFACT))
+    ClusterModel(stat_cols_for_clustering, imputer, scaler, kmeans, pca).save(model_path)
+    print(f"Đã lưu model phân cụm vào {model_path}")
+    df_pca_plot = pd.DataFrame(data=df_pca, columns=['Principal Component 1', 'Principal Component 2'])
+    df_pca_plot['Cluster'] = cluster_labels
+    clusters_path = os.path.join(output_dir_bai3, "clusters.csv")
+    pd.DataFrame({**{col: df_results_with_clusters[col].to_numpy() for col in player_info_df.columns},
+                  'Cluster': cluster_labels, 'PC1': df_pca[:, 0], 'PC2': df_pca[:, 1]}).to_csv(
+        clusters_path, index=False, encoding='utf-8')
+    print(f"Đã lưu nhãn cụm vào {clusters_path}")
+
+    if plots:
+        with span("plot_pca"):
+            plot_pca_clusters(df_pca_plot, chosen_k, output_dir_bai3)
+
     print("\n✅ Lưu thành công dữ liệu")
+def main_exercise_3_streaming(paths, k_range=range(2, 11), chunksize=DEFAULT_CHUNKSIZE, sample_size=DEFAULT_SAMPLE_SIZE,
+                              plots=True):
+    # Chế độ out-of-core cho dữ liệu nhiều giải/mùa: đọc theo chunk, chọn k trên mẫu cố định cỡ
+    # và ghi nhãn cụm của mọi cầu thủ ra bai3_results/clusters.csv theo từng chunk.
+    if not paths:
+        print("Lỗi: Không có file đầu vào nào (hoặc không có phân vùng nào khớp với --leagues/--seasons).")
+        return
+    output_dir_bai3 = "bai3_results"
+    os.makedirs(output_dir_bai3, exist_ok=True)
+    try:
+        fit = fit_streaming(paths, k_range, chunksize=chunksize, sample_size=sample_size)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Lỗi khi đọc dữ liệu: {e}")
+        return
+    sweep_results = score_sample(fit)
+    write_silhouette_info(sweep_results, output_dir_bai3)
+    if plots:
+        plot_sweep(sweep_results, k_range, output_dir_bai3)
+    optimal_k_silhouette = choose_k(sweep_results)
+    chosen_k = optimal_k_silhouette if optimal_k_silhouette is not None and optimal_k_silhouette > 1 else 3
+    if chosen_k not in fit["kmeans"]:
+        chosen_k = sweep_results[0]["k"]
+    model = ClusterModel(fit["columns"], fit["imputer"], fit["scaler"], fit["kmeans"][chosen_k], fit["pca"])
+    model_path = os.path.join(output_dir_bai3, os.path.basename(DEFAULT_ARTIFACT))
+    model.save(model_path)
+    n_rows = assign_streaming(model, paths, os.path.join(output_dir_bai3, "clusters.csv"), chunksize)
+    if plots:
+        sample_projection = model.predict_and_project(fit["sample"])
+        df_pca_plot = pd.DataFrame({'Principal Component 1': sample_projection['PC1'],
+                                    'Principal Component 2': sample_projection['PC2'],
+                                    'Cluster': sample_projection['Cluster']})
+        plot_pca_clusters(df_pca_plot, chosen_k, output_dir_bai3)
+    print(f"\n✅ Đã phân cụm {n_rows} dòng (k={chosen_k}) ở chế độ streaming")
+
+def main(argv=None, prog=None):
+    args = cluster_parser(prog).parse_args(argv)
+    metrics_from_args(args)
+    partitions = partitions_from_args(args)
+    if args.streaming:
+        inputs = partition_result_paths(partitions) if partitions is not None else args.inputs
+        main_exercise_3_streaming(inputs, k_range=range(args.k_min, args.k_max + 1), chunksize=args.chunksize,
+                                  sample_size=args.silhouette_sample_size, plots=not args.no_plots)
+    else:
+        main_exercise_3(k_range=range(args.k_min, args.k_max + 1), n_jobs=args.jobs, silhouette_mode=args.silhouette_mode,
+                        silhouette_sample_size=args.silhouette_sample_size,
+                        silhouette_memory_mb=args.silhouette_memory_mb, partitions=partitions,
+                        plots=not args.no_plots, compact=args.compact)
+
 if __name__ == '__main__':
-    main_exercise_3()
\ No newline at end of file
+    main()
@@ -1,23 +1,39 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+# Selenium và bs4 được import trong hàm dùng chúng: --help và các lần chạy không cần trình duyệt khởi động nhanh hơn.
 import pandas as pd
+import os
+import re
 import time
+import unicodedata
+from urllib.parse import urlparse
+import async_fetch
+import crawl_plan
+from changeset import file_sha256, usable_changeset
+from crawl_plan import partitions_from_args
+from metrics import count, metrics_from_args, span
+from name_matcher import NameIndex, fold_name
+from page_cache import cache_from_args
+from stats_loader import list_partitions, load_partitions, load_results
+from column_schema import columns_for
+from stage_args import TRANSFERS_CSV, transfers_parser
 
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/95.0.4638.54 Safari/537.36'
-TRANSFER_BASE_URL = "https://www.footballtransfers.com/en/players/uk-premier-league"
+FT_ORIGIN = crawl_plan.FT_ORIGIN
+TEAM_URL_TEMPLATE = crawl_plan.team_url_template(crawl_plan.DEFAULT_COMPETITION)
 
-URLS_TO_SCRAPE = [
-    "https://www.footballtransfers.com/en/players/uk-premier-league"
-] + [f"https://www.footballtransfers.com/en/players/uk-premier-league/{i}" for i in range(2, 23)]
+# Giải mặc định; các giải khác lấy danh sách trang từ crawl_plan (--leagues).
+URLS_TO_SCRAPE = crawl_plan.transfer_urls(crawl_plan.DEFAULT_COMPETITION)
+TRANSFER_BASE_URL = URLS_TO_SCRAPE[0]
+TRANSFER_COLUMNS = ['Player', 'Team', 'ETV', 'Skill/Pot']
+# Hash của results.csv mà player_transfer_values.csv được tính từ đó (để --incremental nối tiếp changeset của Bài 1).
+SOURCE_HASH_FILE = "player_transfer_values.sha256"
 
 
 def get_driver():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    from webdriver_manager.chrome import ChromeDriverManager
+
     chrome_options = Options()
     chrome_options.add_argument(f'user-agent={USER_AGENT}')
     chrome_options.add_argument('--disable-gpu')
@@ -40,17 +56,27 @@ def get_driver():
     return driver
 
 def get_page_source_with_selenium_and_wait(driver, url, wait_selector_css):
-    driver.get(url)
-    try:
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, wait_selector_css))
-        )
-    except Exception as e:
-        print(f"⚠️ Timeout hoặc không tìm thấy element. Lỗi: {e}")
-        return None 
-    return driver.page_source
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    with span("fetch", url=url, backend="selenium") as fetch_span:
+        driver.get(url)
+        try:
+            WebDriverWait(driver, 20).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, wait_selector_css))
+            )
+        except Exception as e:
+            print(f"⚠️ Timeout hoặc không tìm thấy element. Lỗi: {e}")
+            count("wait_timeout", url=url)
+            return None 
+        page_source = driver.page_source
+        fetch_span.set(bytes=len(page_source))
+    return page_source
 
 def extract_data_using_confirmed_selectors(html_content, url_for_logging=""):
+    from bs4 import BeautifulSoup
+
     soup = BeautifulSoup(html_content, 'html.parser')
     players_data = []
 
@@ -107,125 +133,300 @@ def extract_data_using_confirmed_selectors(html_content, url_for_logging=""):
             
     return players_data
 
-def normalize_player_name(name):
-    if pd.isna(name) or name is None:
-        return ""
-    return str(name).lower().strip()
+def page_has_player_table(html):
+    # Trang tải bằng HTTP thường mà không có bảng cầu thủ thì phải nhờ Selenium chạy JavaScript.
+    return html is not None and 'mvp-table' in html
 
-if __name__ == "__main__":
+def normalize_player_name(name):
+    # Bỏ dấu và chuẩn hóa khoảng trắng/ký tự nối, để "Ødegaard" và "Odegaard" là cùng một tên.
+    return fold_name(name)
+
+def page_match_finder(matcher, min_score):
+    # Trả về hàm nhận các dòng của một trang và cho biết những cầu thủ mục tiêu (id trong matcher) nào đã khớp.
+    def find_matches(page_rows):
+        matches = matcher.match_many([row["Player"] for row in page_rows], [row["Team"] for row in page_rows], min_score)
+        return set(matches.loc[matches['match_index'] >= 0, 'match_index'].tolist())
+    return find_matches
+
+def slugify(text):
+    folded = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '-', folded.lower()).strip('-')
+
+def fetch_uncached(urls, args, state):
+    # Tải các URL chưa có trong cache: HTTP bất đồng bộ trước, Selenium cho các trang còn lại.
+    pages = {}
+    if not urls:
+        return pages
+    if args.offline:
+        print(f"  {len(urls)} trang không có trong cache (chế độ offline), bỏ qua.")
+        return pages
+    if args.backend == "http" and async_fetch.is_available():
+        fetched, urls = async_fetch.fetch_pages(urls, needs_js=lambda html: not page_has_player_table(html),
+                                                user_agent=USER_AGENT, rate=args.rate, max_concurrency=args.concurrency)
+        pages.update(fetched)
+        if urls:
+            print(f"  Tải bằng HTTP: {len(fetched)} trang, cần trình duyệt: {len(urls)} trang.")
+    elif args.backend == "http":
+        print("  Thông báo: chưa cài aiohttp, dùng Selenium để tải trang.")
+    for url in urls:
+        if state.get("driver") is None:
+            state["driver"] = get_driver()
+        pages[url] = get_page_source_with_selenium_and_wait(state["driver"], url, "table.mvp-table")
+        time.sleep(1)
+    return pages
+
+def scrape_pages(urls, page_cache, args, state, unmatched, find_matches, labels=None, stop_when_matched=True):
+    # Tải và trích xuất theo từng đợt (mỗi đợt = số kết nối đồng thời). Sau mỗi đợt, loại các cầu thủ
+    # đã tìm thấy khỏi `unmatched`; dừng khi không còn ai cần tìm hoặc đã tới trang cuối của danh sách
+    # (trang trích xuất được nhưng có ít dòng hơn trang đầy đủ). Trang không trích xuất được dòng nào
+    # (trang kiểm tra bot, cần JavaScript, đổi markup) bị coi là lỗi, không phải trang cuối: các trang sau
+    # vẫn được xử lý. Trả về (các dòng đã trích xuất, số trang đã xử lý).
+    labels = labels or {}
+    rows = []
+    full_page_rows = 0
+    wave_size = max(1, args.concurrency)
+    processed = 0
+    for wave_start in range(0, len(urls), wave_size):
+        wave = urls[wave_start:wave_start + wave_size]
+        pages = {url: page_cache.get(url) for url in wave}
+        cached_urls = {url for url, html in pages.items() if html is not None}
+        count("cache_hit", len(cached_urls))
+        count("cache_miss", len(wave) - len(cached_urls))
+        pages.update(fetch_uncached([url for url in wave if url not in cached_urls], args, state))
+        reached_end = False
+        for url in wave:
+            label = labels.get(url, url)
+            processed += 1
+            html_source = pages.get(url)
+            if not html_source:
+                if url in pages:
+                    print(f"  {label}: Không lấy được HTML source.")
+                continue
+            with span("parse", url=url, bytes=len(html_source)) as parse_span:
+                page_rows = extract_data_using_confirmed_selectors(html_source, url)
+                parse_span.set(rows=len(page_rows))
+            if not page_rows:
+                print(f"  {label}: Không trích xuất được dữ liệu nào từ HTML, bỏ qua trang này.")
+                count("parse_empty", url=url)
+                continue
+            rows.extend(page_rows)
+            print(f"  {label}: Trích xuất được {len(page_rows)} mục.")
+            if url not in cached_urls:
+                page_cache.put(url, html_source)
+            unmatched.difference_update(find_matches(page_rows))
+            if len(page_rows) < full_page_rows:
+                reached_end = True
+            full_page_rows = max(full_page_rows, len(page_rows))
+        if stop_when_matched and not unmatched:
+            print(f"  Đã tìm thấy mọi cầu thủ cần tìm sau {processed}/{len(urls)} trang, dừng sớm.")
+            break
+        if stop_when_matched and reached_end:
+            print(f"  Đã tới trang cuối của danh sách sau {processed}/{len(urls)} trang.")
+            break
+    return rows, processed
+
+def parse_args(argv=None, prog=None):
+    return transfers_parser(prog).parse_args(argv)
+
+def read_processed_sha256(path=SOURCE_HASH_FILE):
     try:
-        df_results1 = pd.read_csv("results.csv", na_filter=False)
-    except FileNotFoundError:
-        print("❌ Lỗi: File 'results.csv' không tìm thấy. Hãy đảm bảo bạn đã chạy Bài 1 thành công.")
-        exit()
-    except Exception as e:
-        print(f"❌ Lỗi khi đọc 'results.csv': {e}")
-        exit()
-
+        with open(path, encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def reusable_transfer_rows(output_csv_file=TRANSFERS_CSV):
+    # Với --incremental: các dòng của lần chạy trước cho cầu thủ không mới và không thay đổi theo changeset của Bài 1.
+    # None khi không có changeset nối tiếp đúng phiên bản results.csv đã xử lý, hoặc chưa có file kết quả cũ.
+    changeset = usable_changeset("results.csv", read_processed_sha256())
+    if changeset is None or not os.path.exists(output_csv_file):
+        return None
+    previous = pd.read_csv(output_csv_file, dtype=str, keep_default_na=False, encoding='utf-8-sig')
+    if list(previous.columns) != TRANSFER_COLUMNS:
+        return None
+    return previous[~previous['Player'].isin(set(changeset["added"]) | set(changeset["changed"]))]
+
+def collect_transfer_values(df_results1, urls_to_scrape, team_url_template, output_csv_file, page_cache, args,
+                            kept_rows=None):
+    # Ghép giá trị chuyển nhượng cho các cầu thủ > 900 phút của df_results1 và ghi ra output_csv_file.
+    # kept_rows: các dòng được giữ lại từ lần chạy trước (--incremental), chỉ tìm những cầu thủ không có trong đó.
+    # Trả về True khi đã ghi file.
     if 'Minutes' not in df_results1.columns or 'Player' not in df_results1.columns:
         print("❌ Lỗi: File 'results.csv' phải có cột 'Minutes' và 'Player'.")
-        exit()
+        return
 
-    df_results1['Minutes_Numeric'] = df_results1['Minutes'].astype(str).str.replace(',', '', regex=False)
-    df_results1['Minutes_Numeric'] = df_results1['Minutes_Numeric'].replace(['N/a', ''], pd.NA) 
-    df_results1['Minutes_Numeric'] = pd.to_numeric(df_results1['Minutes_Numeric'], errors='coerce')
-    df_results1.dropna(subset=['Minutes_Numeric'], inplace=True)
+    df_results1 = df_results1.dropna(subset=['Minutes'])
 
-    players_over_900_min_df = df_results1[df_results1['Minutes_Numeric'] > 900].copy() 
+    players_over_900_min_df = df_results1[df_results1['Minutes'] > 900].copy() 
     
     if players_over_900_min_df.empty:
         print("Thông báo: Không tìm thấy cầu thủ nào thi đấu trên 900 phút trong 'results.csv'. Kết thúc.")
-        exit()
+        return
 
-    players_over_900_min_df['Player_Normalized_Results'] = players_over_900_min_df['Player'].apply(normalize_player_name)
-    set_players_over_900_min_normalized = set(players_over_900_min_df['Player_Normalized_Results'])
+    if args.players:
+        wanted = {normalize_player_name(name) for name in args.players}
+        players_over_900_min_df = players_over_900_min_df[players_over_900_min_df['Player'].apply(normalize_player_name).isin(wanted)]
+    if args.teams and 'Squad' in players_over_900_min_df.columns:
+        players_over_900_min_df = players_over_900_min_df[players_over_900_min_df['Squad'].isin(args.teams)]
+    if players_over_900_min_df.empty:
+        print("Thông báo: Không có cầu thủ nào khớp với --players/--teams. Kết thúc.")
+        return
+
+    players_over_900_min_df = players_over_900_min_df.drop_duplicates(subset=['Player']).reset_index(drop=True)
+    if kept_rows is None:
+        kept_rows = pd.DataFrame(columns=TRANSFER_COLUMNS)
+    else:
+        kept_rows = kept_rows[kept_rows['Player'].isin(players_over_900_min_df['Player'])]
+        players_over_900_min_df = players_over_900_min_df[
+            ~players_over_900_min_df['Player'].isin(kept_rows['Player'])].reset_index(drop=True)
+        print(f"Thông tin: Giữ {len(kept_rows)} cầu thủ không đổi từ lần chạy trước, "
+              f"cần tìm {len(players_over_900_min_df)} cầu thủ mới, thay đổi hoặc chưa tìm thấy.")
+        if players_over_900_min_df.empty:
+            return save_transfer_values(kept_rows, output_csv_file)
+    matcher = NameIndex(players_over_900_min_df['Player'],
+                        teams=players_over_900_min_df['Squad'] if 'Squad' in players_over_900_min_df.columns else None)
+    find_matches = page_match_finder(matcher, args.match_threshold)
     
-    print(f"Thông tin: Đã xác định {len(set_players_over_900_min_normalized)} cầu thủ thi đấu > 900 phút từ results.csv.")
+    print(f"Thông tin: Đã xác định {len(matcher)} cầu thủ thi đấu > 900 phút từ results.csv.")
 
-    active_driver = None
+    state = {"driver": None}
     all_scraped_data_dfs = []
-    wait_for_table_selector = "table.mvp-table" 
+    unmatched = set(range(len(matcher)))
 
     try:
-        active_driver = get_driver()
-        print(f"\nThông tin: Bắt đầu cào dữ liệu từ {len(URLS_TO_SCRAPE)} trang trên footballtransfers.com...")
-        
-        for page_idx, current_page_url in enumerate(URLS_TO_SCRAPE, 1):
-            html_source = get_page_source_with_selenium_and_wait(active_driver, current_page_url, wait_for_table_selector)
-            
-            if html_source:
-                df_page_transfer_data = extract_data_using_confirmed_selectors(html_source, current_page_url)
-                if df_page_transfer_data: 
-                    all_scraped_data_dfs.extend(df_page_transfer_data) 
-                    print(f"  Trang {page_idx}: Trích xuất được {len(df_page_transfer_data)} mục.")
-                else:
-                    print(f"  Trang {page_idx}: Không trích xuất được dữ liệu nào từ HTML.")
-            else:
-                print(f"  Trang {page_idx}: Không lấy được HTML source.")
-            time.sleep(1) 
+        print(f"\nThông tin: Bắt đầu cào dữ liệu từ tối đa {len(urls_to_scrape)} trang trên footballtransfers.com...")
+        labels = {url: f"Trang {page_idx}" for page_idx, url in enumerate(urls_to_scrape, 1)}
+        rows, processed = scrape_pages(urls_to_scrape, page_cache, args, state, unmatched, find_matches, labels,
+                                       stop_when_matched=not args.exhaustive)
+        all_scraped_data_dfs.extend(rows)
+        print(f"Thông tin: Đã xử lý {processed}/{len(urls_to_scrape)} trang, còn {len(unmatched)} cầu thủ chưa tìm thấy.")
+
+        if unmatched and args.lookup_teams and 'Squad' in players_over_900_min_df.columns:
+            missing_df = players_over_900_min_df.iloc[sorted(unmatched)]
+            team_urls = {team_url_template.format(slug=slugify(team)): f"Đội {team}"
+                         for team in sorted(missing_df['Squad'].dropna().unique())}
+            print(f"Thông tin: Tra cứu {len(team_urls)} trang đội bóng cho {len(unmatched)} cầu thủ còn thiếu...")
+            rows, _ = scrape_pages(list(team_urls), page_cache, args, state, unmatched, find_matches, team_urls,
+                                   stop_when_matched=False)
+            all_scraped_data_dfs.extend(rows)
+            print(f"Thông tin: Sau khi tra cứu theo đội còn {len(unmatched)} cầu thủ chưa tìm thấy.")
 
     except Exception as e:
         print(f"LỖI nghiêm trọng đã xảy ra trong quá trình cào dữ liệu: {e}")
     finally:
-        if active_driver:
-            active_driver.quit()
+        if state["driver"]:
+            state["driver"].quit()
 
     if not all_scraped_data_dfs:
         print("Thông báo: Không thu thập được dữ liệu nào từ footballtransfers.com. Kết thúc.")
-        exit()
+        return
 
     df_all_transfers_raw = pd.DataFrame(all_scraped_data_dfs)
     
     if df_all_transfers_raw.empty: 
         print("Thông báo: DataFrame thô rỗng sau khi thu thập. Kết thúc.")
-        exit()
+        return
 
     df_all_transfers_raw.drop_duplicates(subset=['Player'], keep='first', inplace=True)
 
     if df_all_transfers_raw.empty:
         print("Thông báo: Không có dữ liệu thô nào sau khi xử lý trùng lặp. Kết thúc.")
-        exit()
+        return
 
-    df_all_transfers_raw['Player_Normalized_FT'] = df_all_transfers_raw['Player'].apply(normalize_player_name)
+    with span("match_names", rows=len(df_all_transfers_raw), targets=len(matcher)):
+        matches = matcher.match_many(df_all_transfers_raw['Player'], df_all_transfers_raw['Team'], args.match_threshold)
+    df_all_transfers_raw = df_all_transfers_raw.reset_index(drop=True).join(matches)
     
-    df_final_filtered_data = df_all_transfers_raw[
-        df_all_transfers_raw['Player_Normalized_FT'].isin(set_players_over_900_min_normalized)
-    ].copy() 
-
-    output_csv_file = "player_transfer_values.csv"
+    df_final_filtered_data = df_all_transfers_raw[df_all_transfers_raw['match_index'] >= 0].copy()
+    # Mỗi cầu thủ của results.csv chỉ giữ một dòng: dòng có điểm khớp cao nhất, ưu tiên cùng đội.
+    df_final_filtered_data.sort_values(['score', 'same_team'], ascending=False, kind='stable', inplace=True)
+    df_final_filtered_data.drop_duplicates(subset=['match_index'], keep='first', inplace=True)
+    df_final_filtered_data.sort_index(inplace=True)
 
     if df_final_filtered_data.empty:
-        print(f"CẢNH BÁO: Không tìm thấy thông tin chuyển nhượng cho các cầu thủ đã lọc (>900 phút). File '{output_csv_file}' sẽ không được tạo hoặc sẽ rỗng.")
+        # Không cầu thủ nào khớp vẫn là kết quả hợp lệ: ghi file chỉ có dòng tiêu đề để các bước sau
+        # (pipeline, query_service) không nhầm với lần chạy lỗi hoặc dùng lại file cũ.
+        print(f"CẢNH BÁO: Không tìm thấy thông tin chuyển nhượng cho các cầu thủ đã lọc (>900 phút). File '{output_csv_file}' sẽ chỉ có dòng tiêu đề." if kept_rows.empty else "")
+        df_to_save = pd.DataFrame(columns=TRANSFER_COLUMNS)
     else:
         print(f"Thông tin: Đã lọc được {len(df_final_filtered_data)} mục cho các cầu thủ thi đấu > 900 phút.")
+        fuzzy = df_final_filtered_data[df_final_filtered_data['score'] < 1.0]
+        if not fuzzy.empty:
+            print(f"Thông tin: {len(fuzzy)} tên được ghép gần đúng (không trùng khớp hoàn toàn):")
+            for _, row in fuzzy.iterrows():
+                note = " (không chắc chắn)" if row['ambiguous'] else ""
+                print(f"    {row['Player']} -> {row['match']} ({row['score']:.2f}){note}")
+
+        df_merged_data = df_final_filtered_data.copy()
+        df_merged_data['Player'] = df_merged_data['match']
+        df_to_save = df_merged_data[TRANSFER_COLUMNS].copy()
+
+    if not kept_rows.empty:
+        df_to_save = pd.concat([kept_rows, df_to_save], ignore_index=True)
+    return save_transfer_values(df_to_save, output_csv_file)
+
+def save_transfer_values(df_to_save, output_csv_file):
+    try:
+        df_to_save.to_csv(output_csv_file, index=False, encoding='utf-8-sig')
+        print(f"✅ Đã lưu thành công dữ liệu.")
+        return True
+    except Exception as e:
+        print(f"❌ Lỗi khi lưu file: {e}")
+        return False
+
+def main(argv=None, prog=None):
+    args = parse_args(argv, prog)
+    metrics_from_args(args)
+    page_cache = cache_from_args(args)
+    partitions = partitions_from_args(args)
+    if partitions is not None:
+        # footballtransfers chỉ có giá trị hiện tại: mỗi giải được ghép với phân vùng mùa mới nhất trong số
+        # các mùa đã chọn, kết quả ghi cạnh results.csv của phân vùng đó.
+        origin = crawl_plan.FT_ORIGIN
+        if args.base_url:
+            base = urlparse(args.base_url)
+            origin = f"{base.scheme}://{base.netloc}"
+        for league in partitions.leagues or [crawl_plan.DEFAULT_COMPETITION]:
+            available = list_partitions(partitions.root, [league], partitions.seasons)
+            if not available:
+                print(f"❌ Lỗi: Không có phân vùng nào của giải {league} trong '{partitions.root}'. Hãy chạy Bài 1 với --leagues {league}.")
+                continue
+            _, season, partition_path = max(available, key=lambda partition: partition[1])
+            print(f"\n=== {league}/{season} ===")
+            df_partition = load_partitions(partitions.root, [league], [season], columns=columns_for('transfers'))
+            collect_transfer_values(df_partition, crawl_plan.transfer_urls(league, origin),
+                                    crawl_plan.team_url_template(league, origin),
+                                    os.path.join(partition_path, TRANSFERS_CSV), page_cache, args)
+        return
+    try:
+        df_results1 = load_results(columns=columns_for('transfers'))
+    except FileNotFoundError:
+        print("❌ Lỗi: File 'results.csv' không tìm thấy. Hãy đảm bảo bạn đã chạy Bài 1 thành công.")
+        return
+    except Exception as e:
+        print(f"❌ Lỗi khi đọc 'results.csv': {e}")
+        return
+
+    urls_to_scrape = URLS_TO_SCRAPE
+    team_url_template = TEAM_URL_TEMPLATE
+    if args.base_url:
+        urls_to_scrape = [url.replace(TRANSFER_BASE_URL, args.base_url.rstrip('/'), 1) for url in URLS_TO_SCRAPE]
+        base = urlparse(args.base_url)
+        team_url_template = TEAM_URL_TEMPLATE.replace(FT_ORIGIN, f"{base.scheme}://{base.netloc}", 1)
+    kept_rows = None
+    if args.incremental:
+        kept_rows = reusable_transfer_rows()
+        if kept_rows is None:
+            print("Thông tin: Không có changeset nối tiếp lần chạy trước, tìm lại toàn bộ cầu thủ.")
+    if os.path.exists(SOURCE_HASH_FILE):
+        os.remove(SOURCE_HASH_FILE)
+    written = collect_transfer_values(df_results1, urls_to_scrape, team_url_template, TRANSFERS_CSV, page_cache, args,
+                                      kept_rows=kept_rows)
+    # Kết quả chỉ có một phần cầu thủ (--players/--teams) không được dùng làm nền cho lần --incremental sau.
+    source_sha256 = file_sha256("results.csv") if written and not (args.players or args.teams) else None
+    if source_sha256:
+        with open(SOURCE_HASH_FILE, "w", encoding="utf-8") as f:
+            f.write(source_sha256)
 
-        player_name_map_df = players_over_900_min_df[['Player', 'Player_Normalized_Results']].drop_duplicates(subset=['Player_Normalized_Results'])
-        
-        df_merged_data = pd.merge(
-            df_final_filtered_data,
-            player_name_map_df,
-            left_on='Player_Normalized_FT',
-            right_on='Player_Normalized_Results',
-            how='left',
-            suffixes=('_FT', '_Results')
-        )
-        
-        df_merged_data['Player'] = df_merged_data['Player_Results'].fillna(df_merged_data['Player_FT'])
-
-        columns_to_save_in_csv = ['Player', 'Team', 'ETV', 'Skill/Pot']
-        
-        df_to_save = df_merged_data[columns_to_save_in_csv].copy()
-        
-        if not df_to_save.empty:
-            try:
-                df_to_save.to_csv(output_csv_file, index=False, encoding='utf-8-sig')
-                print(f"✅ Đã lưu thành công dữ liệu.")
-            except Exception as e:
-                print(f"❌ Lỗi khi lưu file: {e}")
-        else:
-            print(f"Thông báo: DataFrame df_to_save rỗng, không có dữ liệu để lưu.")
-    
-    if df_final_filtered_data.empty: 
-         print(f"\nLưu ý cuối cùng: Vì không có dữ liệu nào được lọc cho cầu thủ > 900 phút, file '{output_csv_file}' có thể không được tạo hoặc sẽ rỗng.")
-
-
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import random
+import time
+import tracemalloc
+
+import pandas as pd
+
+from b1 import extract_table_from_html_fbref, extract_table_from_html_fbref_bs4
+
+STAT_NAMES = ['games', 'games_starts', 'minutes', 'goals', 'assists', 'cards_yellow', 'cards_red',
+              'xg', 'xg_assist', 'progressive_carries', 'progressive_passes', 'progressive_passes_received',
+              'goals_per90', 'assists_per90', 'xg_per90']
+
+
+def make_fbref_page(n_rows, table_id="stats_standard", filler_kb=800, seed=0):
+    rng = random.Random(seed)
+    header = ''.join(f'<th data-stat="{s}">{s}</th>' for s in ['player', 'nationality', 'position', 'team', 'age'] + STAT_NAMES)
+    rows = []
+    for i in range(n_rows):
+        if i and i % 25 == 0:
+            rows.append(f'<tr class="thead">{header}</tr>')
+        if i and i % 100 == 0:
+            rows.append('<tr class="spacer_ partial_table"><td colspan="20"></td></tr>')
+        cells = [
+            f'<th scope="row" class="right" data-stat="ranker">{i + 1}</th>',
+            f'<td class="left" data-stat="player" csk="P{i}"><a href="/en/players/{i:08x}/">Player &amp; {i}</a></td>',
+            '<td class="left poptip" data-stat="nationality"><a href="/en/country/ENG/"><span class="f-i f-eng">eng</span> ENG</a></td>',
+            '<td class="center" data-stat="position">MF,FW</td>',
+            f'<td class="left" data-stat="team"><a href="/en/squads/{i % 20}/">Team {i % 20}</a></td>',
+            f'<td class="center" data-stat="age">{rng.randint(17, 38)}-{rng.randint(0, 364):03d}</td>',
+        ]
+        for s in STAT_NAMES:
+            value = '' if rng.random() < 0.05 else f'{rng.random() * 3000:,.2f}'
+            cells.append(f'<td class="right" data-stat="{s}">{value}</td>')
+        cells.append(f'<td class="left group_start" data-stat="matches"><a href="/matches/{i}">Matches</a></td>')
+        rows.append(f'<tr>{"".join(cells)}</tr>')
+    table = (f'<table class="min_width sortable stats_table" id="{table_id}" data-cols-to-freeze=",3">'
+             f'<caption>Player Standard Stats</caption><thead><tr>{header}</tr></thead>'
+             f'<tbody>{"".join(rows)}</tbody></table>')
+    filler_row = '<div class="filter"><a href="#">link</a><span>text</span></div>\n'
+    filler = filler_row * (filler_kb * 1024 // len(filler_row))
+    return (f'<html><head><script>var x = 1;</script></head><body>{filler}'
+            f'<div id="all_{table_id}" class="table_wrapper"><div class="placeholder"></div>\n'
+            f'<!--\n{table}\n-->\n</div>{filler}</body></html>')
+
+
+def measure(fn, html_content, table_id, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        df = fn(html_content, table_id)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn(html_content, table_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return df, best, peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="So sánh tốc độ trích xuất bảng FBref: bản nhanh và bản BeautifulSoup")
+    parser.add_argument("--rows", type=int, nargs="+", default=[500, 2000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} {'page MB':>8} {'bs4 s':>8} {'fast s':>8} {'speedup':>8} {'bs4 MB':>8} {'fast MB':>8}")
+    for n_rows in args.rows:
+        page = make_fbref_page(n_rows)
+        df_old, t_old, m_old = measure(extract_table_from_html_fbref_bs4, page, "stats_standard", args.repeat)
+        df_new, t_new, m_new = measure(extract_table_from_html_fbref, page, "stats_standard", args.repeat)
+        pd.testing.assert_frame_equal(df_old, df_new)
+        print(f"{n_rows:>8} {len(page) / 1e6:>8.1f} {t_old:>8.3f} {t_new:>8.3f} {t_old / t_new:>7.1f}x "
+              f"{m_old / 1e6:>8.1f} {m_new / 1e6:>8.1f}")
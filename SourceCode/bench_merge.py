@@ -0,0 +1,73 @@
+import argparse
+import re
+import time
+
+import pandas as pd
+
+from b1 import FBREF_TO_CSV_COLUMN_MAP, IDENTITY_COLS_FROM_STANDARD, OUTPUT_COLUMNS, build_results_table, merge_category_tables
+from synthetic_data import make_category_tables
+
+
+def legacy_merge_stage(all_dataframes):
+    # Bản rút gọn của cách làm cũ trong b1.py: pd.merge tuần tự và .apply theo từng dòng.
+    final_df = all_dataframes["standard"].copy()
+    for stat_category, df_to_merge in all_dataframes.items():
+        if stat_category == "standard":
+            continue
+        cols = list(dict.fromkeys(['player'] + [c for c in df_to_merge.columns if c != 'player' and c not in IDENTITY_COLS_FROM_STANDARD]))
+        final_df = pd.merge(final_df, df_to_merge[cols].copy(), on="player", how="left", suffixes=('', f'_{stat_category}_dup'))
+    final_df['temp_minutes_numeric'] = pd.to_numeric(final_df['minutes'].astype(str).str.replace(',', '', regex=False), errors='coerce')
+    final_df.sort_values(['player', 'temp_minutes_numeric'], ascending=[True, False], inplace=True)
+    final_df.drop_duplicates(subset=['player'], keep='first', inplace=True)
+    final_df.drop(columns=['temp_minutes_numeric'], inplace=True)
+    final_df.rename(columns={k: v for k, v in FBREF_TO_CSV_COLUMN_MAP.items() if k in final_df.columns}, inplace=True)
+
+    def extract_nation_code(nation_text):
+        if isinstance(nation_text, str):
+            match = re.search(r'([A-Z]+)$', nation_text)
+            if match: return match.group(1)
+        return nation_text
+    final_df['Nation'] = final_df['Nation'].apply(extract_nation_code)
+    final_df['Age'] = final_df['Age'].astype(str).apply(lambda x: x.split('-')[0] if '-' in x else x)
+    minutes = pd.to_numeric(final_df['Minutes'].astype(str).str.replace(',', '', regex=False), errors='coerce')
+    final_df = final_df[minutes > 90].copy()
+    final_df['FirstNameTemp'] = final_df['Player'].astype(str).apply(lambda x: x.split(' ')[0] if x and ' ' in x else x)
+    final_df.sort_values(by='FirstNameTemp', ascending=True, kind='stable', inplace=True)
+    results_df = pd.DataFrame({col: final_df[col] if col in final_df.columns else "N/a" for col in OUTPUT_COLUMNS})
+    results_df.fillna("N/a", inplace=True)
+    for col in results_df.columns:
+        results_df[col] = results_df[col].apply(lambda x: "N/a" if str(x).strip() == "" else x)
+    return results_df
+
+
+def new_merge_stage(all_dataframes):
+    return build_results_table(merge_category_tables(all_dataframes))
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Đo thời gian bước ghép bảng của b1.py theo số lượng cầu thủ")
+    parser.add_argument("--rows", type=int, nargs="+", default=[500, 5000, 50000, 500000])
+    parser.add_argument("--legacy-max", type=int, default=50000, help="Chỉ chạy bản cũ đến kích thước này")
+    parser.add_argument("--transfer-rate", type=float, default=0.01, help="Tỉ lệ cầu thủ có nhiều dòng (chuyển đội giữa mùa)")
+    args = parser.parse_args()
+
+    # Khi mỗi cầu thủ chỉ có một dòng, hai cách làm phải cho ra cùng một bảng.
+    check_tables = make_category_tables(2000)
+    pd.testing.assert_frame_equal(legacy_merge_stage(check_tables).reset_index(drop=True),
+                                  new_merge_stage(check_tables).reset_index(drop=True), check_dtype=False)
+
+    print(f"{'rows':>8} {'legacy s':>10} {'new s':>10} {'speedup':>8}")
+    for n_rows in args.rows:
+        tables = make_category_tables(n_rows, transfer_rate=args.transfer_rate)
+        new_df, t_new = timed(new_merge_stage, tables)
+        if n_rows <= args.legacy_max:
+            old_df, t_old = timed(legacy_merge_stage, tables)
+            print(f"{n_rows:>8} {t_old:>10.3f} {t_new:>10.3f} {t_old / t_new:>7.1f}x")
+        else:
+            print(f"{n_rows:>8} {'-':>10} {t_new:>10.3f} {'-':>8}")
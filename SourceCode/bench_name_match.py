@@ -0,0 +1,77 @@
+import argparse
+import time
+
+import numpy as np
+
+from name_matcher import DEFAULT_MIN_SCORE, NameIndex, fold_name, name_similarity
+from synthetic_data import make_player_names
+
+
+def perturb(name, rng):
+    # Các kiểu khác biệt thường gặp giữa FBref và footballtransfers.
+    kind = rng.integers(0, 5)
+    first, _, rest = name.partition(' ')
+    if kind == 0:
+        return fold_name(name).title(), "accents"
+    if kind == 1:
+        return f"{rest} {first}", "order"
+    if kind == 2:
+        return f"{first[0]}. {rest}", "initial"
+    if kind == 3:
+        pos = rng.integers(len(first) + 2, len(name))
+        return name[:pos] + name[pos + 1:], "typo"
+    return name, "exact"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Đo tốc độ và độ chính xác của NameIndex ở quy mô lớn")
+    parser.add_argument("--names", type=int, default=100000, help="Số tên trong chỉ mục")
+    parser.add_argument("--queries", type=int, default=100000, help="Số tên truy vấn")
+    parser.add_argument("--unknown-rate", type=float, default=0.1, help="Tỉ lệ truy vấn không có trong chỉ mục")
+    parser.add_argument("--naive-queries", type=int, default=20, help="Số truy vấn dùng để ước lượng cách so sánh toàn bộ")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    names = make_player_names(args.names + args.queries, seed=0)
+    indexed, extra = names[:args.names], names[args.names:]
+    teams = [f"Team {i}" for i in rng.integers(0, 500, args.names)]
+
+    start = time.perf_counter()
+    index = NameIndex(indexed, teams=teams)
+    build_seconds = time.perf_counter() - start
+
+    queries, expected, kinds = [], [], []
+    for i in range(args.queries):
+        if rng.random() < args.unknown_rate:
+            queries.append(extra[i])
+            expected.append(-1)
+            kinds.append("unknown")
+        else:
+            target = int(rng.integers(0, args.names))
+            query, kind = perturb(indexed[target], rng)
+            queries.append(query)
+            expected.append(target)
+            kinds.append(kind)
+
+    start = time.perf_counter()
+    matches = index.match_many(queries, min_score=DEFAULT_MIN_SCORE)
+    query_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for query in queries[:args.naive_queries]:
+        folded = fold_name(query)
+        max(range(len(index)), key=lambda idx: name_similarity(folded, index.folded[idx]))
+    naive_per_query = (time.perf_counter() - start) / max(1, args.naive_queries)
+
+    found = matches['match_index'].to_numpy()
+    expected = np.asarray(expected)
+    kinds = np.asarray(kinds)
+    print(f"Chỉ mục {args.names} tên: dựng trong {build_seconds:.1f}s")
+    print(f"{args.queries} truy vấn: {query_seconds:.1f}s ({query_seconds / args.queries * 1e3:.2f} ms/truy vấn)")
+    print(f"So sánh toàn bộ (ước lượng): {naive_per_query * 1e3:.0f} ms/truy vấn, "
+          f"~{naive_per_query * args.queries / 3600:.1f} giờ cho {args.queries} truy vấn")
+    print(f"{'loại':>8} {'số lượng':>9} {'đúng':>7}")
+    for kind in ["exact", "accents", "order", "initial", "typo", "unknown"]:
+        mask = kinds == kind
+        if mask.any():
+            print(f"{kind:>8} {mask.sum():>9} {(found[mask] == expected[mask]).mean():>7.1%}")
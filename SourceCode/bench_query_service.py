@@ -0,0 +1,190 @@
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from stats_loader import RESULTS_CSV, load_results
+from synthetic_data import make_results_frame
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE = os.path.join(SOURCE_DIR, "query_service.py")
+# Tỉ lệ các loại truy vấn trong tải giả lập.
+QUERY_MIX = [("player", 0.4), ("team", 0.2), ("top", 0.3), ("aggregate", 0.1)]
+
+
+def write_synthetic_outputs(workdir, rows):
+    # results.csv tổng hợp cùng results2.csv và file giá trị chuyển nhượng tương ứng, như sau khi chạy pipeline.
+    from b2 import compute_group_statistics, identify_statistic_columns
+
+    make_results_frame(rows).to_csv(os.path.join(workdir, RESULTS_CSV), index=False, na_rep="N/a", encoding="utf-8-sig")
+    df = load_results(csv_path=os.path.join(workdir, RESULTS_CSV), typed_path="")
+    os.makedirs(os.path.join(workdir, "bai2_results"))
+    stat_cols = identify_statistic_columns(df, exclude_cols=['Player', 'Nation', 'Squad', 'Position'])
+    compute_group_statistics(df, stat_cols, 'Squad').to_csv(os.path.join(workdir, "bai2_results", "results2.csv"),
+                                                            index=False, encoding="utf-8-sig")
+    transfers = df[['Player', 'Squad']].rename(columns={'Squad': 'Team'}).iloc[::2].copy()
+    transfers['ETV'] = [f"€{value:.1f}M" for value in np.random.default_rng(0).uniform(0.5, 120, len(transfers))]
+    transfers.to_csv(os.path.join(workdir, "player_transfer_values.csv"), index=False, encoding="utf-8-sig")
+
+
+def make_queries(workdir, n_distinct, seed=0):
+    # Đường dẫn truy vấn (không trùng nhau) lấy từ dữ liệu thật trong thư mục: tên cầu thủ, đội, chỉ số, vị trí.
+    df = load_results(csv_path=os.path.join(workdir, RESULTS_CSV), typed_path="")
+    rng = np.random.default_rng(seed)
+    players = df['Player'].dropna().unique()
+    teams = df['Squad'].dropna().unique()
+    positions = sorted({token for text in df['Position'].dropna() for token in str(text).split(',')})
+    stats = [col for col in df.columns if col not in ('Player', 'Nation', 'Squad', 'Position')
+             and pd.api.types.is_numeric_dtype(df[col]) and df[col].notna().any()]
+    kinds, weights = zip(*QUERY_MIX)
+    queries = set()
+    for _ in range(n_distinct * 20):
+        if len(queries) >= n_distinct:
+            break
+        kind = kinds[rng.choice(len(kinds), p=weights)]
+        if kind == "player":
+            params = {"name": rng.choice(players)}
+        elif kind == "team":
+            params = {"name": rng.choice(teams)}
+        elif kind == "top":
+            params = {"stat": rng.choice(stats), "n": int(rng.choice([3, 5, 10]))}
+            if rng.random() < 0.5:
+                params["position"] = rng.choice(positions)
+            if rng.random() < 0.3:
+                params["team"] = rng.choice(teams)
+        else:
+            params = {"by": rng.choice(["team", "position"]), "stat": ",".join(rng.choice(stats, 3, replace=False))}
+        queries.add(f"/{kind}?{urlencode(params)}")
+    return sorted(queries)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/status")
+            return json.loads(connection.getresponse().read())
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server không phản hồi sau {timeout}s")
+
+
+def run_load(port, paths, concurrency):
+    # Mỗi luồng client giữ một kết nối HTTP/1.1 và lần lượt gửi phần việc của mình.
+    latencies = [[] for _ in range(concurrency)]
+    outcomes = [{"errors": 0, "hits": 0} for _ in range(concurrency)]
+
+    def client(worker):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        for path in paths[worker::concurrency]:
+            start = time.perf_counter()
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            latencies[worker].append(time.perf_counter() - start)
+            if response.status >= 500:
+                outcomes[worker]["errors"] += 1
+            if response.getheader("X-Cache") == "HIT":
+                outcomes[worker]["hits"] += 1
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(worker,)) for worker in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    flat = np.asarray([value for values in latencies for value in values])
+    return {"requests": len(flat), "seconds": round(seconds, 3), "throughput_rps": round(len(flat) / seconds, 1),
+            "p50_ms": round(float(np.percentile(flat, 50)) * 1e3, 3), "p99_ms": round(float(np.percentile(flat, 99)) * 1e3, 3),
+            "mean_ms": round(float(flat.mean()) * 1e3, 3), "errors": sum(item["errors"] for item in outcomes),
+            "cache_hit_rate": round(sum(item["hits"] for item in outcomes) / max(1, len(flat)), 3)}
+
+
+def pandas_baseline(workdir, paths, repeat):
+    # Cách làm hiện nay: mỗi câu hỏi đọc lại results.csv rồi lọc bằng pandas.
+    timings = []
+    for path in paths[:repeat]:
+        url = urlsplit(path)
+        params = dict(parse_qsl(url.query))
+        start = time.perf_counter()
+        df = load_results(csv_path=os.path.join(workdir, RESULTS_CSV), typed_path="")
+        if url.path in ("/player", "/team"):
+            df[df['Player' if url.path == "/player" else 'Squad'] == params["name"]].to_dict("records")
+        elif url.path == "/top":
+            if "position" in params:
+                df = df[df['Position'].str.contains(params["position"], regex=False, na=False)]
+            if "team" in params:
+                df = df[df['Squad'] == params["team"]]
+            df.nlargest(int(params["n"]), params["stat"]).to_dict("records")
+        else:
+            df.groupby(df['Squad' if params["by"] == "team" else 'Position'])[params["stat"].split(",")].agg(
+                ["median", "mean", "std"])
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings) * 1e3, 2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kiểm tra tải query_service.py: độ trễ p50/p99 và thông lượng")
+    parser.add_argument("--data-dir", default=None, help="Thư mục có sẵn results.csv (mặc định: sinh dữ liệu tổng hợp)")
+    parser.add_argument("--rows", type=int, default=2500, help="Số cầu thủ trong dữ liệu tổng hợp")
+    parser.add_argument("--requests", type=int, default=20000, help="Số request ở pha cache nóng")
+    parser.add_argument("--distinct", type=int, default=1000, help="Số truy vấn khác nhau")
+    parser.add_argument("--concurrency", type=int, default=8, help="Số client đồng thời")
+    parser.add_argument("--output", default=None, help="Ghi kết quả ra file JSON")
+    args = parser.parse_args()
+
+    workdir = os.path.abspath(args.data_dir) if args.data_dir else tempfile.mkdtemp(prefix="bench_query_")
+    if not args.data_dir:
+        write_synthetic_outputs(workdir, args.rows)
+    port = free_port()
+    server = subprocess.Popen([sys.executable, SERVICE, "--port", str(port)], cwd=workdir,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        status = wait_for_server(port)
+        paths = make_queries(workdir, args.distinct)
+        rng = np.random.default_rng(1)
+        # Pha lạnh: mỗi truy vấn một lần, mọi request đều phải tính. Pha nóng: lặp lại các truy vấn đó
+        # theo phân phối lệch (vài truy vấn được hỏi rất thường xuyên), phần lớn trả từ cache.
+        cold = run_load(port, paths, args.concurrency)
+        popularity = 1.0 / np.arange(1, len(paths) + 1)
+        warm_paths = [paths[i] for i in rng.choice(len(paths), args.requests, p=popularity / popularity.sum())]
+        warm = run_load(port, warm_paths, args.concurrency)
+        baseline_ms = pandas_baseline(workdir, paths, 10)
+    finally:
+        server.terminate()
+        server.wait()
+        if not args.data_dir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"Dữ liệu: {status['rows']} dòng, {status['teams']} đội; {len(paths)} truy vấn khác nhau, "
+          f"{args.concurrency} client đồng thời")
+    print(f"{'pha':<6} {'request':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'cache hit':>10} {'lỗi':>5}")
+    for name, result in (("lạnh", cold), ("nóng", warm)):
+        print(f"{name:<6} {result['requests']:>8} {result['throughput_rps']:>8.0f} {result['p50_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {result['cache_hit_rate']:>10.1%} {result['errors']:>5}")
+    print(f"Đọc lại results.csv và lọc bằng pandas: {baseline_ms:.1f} ms/truy vấn")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"rows": status["rows"], "distinct": len(paths), "concurrency": args.concurrency,
+                       "cold": cold, "warm": warm, "pandas_baseline_ms": baseline_ms}, f, ensure_ascii=False, indent=1)
@@ -0,0 +1,45 @@
+import argparse
+import time
+import tracemalloc
+
+from sklearn.datasets import make_blobs
+from sklearn.metrics import silhouette_score
+
+from column_schema import stat_columns
+from silhouette_eval import DEFAULT_MEMORY_MB, DEFAULT_SAMPLE_SIZE, evaluate_silhouette
+
+
+def measure(fn, *args, **kwargs):
+    # Trả về (kết quả, thời gian giây, bộ nhớ đỉnh MB theo tracemalloc).
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Đo thời gian và bộ nhớ của các cách tính Silhouette theo số cầu thủ")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000, 200000])
+    parser.add_argument("--clusters", type=int, default=6)
+    parser.add_argument("--sklearn-max", type=int, default=10000, help="Chỉ chạy silhouette_score của sklearn đến kích thước này")
+    parser.add_argument("--exact-max", type=int, default=50000, help="Chỉ chạy chế độ exact đến kích thước này")
+    parser.add_argument("--sample-size", type=int, default=DEFAULT_SAMPLE_SIZE)
+    parser.add_argument("--memory-mb", type=float, default=DEFAULT_MEMORY_MB)
+    args = parser.parse_args()
+
+    n_features = len(stat_columns())
+    print(f"{'rows':>8} {'mode':>8} {'seconds':>9} {'peak MB':>9} {'score':>8} {'95% CI':>19}")
+    for n_rows in args.rows:
+        X, labels = make_blobs(n_samples=n_rows, n_features=n_features, centers=args.clusters, cluster_std=6.0, random_state=0)
+        if n_rows <= args.sklearn_max:
+            score, elapsed, peak = measure(silhouette_score, X, labels)
+            print(f"{n_rows:>8} {'sklearn':>8} {elapsed:>9.2f} {peak:>9.1f} {score:>8.4f} {'-':>19}")
+        modes = ["exact", "sample"] if n_rows <= args.exact_max else ["sample"]
+        for mode in modes:
+            info, elapsed, peak = measure(evaluate_silhouette, X, labels, mode=mode,
+                                          sample_size=args.sample_size, memory_mb=args.memory_mb)
+            interval = f"[{info['ci_low']:.4f}, {info['ci_high']:.4f}]"
+            print(f"{n_rows:>8} {mode:>8} {elapsed:>9.2f} {peak:>9.1f} {info['score']:>8.4f} {interval:>19}")
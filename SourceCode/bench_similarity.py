@@ -0,0 +1,87 @@
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from column_schema import stat_columns
+from similarity_index import SimilarityIndex, load_similarity_index
+from stats_loader import float64_values, to_typed_frame
+from synthetic_data import make_results_frame
+
+
+def scaled_features(df):
+    # Cùng tiền xử lý với b3.py (điền trung bình, chuẩn hóa), viết bằng NumPy để không phải nạp sklearn.
+    cols = [col for col in stat_columns() if col in df.columns and df[col].notna().any()]
+    X = float64_values(df, cols).to_numpy()
+    mean = np.nanmean(X, axis=0)
+    X = np.where(np.isnan(X), mean, X)
+    std = X.std(axis=0)
+    return pd.DataFrame((X - mean) / np.where(std > 0, std, 1.0), columns=cols, index=df.index)
+
+
+def naive_neighbours(df_scaled, info, row, k, position=None):
+    # Cách làm thủ công hiện nay: quét toàn bộ bảng bằng pandas cho mỗi câu hỏi.
+    distances = np.sqrt(((df_scaled - df_scaled.iloc[row]) ** 2).sum(axis=1))
+    distances = distances.drop(df_scaled.index[row])
+    if position is not None:
+        distances = distances[info['Position'].loc[distances.index].str.contains(position, regex=False)]
+    return distances.nsmallest(k)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Đo tốc độ tìm cầu thủ tương tự (một truy vấn và theo lô)")
+    parser.add_argument("--players", type=int, default=20000, help="Số dòng trong chỉ mục")
+    parser.add_argument("--queries", type=int, default=5000, help="Số truy vấn cho phép đo theo lô")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--naive-queries", type=int, default=20, help="Số truy vấn dùng để đo cách quét bằng pandas")
+    args = parser.parse_args()
+
+    df = to_typed_frame(make_results_frame(args.players))
+    df_scaled = scaled_features(df)
+    start = time.perf_counter()
+    index = SimilarityIndex.from_frame(df_scaled, df)
+    build_seconds = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "similarity_index.npz")
+        index.save(path)
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        start = time.perf_counter()
+        index = load_similarity_index(path)
+        load_seconds = time.perf_counter() - start
+
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, len(index), args.queries)
+    single = []
+    for row in rows[:1000]:
+        start = time.perf_counter()
+        index.search(index.X[row], args.k, exclude=[[row]])
+        single.append(time.perf_counter() - start)
+    single_filtered = []
+    for row in rows[:1000]:
+        start = time.perf_counter()
+        index.search(index.X[row], args.k, positions=["FW"], exclude=[[row]])
+        single_filtered.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    index.search(index.X[rows], args.k, exclude=[[row] for row in rows])
+    batch_seconds = time.perf_counter() - start
+
+    # Kết quả phải trùng với cách quét bằng pandas (cùng tập cầu thủ, khoảng cách lệch < 1e-4 do float32).
+    mismatches = 0
+    start = time.perf_counter()
+    for row in rows[:args.naive_queries]:
+        expected = naive_neighbours(df_scaled, index.info.set_axis(df_scaled.index), row, args.k, position="FW")
+        _, got_distances = index.search(index.X[row], args.k, positions=["FW"], exclude=[[row]])
+        if not np.allclose(np.sort(got_distances[0]), expected.to_numpy(), atol=1e-4):
+            mismatches += 1
+    naive_per_query = (time.perf_counter() - start) / max(1, args.naive_queries)
+
+    print(f"Chỉ mục {len(index)} dòng x {len(index.columns)} chỉ số: dựng {build_seconds * 1e3:.0f} ms, "
+          f"file {size_mb:.1f} MB, nạp {load_seconds * 1e3:.0f} ms")
+    print(f"Một truy vấn: trung vị {np.median(single) * 1e3:.3f} ms, p99 {np.percentile(single, 99) * 1e3:.3f} ms")
+    print(f"Một truy vấn lọc vị trí FW: trung vị {np.median(single_filtered) * 1e3:.3f} ms")
+    print(f"Theo lô {args.queries} truy vấn: {batch_seconds:.2f}s ({args.queries / batch_seconds:.0f} truy vấn/giây)")
+    print(f"Quét bằng pandas: {naive_per_query * 1e3:.1f} ms/truy vấn; "
+          f"{mismatches}/{min(args.naive_queries, len(rows))} truy vấn khác kết quả")
@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic_data import make_results_frame
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+CLI = os.path.join(SOURCE_DIR, "cli.py")
+HEAVY_MODULES = ["numpy", "pandas", "pyarrow", "sklearn", "scipy", "joblib", "matplotlib", "seaborn",
+                 "selenium", "webdriver_manager", "bs4", "aiohttp"]
+PLOTTING_MODULES = {"matplotlib", "seaborn"}
+# (tên, tham số của cli.py). "--help" đo đúng chi phí import của lệnh; các lệnh còn lại chạy thật
+# trên results.csv tổng hợp (hoặc cache rỗng với --offline) trong một thư mục tạm.
+CASES = [
+    ("python", None),
+    ("scrape --help", ["scrape", "--help"]),
+    ("stats --help", ["stats", "--help"]),
+    ("cluster --help", ["cluster", "--help"]),
+    ("transfers --help", ["transfers", "--help"]),
+    ("scrape --offline", ["scrape", "--offline", "--cache-dir", "empty_cache"]),
+    ("transfers --offline", ["transfers", "--offline", "--cache-dir", "empty_cache"]),
+    ("stats --no-plots", ["stats", "--no-plots"]),
+    ("stats", ["stats"]),
+    ("cluster --no-plots", ["cluster", "--no-plots", "--jobs", "1", "--k-max", "4"]),
+    ("cluster", ["cluster", "--jobs", "1", "--k-max", "4"]),
+]
+
+
+def command_for(cli_args, importtime=False):
+    python = [sys.executable] + (["-X", "importtime"] if importtime else [])
+    return python + (["-c", "pass"] if cli_args is None else [CLI] + cli_args)
+
+
+def imported_heavy_modules(cli_args, workdir, env):
+    # -X importtime ghi mọi module được import ra stderr: "import time: self | cumulative | tên".
+    result = subprocess.run(command_for(cli_args, importtime=True), cwd=workdir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            loaded.add(line.rsplit("|", 1)[1].strip().split(".")[0])
+    return [name for name in HEAVY_MODULES if name in loaded]
+
+
+def time_command(cli_args, workdir, env, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command_for(cli_args), cwd=workdir, env=env, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, check=cli_args is None)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Đo thời gian khởi động (cold start) của từng lệnh trong cli.py")
+    parser.add_argument("--repeat", type=int, default=5, help="Số lần chạy mỗi lệnh, báo cáo trung vị")
+    parser.add_argument("--rows", type=int, default=500, help="Số cầu thủ trong results.csv tổng hợp")
+    parser.add_argument("--cases", nargs="+", default=None, help="Chỉ chạy các trường hợp có tên bắt đầu bằng chuỗi này")
+    parser.add_argument("--output", default=None, help="Ghi kết quả ra file JSON")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_startup_")
+    make_results_frame(args.rows).to_csv(os.path.join(workdir, "results.csv"), index=False, na_rep="N/a",
+                                         encoding="utf-8-sig")
+    env = dict(os.environ, MPLBACKEND="Agg", PYTHONDONTWRITEBYTECODE="1")
+    cases = [(name, cli_args) for name, cli_args in CASES
+             if args.cases is None or any(name.startswith(prefix) for prefix in args.cases)]
+    results = []
+    print(f"{'lệnh':<22} {'median s':>9} {'min s':>7}  module nặng đã import")
+    try:
+        for name, cli_args in cases:
+            # Lần chạy -X importtime cũng làm nóng cache đĩa, nên các lần đo sau không tính chi phí đọc file lần đầu.
+            heavy = imported_heavy_modules(cli_args, workdir, env)
+            timings = time_command(cli_args, workdir, env, args.repeat)
+            results.append({"name": name, "median_seconds": round(statistics.median(timings), 4),
+                            "min_seconds": round(min(timings), 4), "heavy_modules": heavy})
+            warning = " <- nạp thư viện vẽ dù không cần" if "--no-plots" in name and PLOTTING_MODULES & set(heavy) else ""
+            print(f"{name:<22} {statistics.median(timings):>9.3f} {min(timings):>7.3f}  {', '.join(heavy) or '-'}{warning}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "rows": args.rows, "repeat": args.repeat, "results": results},
+                      f, ensure_ascii=False, indent=1)
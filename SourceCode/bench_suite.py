@@ -0,0 +1,180 @@
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+
+from synthetic_data import make_category_tables, make_fbref_pages, make_player_names, make_results_frame, make_transfers_page
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA_DIR = "bench_data"
+DEFAULT_RESULTS_DIR = "bench_results"
+# Giới hạn kích thước cho các bước phải dựng HTML trong bộ nhớ, để bộ benchmark chạy được trên máy thường.
+CASES = {
+    "extract_fbref": {"max_size": 50000},
+    "b1_merge": {"max_size": 1000000},
+    "b2_main": {"max_size": 1000000},
+    "b3_main": {"max_size": 1000000},
+    "b4_extract": {"max_size": 200000},
+}
+
+
+def load_b4():
+    # Tên file "b4 - y1.py" có khoảng trắng nên không import trực tiếp được.
+    spec = importlib.util.spec_from_file_location("b4_y1", os.path.join(SOURCE_DIR, "b4 - y1.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def results_csv_for(size, data_dir):
+    # results.csv tổng hợp được ghi một lần cho mỗi kích thước rồi dùng lại giữa các lần chạy.
+    path = os.path.join(os.path.abspath(data_dir), f"results_{size}", "results.csv")
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        make_results_frame(size).to_csv(f"{path}.tmp", index=False, na_rep="N/a", encoding="utf-8-sig")
+        os.replace(f"{path}.tmp", path)
+    return path
+
+
+def prepare_case(name, size, data_dir, k_max):
+    # Trả về hàm cần đo; phần sinh dữ liệu nằm ngoài thời gian đo.
+    if name == "extract_fbref":
+        from b1 import extract_table_from_html_fbref
+        pages = make_fbref_pages(size)
+        return lambda: [extract_table_from_html_fbref(html, f"stats_{category}") for category, html in pages.items()]
+    if name == "b1_merge":
+        from b1 import build_results_table, merge_category_tables
+        tables = make_category_tables(size)
+        return lambda: build_results_table(merge_category_tables(tables))
+    if name == "b4_extract":
+        b4 = load_b4()
+        players = make_player_names(size)
+        page = make_transfers_page(players, [f"Team {i % 20}" for i in range(size)])
+        return lambda: b4.extract_data_using_confirmed_selectors(page, "synthetic")
+    if name in ("b2_main", "b3_main"):
+        csv_path = results_csv_for(size, data_dir)
+        # Thư mục chạy được tạo mới mỗi lần, để cache biểu đồ/kết quả của lần trước không làm sai phép đo.
+        workdir = os.path.join(os.path.dirname(csv_path), f"run_{name}")
+        shutil.rmtree(workdir, ignore_errors=True)
+        os.makedirs(workdir)
+        try:
+            os.link(csv_path, os.path.join(workdir, "results.csv"))
+        except OSError:
+            shutil.copyfile(csv_path, os.path.join(workdir, "results.csv"))
+        os.chdir(workdir)
+        if name == "b2_main":
+            from b2 import main_exercise_2
+            return lambda: main_exercise_2()
+        from b3 import main_exercise_3
+        return lambda: main_exercise_3(k_range=range(2, k_max + 1))
+    raise ValueError(f"Không có benchmark '{name}'")
+
+
+def run_case(name, size, data_dir, k_max):
+    fn = prepare_case(name, size, data_dir, k_max)
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        fn()
+        seconds = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"name": name, "size": size, "seconds": round(seconds, 4),
+            "peak_rss_mb": round(peak_rss / 1024, 1), "rss_growth_mb": round((peak_rss - baseline_rss) / 1024, 1)}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=SOURCE_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(cases, sizes, data_dir, k_max, timeout):
+    # Mỗi trường hợp chạy trong một tiến trình riêng để thời gian và bộ nhớ đỉnh không ảnh hưởng lẫn nhau.
+    results = []
+    for size in sizes:
+        for name in cases:
+            if size > CASES[name]["max_size"]:
+                continue
+            command = [sys.executable, os.path.abspath(__file__), "--run-case", name, str(size),
+                       "--data-dir", os.path.abspath(data_dir), "--k-max", str(k_max)]
+            env = dict(os.environ, MPLBACKEND="Agg")
+            try:
+                output = subprocess.run(command, capture_output=True, text=True, timeout=timeout, env=env)
+            except subprocess.TimeoutExpired:
+                print(f"{name:>14} {size:>8} hết thời gian ({timeout}s)")
+                results.append({"name": name, "size": size, "error": "timeout"})
+                continue
+            if output.returncode != 0:
+                print(f"{name:>14} {size:>8} lỗi: {output.stderr.strip().splitlines()[-1:]}")
+                results.append({"name": name, "size": size, "error": output.stderr.strip()[-500:]})
+                continue
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            print(f"{name:>14} {size:>8} {result['seconds']:>9.3f}s {result['peak_rss_mb']:>9.1f} MB")
+            results.append(result)
+    return results
+
+
+def compare(base_path, new_path, threshold, min_seconds):
+    # Đánh dấu hồi quy khi thời gian mới chậm hơn bản cũ quá `threshold` (tỉ lệ), bỏ qua các phép đo quá ngắn.
+    with open(base_path, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    base_results = {(r["name"], r["size"]): r for r in base["results"] if "seconds" in r}
+    regressions = []
+    print(f"So sánh {base.get('revision')} -> {new.get('revision')}")
+    print(f"{'benchmark':>14} {'size':>8} {'cũ s':>9} {'mới s':>9} {'tỉ lệ':>7}")
+    for result in new["results"]:
+        key = (result["name"], result["size"])
+        if key not in base_results or "seconds" not in result:
+            continue
+        old_seconds, new_seconds = base_results[key]["seconds"], result["seconds"]
+        ratio = new_seconds / old_seconds if old_seconds else float("inf")
+        flag = ""
+        if ratio > 1 + threshold and max(old_seconds, new_seconds) >= min_seconds:
+            flag = "  HỒI QUY"
+            regressions.append(key)
+        print(f"{key[0]:>14} {key[1]:>8} {old_seconds:>9.3f} {new_seconds:>9.3f} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bộ benchmark trên dữ liệu tổng hợp: trích xuất HTML, ghép bảng, b2, b3, b4")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 5000, 50000], help="Số cầu thủ (500 đến 1000000)")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="Thư mục lưu results.csv tổng hợp để dùng lại")
+    parser.add_argument("--output", default=None, help="File JSON kết quả (mặc định: bench_results/<commit>.json)")
+    parser.add_argument("--k-max", type=int, default=6, help="k lớn nhất cho b3")
+    parser.add_argument("--timeout", type=int, default=3600, help="Thời gian tối đa cho mỗi trường hợp (giây)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="So sánh hai file kết quả JSON")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Chậm hơn quá tỉ lệ này thì coi là hồi quy")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="Bỏ qua các phép đo ngắn hơn mức này khi so sánh")
+    parser.add_argument("--run-case", nargs=2, metavar=("NAME", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case[0], int(args.run_case[1]), args.data_dir, args.k_max)))
+        sys.exit(0)
+    if args.compare:
+        sys.exit(1 if compare(args.compare[0], args.compare[1], args.threshold, args.min_seconds) else 0)
+
+    revision = git_revision()
+    results = run_suite(args.cases, args.sizes, args.data_dir, args.k_max, args.timeout)
+    payload = {"revision": revision, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "python": platform.python_version(), "machine": platform.machine(), "cpu_count": os.cpu_count(),
+               "results": results}
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, f"{revision or time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=1)
+    print(f"Đã lưu kết quả vào {output}")
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+CHANGESET_FILE = "results_changes.json"
+
+
+def file_sha256(path):
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def row_fingerprints(df, keys=('Player',)):
+    # Một giá trị hash 64-bit cho mỗi dòng, tính trên toàn bộ các cột ở dạng chuỗi, đánh chỉ số theo các cột khóa.
+    keys = list(keys)
+    hashes = pd.util.hash_pandas_object(df.astype(str), index=False)
+    index = pd.MultiIndex.from_frame(df[keys].astype(str))
+    duplicated = index[index.duplicated()].unique()
+    if len(duplicated):
+        sample = ", ".join(" / ".join(key) for key in duplicated[:3])
+        raise ValueError(f"Khóa {' + '.join(keys)} bị trùng ở {len(duplicated)} dòng (ví dụ: {sample}), "
+                         f"không so sánh được hai bảng.")
+    return pd.Series(hashes.values, index=index)
+
+
+def diff_results(old_df, new_df, key='Player', team_column='Squad'):
+    # Dòng được xác định bằng (cầu thủ, đội): hai cầu thủ trùng tên, hoặc một cầu thủ chuyển đội giữa mùa,
+    # có nhiều dòng trong results.csv. Các danh sách trả về là tên cầu thủ; "teams" gồm đội cũ và mới.
+    keys = [key, team_column] if team_column in old_df.columns and team_column in new_df.columns else [key]
+    old_fp = row_fingerprints(old_df, keys)
+    new_fp = row_fingerprints(new_df, keys)
+    added = new_fp.index.difference(old_fp.index)
+    removed = old_fp.index.difference(new_fp.index)
+    common = new_fp.index.intersection(old_fp.index)
+    changed = common[old_fp.loc[common].values != new_fp.loc[common].values]
+
+    teams = set()
+    if len(keys) > 1:
+        for index in (added, removed, changed):
+            teams.update(team for team in index.get_level_values(1) if team not in ("", "nan", "N/a"))
+    return {
+        "added": sorted(set(added.get_level_values(0))),
+        "changed": sorted(set(changed.get_level_values(0))),
+        "removed": sorted(set(removed.get_level_values(0))),
+        "teams": sorted(teams),
+    }
+
+
+def is_empty_changeset(changeset):
+    return not (changeset["added"] or changeset["changed"] or changeset["removed"])
+
+
+def write_changeset(changeset, base_sha256, results_sha256, path=CHANGESET_FILE):
+    # base_sha256/results_sha256 cho phép bước sau kiểm tra changeset có khớp với
+    # phiên bản results.csv mà nó đã xử lý lần trước hay không.
+    payload = dict(changeset, base_sha256=base_sha256, results_sha256=results_sha256,
+                   created_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=1)
+
+
+def read_changeset(path=CHANGESET_FILE):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def usable_changeset(results_path, processed_sha256, path=CHANGESET_FILE):
+    # Chỉ dùng changeset khi nó nối tiếp đúng phiên bản results.csv mà bước sau đã xử lý.
+    changeset = read_changeset(path)
+    if not changeset or processed_sha256 is None:
+        return None
+    if changeset.get("base_sha256") != processed_sha256:
+        return None
+    if changeset.get("results_sha256") != file_sha256(results_path):
+        return None
+    return changeset
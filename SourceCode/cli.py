@@ -0,0 +1,37 @@
+import argparse
+import importlib
+
+import stage_args
+
+# Mỗi lệnh con ứng với một script của bài tập. Module chỉ được import khi lệnh đó được gọi, nên
+# "cli.py stats --no-plots" không nạp Selenium, sklearn hay matplotlib. Tham số được kiểm tra trước bằng
+# bộ phân tích trong stage_args: --help và lỗi tham số không phải nạp pandas/NumPy của script.
+COMMANDS = {
+    "scrape": ("b1", stage_args.scrape_parser, "Thu thập thống kê cầu thủ từ FBref (Bài 1)"),
+    "stats": ("b2", stage_args.stats_parser, "Top N, thống kê theo đội và histogram (Bài 2)"),
+    "cluster": ("b3", stage_args.cluster_parser, "Phân cụm K-means và PCA (Bài 3)"),
+    "transfers": ("b4 - y1", stage_args.transfers_parser, "Giá trị chuyển nhượng từ footballtransfers.com (Bài 4)"),
+    "similar": ("similarity_index", stage_args.similar_parser, "Tìm cầu thủ có lối chơi giống nhất (chỉ mục do lệnh cluster tạo)"),
+    "serve": ("query_service", stage_args.serve_parser, "Server HTTP/JSON cục bộ tra cứu kết quả của các bài"),
+}
+
+
+def load_command(name):
+    return importlib.import_module(COMMANDS[name][0])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="cli.py", description="Chạy các bước thu thập và phân tích dữ liệu cầu thủ",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="Các lệnh:\n" + "\n".join(f"  {name:<10} {help_text}" for name, (_, _, help_text) in COMMANDS.items()))
+    parser.add_argument("command", choices=list(COMMANDS), metavar="COMMAND", help="Một trong: " + ", ".join(COMMANDS))
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Tham số của lệnh (xem cli.py COMMAND --help)")
+    args = parser.parse_args(argv)
+    prog = f"{parser.prog} {args.command}"
+    COMMANDS[args.command][1](prog).parse_args(args.args)
+    load_command(args.command).main(args.args, prog=prog)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from column_schema import COLUMN_SCHEMA
+
+ARTIFACT_VERSION = 1
+DEFAULT_ARTIFACT = "bai3_results/cluster_model.joblib"
+
+
+class ArtifactMismatchError(ValueError):
+    pass
+
+
+def schema_signature(columns):
+    # Phần schema mà model phụ thuộc: thứ tự cột cùng kiểu và đơn vị của từng cột.
+    return [[col, COLUMN_SCHEMA[col].dtype, COLUMN_SCHEMA[col].unit] if col in COLUMN_SCHEMA else [col, None, None]
+            for col in columns]
+
+
+class ClusterModel:
+    # Toàn bộ pipeline đã fit của b3.py (imputer, scaler, KMeans, PCA) cùng danh sách cột.
+    # Dự đoán được tính trực tiếp bằng NumPy từ các tham số đã fit, không đi qua từng bước sklearn.
+    def __init__(self, columns, imputer, scaler, kmeans, pca):
+        self.columns = list(columns)
+        self.imputer = imputer
+        self.scaler = scaler
+        self.kmeans = kmeans
+        self.pca = pca
+        self._prepare()
+
+    def _prepare(self):
+        self._fill = np.asarray(self.imputer.statistics_, dtype="float64")
+        self._mean = np.asarray(self.scaler.mean_, dtype="float64")
+        self._scale = np.asarray(self.scaler.scale_, dtype="float64")
+        self._centers = np.asarray(self.kmeans.cluster_centers_, dtype="float64")
+        self._center_norms = np.einsum('ij,ij->i', self._centers, self._centers)
+        self._pca_mean = np.asarray(self.pca.mean_, dtype="float64")
+        self._components = np.asarray(self.pca.components_, dtype="float64")
+
+    def transform(self, df):
+        missing = [col for col in self.columns if col not in df.columns]
+        if missing:
+            raise ArtifactMismatchError(f"Thiếu {len(missing)} cột mà model cần: {missing[:5]}")
+        X = df[self.columns].to_numpy(dtype="float64", na_value=np.nan)
+        X = np.where(np.isnan(X), self._fill, X)
+        return (X - self._mean) / self._scale
+
+    def predict(self, df):
+        X = self.transform(df)
+        distances = self._center_norms - 2 * X @ self._centers.T
+        return distances.argmin(axis=1)
+
+    def project(self, df):
+        return (self.transform(df) - self._pca_mean) @ self._components.T
+
+    def predict_and_project(self, df):
+        X = self.transform(df)
+        labels = (self._center_norms - 2 * X @ self._centers.T).argmin(axis=1)
+        coords = (X - self._pca_mean) @ self._components.T
+        result = pd.DataFrame({'Cluster': labels, 'PC1': coords[:, 0], 'PC2': coords[:, 1]}, index=df.index)
+        if 'Player' in df.columns:
+            result.insert(0, 'Player', df['Player'])
+        return result
+
+    def save(self, path=DEFAULT_ARTIFACT):
+        import joblib
+        import sklearn
+
+        payload = {
+            "version": ARTIFACT_VERSION,
+            "sklearn_version": sklearn.__version__,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "columns": self.columns,
+            "schema": schema_signature(self.columns),
+            "imputer": self.imputer,
+            "scaler": self.scaler,
+            "kmeans": self.kmeans,
+            "pca": self.pca,
+        }
+        joblib.dump(payload, path)
+
+
+def load_cluster_model(path=DEFAULT_ARTIFACT):
+    # Từ chối artifact khác phiên bản hoặc được fit trên schema cột khác với COLUMN_SCHEMA hiện tại.
+    # joblib/sklearn chỉ được nạp khi đọc artifact; dự đoán sau đó chỉ dùng NumPy.
+    import joblib
+    import sklearn
+
+    payload = joblib.load(path)
+    if not isinstance(payload, dict) or payload.get("version") != ARTIFACT_VERSION:
+        raise ArtifactMismatchError(f"Artifact '{path}' không đúng phiên bản {ARTIFACT_VERSION}.")
+    if payload["schema"] != schema_signature(payload["columns"]):
+        raise ArtifactMismatchError(f"Schema cột của artifact '{path}' không khớp với COLUMN_SCHEMA hiện tại.")
+    if payload.get("sklearn_version") != sklearn.__version__:
+        print(f"Cảnh báo: artifact được tạo bằng scikit-learn {payload.get('sklearn_version')}, "
+              f"đang dùng {sklearn.__version__}.")
+    return ClusterModel(payload["columns"], payload["imputer"], payload["scaler"], payload["kmeans"], payload["pca"])
+
+
+if __name__ == "__main__":
+    from stats_loader import to_typed_frame
+
+    parser = argparse.ArgumentParser(description="Gán cụm và tọa độ PCA 2D cho cầu thủ mới bằng model đã lưu của b3.py")
+    parser.add_argument("input", help="File CSV cùng định dạng với results.csv")
+    parser.add_argument("--model", default=DEFAULT_ARTIFACT)
+    parser.add_argument("--output", default=None, help="Ghi kết quả ra CSV (mặc định: in ra màn hình)")
+    args = parser.parse_args()
+
+    model = load_cluster_model(args.model)
+    df_new = to_typed_frame(pd.read_csv(args.input, dtype=str, keep_default_na=False, encoding='utf-8-sig'))
+    start = time.perf_counter()
+    predictions = model.predict_and_project(df_new)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if args.output:
+        predictions.to_csv(args.output, index=False, encoding='utf-8-sig')
+    else:
+        print(predictions.to_string(index=False))
+    print(f"Đã gán cụm cho {len(predictions)} cầu thủ trong {elapsed_ms:.1f} ms")
@@ -0,0 +1,123 @@
+from collections import namedtuple
+
+# Mỗi cột đầu ra của results.csv: tên gốc trên FBref, tên trong CSV, kiểu dữ liệu,
+# đơn vị, có thể thiếu hay không và nhóm (bảng FBref) mà cột thuộc về.
+ColumnSpec = namedtuple('ColumnSpec', ['source', 'name', 'dtype', 'unit', 'nullable', 'category'])
+
+FBREF_TO_CSV_COLUMN_MAP = {
+    'player': 'Player', 'nationality': 'Nation', 'team': 'Squad', 'position': 'Position',
+    'age': 'Age', 'minutes': 'Minutes', 'games': 'Matches played', 'games_starts': 'Starts',
+    'goals': 'Goals', 'assists': 'Assists', 'cards_yellow': 'Yellow cards', 'cards_red': 'Red cards',
+    'xg': 'Expected: xG', 'xg_assist': 'Expected: xAG',
+    'progressive_carries': 'Progression: PrgC', 'progressive_passes': 'Progression: PrgP', 'progressive_passes_received': 'Progression: PrgR',
+    'goals_per90': 'Per 90: Gls', 'assists_per90': 'Per 90: Ast', 'xg_per90': 'Per 90: xG',
+    'gk_xg_against_per90': 'Per 90: xGA',
+    'gk_goals_against_per90': 'Performance: GA90', 'gk_save_pct': 'Performance: Save%', 'gk_clean_sheets_pct': 'Performance: CS%', 'gk_pens_save_pct': 'Penalty Kicks: Save%',
+    'shots_on_target_pct': 'Standard: SoT%', 'shots_on_target_per90': 'Standard: SoT/90', 'goals_per_shot': 'Standard: G/Sh', 'average_shot_distance': 'Standard: Dist',
+    'passes_completed': 'Total: Cmp', 'passes_pct': 'Total: Cmp%', 'passes_progressive_distance': 'Total: TotDist',
+    'passes_pct_short': 'Short: Cmp%', 'passes_pct_medium': 'Medium: Cmp%', 'passes_pct_long': 'Long: Cmp%',
+    'assisted_shots': 'Expected: KP', 'passes_into_final_third': 'Expected: 1/3', 'passes_into_penalty_area': 'Expected: PPA', 'crosses_into_penalty_area': 'Expected: CrsPA',
+    'sca': 'SCA', 'sca_per90': 'SCA90', 'gca': 'GCA', 'gca_per90': 'GCA90',
+    'tackles': 'Tackles: Tkl', 'tackles_won': 'Tackles: TklW',
+    'challenges_attempted': 'Challenges: Att', 'challenges_lost': 'Challenges: Lost',
+    'blocks': 'Blocks: Blocks', 'blocked_shots': 'Blocks: Sh', 'blocked_passes': 'Blocks: Pass', 'interceptions': 'Blocks: Int',
+    'touches': 'Touches: Touches', 'touches_def_pen_area': 'Touches: Def Pen', 'touches_def_3rd': 'Touches: Def 3rd',
+    'touches_mid_3rd': 'Touches: Mid 3rd', 'touches_att_3rd': 'Touches Att 3rd', 'touches_att_pen_area': 'Touches Att Pen',
+    'take_ons_attempted': 'TakeOns: Att', 'take_ons_successful_pct': 'TakeOns: Succ%', 'take_ons_tackled_pct': 'TakeOns: Tkld%',
+    'carries': 'Carries: Carries', 'carries_progressive_distance': 'Carries: PrgDist',
+    'carries_into_final_third': 'Carries: 1/3', 'carries_into_penalty_area': 'Carries: CPA',
+    'carries_miscontrols': 'Carries: Mis', 'carries_dispossessed': 'Carries: Dis',
+    'passes_received': 'Receiving: Rec', 'fouls': 'Performance: Fls', 'fouled': 'Performance: Fld', 'offsides': 'Performance: Off', 'crosses': 'Performance: Crs', 'ball_recoveries': 'Performance: Recov',
+    'aerials_won': 'Aerials: Won', 'aerials_lost': 'Aerials: Lost', 'aerials_won_pct': 'Aerials: Won%'
+}
+
+TEXT_SOURCES = ['player', 'nationality', 'team', 'position']
+
+CATEGORY_SOURCES = {
+    'identity': ['player', 'nationality', 'team', 'position', 'age', 'minutes', 'games', 'games_starts'],
+    'keepers': ['gk_xg_against_per90', 'gk_goals_against_per90', 'gk_save_pct', 'gk_clean_sheets_pct', 'gk_pens_save_pct'],
+    'shooting': ['shots_on_target_pct', 'shots_on_target_per90', 'goals_per_shot', 'average_shot_distance'],
+    'passing': ['passes_completed', 'passes_pct', 'passes_progressive_distance', 'passes_pct_short', 'passes_pct_medium',
+                'passes_pct_long', 'assisted_shots', 'passes_into_final_third', 'passes_into_penalty_area',
+                'crosses_into_penalty_area'],
+    'gca': ['sca', 'sca_per90', 'gca', 'gca_per90'],
+    'defense': ['tackles', 'tackles_won', 'challenges_attempted', 'challenges_lost', 'blocks', 'blocked_shots',
+                'blocked_passes', 'interceptions'],
+    'possession': ['touches', 'touches_def_pen_area', 'touches_def_3rd', 'touches_mid_3rd', 'touches_att_3rd',
+                   'touches_att_pen_area', 'take_ons_attempted', 'take_ons_successful_pct', 'take_ons_tackled_pct',
+                   'carries', 'carries_progressive_distance', 'carries_into_final_third', 'carries_into_penalty_area',
+                   'carries_miscontrols', 'carries_dispossessed', 'passes_received'],
+    'misc': ['fouls', 'fouled', 'offsides', 'crosses', 'ball_recoveries', 'aerials_won', 'aerials_lost', 'aerials_won_pct'],
+}
+
+UNIT_OVERRIDES = {
+    'age': 'years', 'minutes': 'minutes', 'xg': 'expected', 'xg_assist': 'expected', 'goals_per_shot': 'ratio',
+    'average_shot_distance': 'yards', 'passes_progressive_distance': 'yards', 'carries_progressive_distance': 'yards',
+}
+
+# Các cột luôn có giá trị; những cột còn lại có thể trống (ví dụ chỉ số riêng của thủ môn).
+REQUIRED_SOURCES = ['player', 'team', 'minutes', 'games']
+
+FLOAT_UNITS = ['percent', 'per90', 'expected', 'ratio', 'yards']
+
+
+def _unit_for(source):
+    if source in TEXT_SOURCES:
+        return None
+    if source in UNIT_OVERRIDES:
+        return UNIT_OVERRIDES[source]
+    if source.endswith('_pct') or '_pct_' in source:
+        return 'percent'
+    if 'per90' in source:
+        return 'per90'
+    return 'count'
+
+
+def _category_for(source):
+    for category, sources in CATEGORY_SOURCES.items():
+        if source in sources:
+            return category
+    return 'standard'
+
+
+def _build_schema():
+    schema = {}
+    for source, name in FBREF_TO_CSV_COLUMN_MAP.items():
+        unit = _unit_for(source)
+        if unit is None:
+            dtype = 'str'
+        elif unit in FLOAT_UNITS:
+            dtype = 'float64'
+        else:
+            dtype = 'Int64'
+        schema[name] = ColumnSpec(source, name, dtype, unit, source not in REQUIRED_SOURCES, _category_for(source))
+    return schema
+
+
+COLUMN_SCHEMA = _build_schema()
+
+OUTPUT_COLUMNS = ['Player'] + [name for name in COLUMN_SCHEMA if name != 'Player']
+
+IDENTITY_SOURCES = [source for source in CATEGORY_SOURCES['identity'] if source != 'player']
+
+
+def text_columns():
+    return [spec.name for spec in COLUMN_SCHEMA.values() if spec.dtype == 'str']
+
+
+def stat_columns(categories=None, units=None):
+    return [spec.name for spec in COLUMN_SCHEMA.values()
+            if spec.dtype != 'str'
+            and (categories is None or spec.category in categories)
+            and (units is None or spec.unit in units)]
+
+
+def columns_for(stage):
+    # Các cột mà từng bước cần đọc, để load_results chỉ chiếu (project) đúng những cột đó.
+    if stage == 'stats':
+        return ['Player', 'Squad', 'Position'] + stat_columns()
+    if stage == 'cluster':
+        return ['Player', 'Squad', 'Position'] + stat_columns()
+    if stage == 'transfers':
+        return ['Player', 'Squad', 'Minutes']
+    return list(OUTPUT_COLUMNS)
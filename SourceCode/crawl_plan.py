@@ -0,0 +1,106 @@
+import argparse
+import datetime
+import re
+from collections import namedtuple
+
+FBREF_ORIGIN = "https://fbref.com"
+FT_ORIGIN = "https://www.footballtransfers.com"
+
+# Mỗi giải: mã và tên trên FBref, slug và mã quốc gia trên footballtransfers, số trang danh sách cầu thủ tối đa.
+# Thêm một giải chỉ cần thêm một dòng ở đây; dữ liệu của giải mới được ghi vào phân vùng riêng.
+Competition = namedtuple('Competition', ['fbref_id', 'fbref_name', 'ft_slug', 'ft_country', 'ft_pages'])
+
+COMPETITIONS = {
+    "premier-league": Competition(9, "Premier-League", "uk-premier-league", "uk", 22),
+    "la-liga": Competition(12, "La-Liga", "es-laliga", "es", 22),
+    "serie-a": Competition(11, "Serie-A", "it-serie-a", "it", 22),
+    "bundesliga": Competition(20, "Bundesliga", "de-bundesliga", "de", 20),
+    "ligue-1": Competition(13, "Ligue-1", "fr-ligue-1", "fr", 20),
+}
+DEFAULT_COMPETITION = "premier-league"
+CURRENT_SEASON = "current"
+
+# Bảng thống kê FBref cần cào: tên trong URL -> id của bảng trên trang.
+STAT_TABLES = {
+    "standard": "stats_standard",
+    "keepers": "stats_keepers",
+    "shooting": "stats_shooting",
+    "passing": "stats_passing",
+    "passing_types": "stats_passing_types",
+    "gca": "stats_gca",
+    "defense": "stats_defense",
+    "possession": "stats_possession",
+    "misc": "stats_misc",
+}
+# Đoạn đường dẫn trên FBref khác tên bảng (mặc định trùng nhau).
+STAT_PATHS = {"standard": "stats"}
+
+CrawlTask = namedtuple('CrawlTask', ['league', 'season', 'category', 'url', 'table_id'])
+
+
+def current_season(today=None):
+    # Mùa giải châu Âu bắt đầu vào tháng 8: tháng 8/2024 -> "2024-2025", tháng 3/2025 -> "2024-2025".
+    today = today or datetime.date.today()
+    start = today.year if today.month >= 8 else today.year - 1
+    return f"{start}-{start + 1}"
+
+
+def parse_season(text):
+    if text == CURRENT_SEASON:
+        return current_season()
+    match = re.fullmatch(r"(\d{4})-(\d{4})", text)
+    if not match or int(match.group(2)) != int(match.group(1)) + 1:
+        raise argparse.ArgumentTypeError(f"Mùa giải không hợp lệ: {text} (dạng 2023-2024 hoặc '{CURRENT_SEASON}')")
+    return text
+
+
+def parse_league(text):
+    if text not in COMPETITIONS:
+        raise argparse.ArgumentTypeError(f"Giải không hợp lệ: {text} (có: {', '.join(COMPETITIONS)})")
+    return text
+
+
+def fbref_url(league, season, category):
+    # Mùa hiện tại dùng URL không có mùa (luôn trỏ tới dữ liệu mới nhất), các mùa cũ dùng URL lưu trữ.
+    competition = COMPETITIONS[league]
+    path = STAT_PATHS.get(category, category)
+    if season is None or season == current_season():
+        return f"{FBREF_ORIGIN}/en/comps/{competition.fbref_id}/{path}/{competition.fbref_name}-Stats"
+    return f"{FBREF_ORIGIN}/en/comps/{competition.fbref_id}/{season}/{path}/{season}-{competition.fbref_name}-Stats"
+
+
+def plan_fbref(leagues, seasons, categories=None):
+    # Tích Descartes giải x mùa x bảng; thứ tự ổn định để log và cache dễ theo dõi.
+    categories = categories or list(STAT_TABLES)
+    return [CrawlTask(league, season, category, fbref_url(league, season, category), STAT_TABLES[category])
+            for league in leagues for season in seasons for category in categories]
+
+
+def transfer_urls(league, origin=FT_ORIGIN):
+    # Các trang danh sách cầu thủ của một giải trên footballtransfers (trang 1 không có số trang trong URL).
+    competition = COMPETITIONS[league]
+    listing = f"{origin.rstrip('/')}/en/players/{competition.ft_slug}"
+    return [listing] + [f"{listing}/{page}" for page in range(2, competition.ft_pages + 1)]
+
+
+def team_url_template(league, origin=FT_ORIGIN):
+    return f"{origin.rstrip('/')}/en/teams/{COMPETITIONS[league].ft_country}/{{slug}}"
+
+
+PartitionSelection = namedtuple('PartitionSelection', ['root', 'leagues', 'seasons'])
+
+
+def add_partition_arguments(parser, default_root="data"):
+    parser.add_argument("--leagues", nargs="+", type=parse_league, default=None, metavar="LEAGUE",
+                        help=f"Các giải cần dùng ({', '.join(COMPETITIONS)})")
+    parser.add_argument("--seasons", nargs="+", type=parse_season, default=None, metavar="SEASON",
+                        help=f"Các mùa giải dạng 2023-2024 hoặc '{CURRENT_SEASON}'")
+    parser.add_argument("--data-root", default=default_root,
+                        help="Thư mục dữ liệu phân vùng theo giải/mùa (league=<giải>/season=<mùa>)")
+
+
+def partitions_from_args(args):
+    # None khi không chọn giải/mùa nào: giữ hành vi cũ, làm việc với results.csv ở thư mục hiện tại.
+    if args.leagues is None and args.seasons is None:
+        return None
+    return PartitionSelection(args.data_root, args.leagues, args.seasons)
@@ -0,0 +1,107 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+
+class HostThrottle:
+    # Giữ khoảng cách tối thiểu giữa hai lần gọi tới cùng một host, dùng chung cho mọi worker.
+    def __init__(self, min_interval=1.0):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_allowed = {}
+
+    def wait(self, url):
+        if self.min_interval <= 0:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = start_at + self.min_interval
+        delay = start_at - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class DriverPool:
+    # Pool có giới hạn các driver, mỗi driver chỉ khởi tạo một lần rồi được tái sử dụng.
+    def __init__(self, driver_factory, max_workers=3, per_host_delay=1.0):
+        self.max_workers = max(1, int(max_workers))
+        self.throttle = HostThrottle(per_host_delay)
+        self._factory = driver_factory
+        self._idle = queue.Queue()
+        self._drivers = []
+        # Số driver đã tạo hoặc đang tạo; giữ riêng với _drivers để lần tạo lỗi chỉ trả lại chỗ của nó.
+        self._reserved = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _acquire(self):
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self._lock:
+                can_create = self._reserved < self.max_workers
+                if can_create:
+                    self._reserved += 1
+            if can_create:
+                break
+            try:
+                return self._idle.get(timeout=0.5)
+            except queue.Empty:
+                # Một lần tạo driver khác có thể đã thất bại và trả lại chỗ trống: thử lại.
+                continue
+        try:
+            driver = self._factory()
+        except Exception:
+            with self._lock:
+                self._reserved -= 1
+            raise
+        with self._lock:
+            self._drivers.append(driver)
+        return driver
+
+    def _release(self, driver):
+        self._idle.put(driver)
+
+    def _run(self, key, url, fetch_page):
+        driver = self._acquire()
+        try:
+            self.throttle.wait(url)
+            return fetch_page(driver, key, url)
+        finally:
+            self._release(driver)
+
+    def fetch_all(self, tasks, fetch_page):
+        # tasks: dict {key: url}. Trả về (key, html) theo thứ tự trang tải xong,
+        # để phần xử lý có thể chạy ngay trong khi các trang khác vẫn đang tải.
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._run, key, url, fetch_page): key for key, url in tasks.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    html = future.result()
+                except Exception as e:
+                    print(f"Lỗi khi tải trang '{key}': {e}")
+                    html = None
+                yield key, html
+
+    def close(self):
+        with self._lock:
+            drivers = self._drivers
+            self._drivers = []
+            self._reserved = 0
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
@@ -0,0 +1,101 @@
+import html
+import re
+
+import numpy as np
+import pandas as pd
+
+ROW_RE = re.compile(r'<tr\b([^>]*)>(.*?)</tr\s*>', re.S | re.I)
+CELL_RE = re.compile(r'<(th|td)\b([^>]*)>(.*?)</\1\s*>', re.S | re.I)
+CLASS_RE = re.compile(r'\bclass\s*=\s*"([^"]*)"', re.I)
+DATA_STAT_RE = re.compile(r'\bdata-stat\s*=\s*"([^"]*)"', re.I)
+TAG_RE = re.compile(r'<[^>]*>')
+
+
+def _inside_comment(html_content, pos):
+    return html_content.rfind('<!--', 0, pos) > html_content.rfind('-->', 0, pos)
+
+
+def locate_table(html_content, table_id):
+    # Tìm vùng <table id="..."> ... </table> bằng quét chuỗi, không dựng cây DOM cho cả trang.
+    # Giống bản BeautifulSoup: ưu tiên bảng nằm trong comment (cách FBref ẩn các bảng phụ).
+    needle = f'id="{table_id}"'
+    fallback = None
+    pos = html_content.find(needle)
+    while pos != -1:
+        start = html_content.rfind('<table', 0, pos)
+        if start != -1 and '>' not in html_content[start:pos]:
+            end = html_content.find('</table>', pos)
+            if end != -1:
+                region = (start, end + len('</table>'))
+                if _inside_comment(html_content, pos):
+                    return region
+                if fallback is None:
+                    fallback = region
+        pos = html_content.find(needle, pos + len(needle))
+    return fallback
+
+
+def _cell_text(inner_html):
+    # Tương đương get_text(strip=True): ghép các đoạn text đã strip, không có ký tự phân cách.
+    if '<' not in inner_html:
+        return html.unescape(inner_html).strip()
+    parts = (html.unescape(part).strip() for part in TAG_RE.split(inner_html))
+    return ''.join(part for part in parts if part)
+
+
+def extract_table_fast(html_content, table_id):
+    # Trả về None nếu không định vị được bảng, để bên gọi có thể dùng lại cách phân tích cũ.
+    region = locate_table(html_content, table_id)
+    if region is None:
+        return None
+    table_html = html_content[region[0]:region[1]]
+    tbody_start = table_html.find('<tbody')
+    if tbody_start == -1:
+        return None
+    tbody_end = table_html.find('</tbody>', tbody_start)
+    tbody_html = table_html[tbody_start:tbody_end if tbody_end != -1 else len(table_html)]
+
+    # Mỗi ô được ghi thẳng vào mảng cột theo data-stat. Cột thiếu ô ở vài dòng chỉ được bù NaN (theo chỉ số dòng)
+    # khi cột đó có ô tiếp theo và một lần ở cuối, không phải duyệt mọi cột ở mỗi dòng.
+    columns = {}
+    n_rows = 0
+    for row_match in ROW_RE.finditer(tbody_html):
+        class_match = CLASS_RE.search(row_match.group(1))
+        if class_match:
+            classes = class_match.group(1).split()
+            if 'thead' in classes or any(cls.startswith('spacer_') for cls in classes):
+                continue
+        touched = []
+        created = []
+        has_player = False
+        for cell_match in CELL_RE.finditer(row_match.group(2)):
+            stat_match = DATA_STAT_RE.search(cell_match.group(2))
+            if not (stat_match and stat_match.group(1)):
+                continue
+            stat_name = stat_match.group(1)
+            stat_value = _cell_text(cell_match.group(3))
+            column = columns.get(stat_name)
+            if column is None:
+                column = columns[stat_name] = []
+                created.append(stat_name)
+            if len(column) > n_rows:
+                # Cùng data-stat xuất hiện hai lần trong một dòng: giữ ô sau cùng.
+                column[n_rows] = stat_value
+            else:
+                if len(column) < n_rows:
+                    column.extend([np.nan] * (n_rows - len(column)))
+                column.append(stat_value)
+                touched.append(column)
+            if stat_name == 'player':
+                has_player = bool(stat_value)
+        if has_player:
+            n_rows += 1
+            continue
+        # Dòng không có tên cầu thủ bị bỏ: gỡ các ô vừa ghi và các cột chỉ dòng này có.
+        for column in touched:
+            del column[n_rows:]
+        for stat_name in created:
+            del columns[stat_name]
+    for column in columns.values():
+        column.extend([np.nan] * (n_rows - len(column)))
+    return pd.DataFrame(columns)
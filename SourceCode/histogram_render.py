@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from metrics import span
+from stats_loader import float64_array
+
+RENDER_VERSION = 1
+CACHE_FILE = ".render_cache.json"
+FIGSIZE = (10, 6)
+
+_figure = None
+
+
+def safe_name(text):
+    return str(text).replace(':', '').replace('/', '_')
+
+
+def make_histogram_job(values, path, title, xlabel, label, bins=20):
+    # Bin được tính sẵn bằng NumPy; digest gồm dữ liệu cột và mọi tham số vẽ,
+    # nên biểu đồ chỉ được vẽ lại khi một trong hai thay đổi.
+    data = float64_array(values.dropna())
+    if len(data) == 0:
+        return None
+    counts, edges = np.histogram(data, bins=bins, density=True)
+    params = {"title": title, "xlabel": xlabel, "label": label, "bins": bins,
+              "figsize": FIGSIZE, "version": RENDER_VERSION}
+    digest = hashlib.sha256(data.tobytes() + json.dumps(params, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return {"path": path, "counts": counts, "edges": edges, "params": params, "digest": digest}
+
+
+def build_histogram_jobs(df, stat_cols, output_dir, team_column=None, bins=20):
+    jobs = []
+    for stat in stat_cols:
+        jobs.append(make_histogram_job(
+            df[stat], os.path.join(output_dir, f"hist_all_players_{safe_name(stat)}.png"),
+            f"Phân bổ của chỉ số: {stat} (Toàn bộ cầu thủ)", stat, 'All Players', bins))
+    if team_column is not None:
+        for team, df_team in df.groupby(team_column, sort=True, observed=True):
+            team_dir = os.path.join(output_dir, "teams", safe_name(team))
+            for stat in stat_cols:
+                jobs.append(make_histogram_job(
+                    df_team[stat], os.path.join(team_dir, f"hist_{safe_name(stat)}.png"),
+                    f"Phân bổ của chỉ số: {stat} ({team})", stat, team, bins))
+    return [job for job in jobs if job is not None]
+
+
+def _render(job):
+    # Mỗi tiến trình chỉ tạo một figure (backend Agg) rồi dùng lại cho mọi biểu đồ nó vẽ.
+    global _figure
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    params = job["params"]
+    if _figure is None:
+        _figure = plt.figure(figsize=params["figsize"])
+    fig = _figure
+    fig.clf()
+    ax = fig.add_subplot()
+    edges = job["edges"]
+    ax.hist(edges[:-1], bins=edges, weights=job["counts"], alpha=0.7, label=params["label"])
+    ax.set_title(params["title"])
+    ax.set_xlabel(params["xlabel"])
+    ax.set_ylabel("Tần suất (chuẩn hóa)")
+    ax.legend()
+    try:
+        os.makedirs(os.path.dirname(job["path"]) or ".", exist_ok=True)
+        with span("render_plot", path=job["path"]):
+            fig.savefig(job["path"])
+    except Exception as e:
+        return job["path"], str(e)
+    return job["path"], None
+
+
+def _load_cache(cache_path):
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def render_histograms(jobs, output_dir, workers=None):
+    # Trả về (số biểu đồ đã vẽ, số biểu đồ bỏ qua vì không đổi so với lần chạy trước).
+    cache_path = os.path.join(output_dir, CACHE_FILE)
+    cache = _load_cache(cache_path)
+    pending = [job for job in jobs
+               if cache.get(os.path.relpath(job["path"], output_dir)) != job["digest"] or not os.path.exists(job["path"])]
+    digests = {job["path"]: job["digest"] for job in pending}
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as executor:
+            results = list(executor.map(_render, pending, chunksize=max(1, len(pending) // (workers * 4))))
+    else:
+        results = [_render(job) for job in pending]
+    for path, error in results:
+        if error:
+            print(f"Lỗi khi lưu histogram ({path}): {error}")
+        else:
+            cache[os.path.relpath(path, output_dir)] = digests[path]
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=1)
+    return len(pending), len(jobs) - len(pending)
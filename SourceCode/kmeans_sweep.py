@@ -0,0 +1,41 @@
+from metrics import span
+from silhouette_eval import evaluate_silhouette
+
+
+def fit_single_k(X, k, random_state=42, silhouette_fn=evaluate_silhouette):
+    # Một lần fit cho mỗi k: inertia (Elbow), nhãn và silhouette đều lấy từ cùng một model.
+    # silhouette_fn có thể trả về một số hoặc dict của evaluate_silhouette (kèm chế độ, cỡ mẫu, khoảng tin cậy).
+    from sklearn.cluster import KMeans
+
+    model = KMeans(n_clusters=k, init='k-means++', n_init='auto', random_state=random_state)
+    with span("kmeans_fit", k=k, rows=len(X)):
+        labels = model.fit_predict(X)
+    silhouette_info = None
+    try:
+        with span("silhouette", k=k):
+            silhouette = silhouette_fn(X, labels)
+        if isinstance(silhouette, dict):
+            silhouette_info = silhouette
+            silhouette = silhouette_info["score"]
+    except ValueError:
+        silhouette = -1
+    return {"k": k, "model": model, "labels": labels, "inertia": model.inertia_,
+            "silhouette": silhouette, "silhouette_info": silhouette_info}
+
+
+def sweep_k(X, k_values, n_jobs=None, random_state=42, silhouette_fn=evaluate_silhouette):
+    # Chạy các giá trị k song song trên nhiều tiến trình; kết quả giữ đúng thứ tự k_values.
+    from joblib import Parallel, delayed
+
+    k_values = list(k_values)
+    n_jobs = n_jobs if n_jobs is not None else -1
+    return Parallel(n_jobs=n_jobs)(
+        delayed(fit_single_k)(X, k, random_state, silhouette_fn) for k in k_values
+    )
+
+
+def choose_k(sweep_results):
+    valid = [result for result in sweep_results if result["silhouette"] > -1]
+    if not valid:
+        return None
+    return max(valid, key=lambda result: result["silhouette"])["k"]
@@ -0,0 +1,187 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+
+ENV_VAR = "PERF_METRICS"
+PROFILE_ENV_VAR = "PERF_METRICS_PROFILE"
+
+_sink = None
+_lock = threading.Lock()
+_counters = {}
+_profile_stages = set()
+_trace_memory = False
+_started = None
+# Đỉnh bộ nhớ Python đã bị reset_peak() của span lồng bên trong xóa, giữ lại cho span bao ngoài.
+_peak_floor = 0
+
+
+class _NullSpan:
+    # Dùng chung khi chưa bật đo: không cấp phát, không ghi gì.
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def enabled():
+    return _sink is not None
+
+
+def _write(record):
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    with _lock:
+        if _sink is not None:
+            _sink.write(line + "\n")
+            _sink.flush()
+
+
+def peak_rss_mb():
+    # Module resource chỉ có trên Unix; nơi khác trả về None.
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def enable(path, profile_stages=None, trace_memory=False, append=False):
+    # Ghi các span/counter ra `path` dạng JSON lines. Biến môi trường được đặt để các tiến trình con
+    # (pool vẽ biểu đồ, joblib, các bước của pipeline) tự bật và ghi nối vào cùng file; append chỉ quyết định
+    # có xóa nội dung cũ của file hay không, mọi tiến trình đều ghi dòng tổng kết của mình khi thoát.
+    global _sink, _trace_memory, _started
+    if _sink is not None:
+        return
+    if not append:
+        open(path, "w").close()
+    # Luôn mở ở chế độ "a" để các dòng của tiến trình cha và con không ghi đè lên nhau.
+    _sink = open(path, "a", encoding="utf-8")
+    _trace_memory = trace_memory
+    _profile_stages.update(profile_stages or [])
+    _started = time.perf_counter()
+    os.environ[ENV_VAR] = os.path.abspath(path)
+    os.environ[PROFILE_ENV_VAR] = ",".join(sorted(_profile_stages)) + (";trace" if trace_memory else "")
+    atexit.register(close)
+    # Worker fork của multiprocessing thoát bằng os._exit() nên không chạy atexit: đăng ký lại close()
+    # bằng finalizer của multiprocessing trong tiến trình con.
+    from multiprocessing import util
+    util.register_after_fork(sys.modules[__name__], _after_fork)
+
+
+def _after_fork(module):
+    global _started
+    from multiprocessing import util
+    with _lock:
+        _counters.clear()
+    _started = time.perf_counter()
+    util.Finalize(None, close, exitpriority=0)
+
+
+def close():
+    # Tiến trình đã bật đo ghi một dòng tổng kết: tổng các counter, thời gian chạy và RSS đỉnh.
+    global _sink
+    if _sink is None:
+        return
+    peak_rss = peak_rss_mb()
+    _write({"type": "summary", "pid": os.getpid(), "seconds": round(time.perf_counter() - _started, 6),
+            "peak_rss_mb": None if peak_rss is None else round(peak_rss, 1), "counters": dict(_counters)})
+    with _lock:
+        _sink.close()
+        _sink = None
+
+
+class _Span:
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = fields
+        self._profiler = None
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def __enter__(self):
+        global _peak_floor
+        if self.name in _profile_stages:
+            import cProfile
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        if _trace_memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            # Giữ đỉnh của span bao ngoài trước khi reset để cộng dồn lại khi span này kết thúc.
+            self._outer_peak = max(_peak_floor, tracemalloc.get_traced_memory()[1])
+            _peak_floor = 0
+            tracemalloc.reset_peak()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _peak_floor
+        record = {"type": "span", "name": self.name, "seconds": round(time.perf_counter() - self._start, 6),
+                  "pid": os.getpid()}
+        record.update(self.fields)
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        if self._profiler is not None:
+            self._profiler.disable()
+            profile_path = f"{_sink.name}.{self.name}.{os.getpid()}.prof"
+            self._profiler.dump_stats(profile_path)
+            record["profile"] = profile_path
+        if _trace_memory:
+            import tracemalloc
+            peak = max(_peak_floor, tracemalloc.get_traced_memory()[1])
+            _peak_floor = max(self._outer_peak, peak)
+            record["python_peak_mb"] = round(peak / (1024 * 1024), 2)
+        _write(record)
+        return False
+
+
+def span(name, **fields):
+    # with span("parse", url=url) as s: ... s.set(rows=len(rows))
+    if _sink is None:
+        return _NULL_SPAN
+    return _Span(name, fields)
+
+
+def count(name, value=1, **fields):
+    if _sink is None:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+    if fields:
+        _write({"type": "counter", "name": name, "value": value, "pid": os.getpid(), **fields})
+
+
+def add_metrics_arguments(parser):
+    parser.add_argument("--metrics", default=None, metavar="PATH", help="Ghi thời gian từng bước và bộ đếm ra file JSON lines")
+    parser.add_argument("--profile-stage", nargs="+", default=None, metavar="SPAN",
+                        help="Chạy cProfile quanh các span có tên này (ghi file .prof cạnh file metrics)")
+    parser.add_argument("--trace-memory", action="store_true", help="Đo bộ nhớ Python đỉnh của từng span bằng tracemalloc")
+
+
+def metrics_from_args(args):
+    if args.metrics:
+        enable(args.metrics, profile_stages=args.profile_stage, trace_memory=args.trace_memory)
+
+
+def _enable_from_environment():
+    # Tiến trình con (ví dụ worker của ProcessPoolExecutor hoặc joblib) kế thừa cấu hình qua biến môi trường.
+    path = os.environ.get(ENV_VAR)
+    if not path:
+        return
+    stages, _, trace = os.environ.get(PROFILE_ENV_VAR, "").partition(";")
+    enable(path, profile_stages=[stage for stage in stages.split(",") if stage], trace_memory=trace == "trace",
+           append=True)
+
+
+_enable_from_environment()
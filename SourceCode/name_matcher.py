@@ -0,0 +1,159 @@
+import re
+import unicodedata
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from stage_args import DEFAULT_MIN_SCORE
+
+try:
+    from rapidfuzz.fuzz import ratio as _rapidfuzz_ratio
+except ImportError:
+    _rapidfuzz_ratio = None
+
+# Các ký tự Latin mà NFKD không tách được dấu.
+SPECIAL_FOLDS = str.maketrans({'ø': 'o', 'Ø': 'o', 'ł': 'l', 'Ł': 'l', 'đ': 'd', 'Đ': 'd', 'ß': 'ss',
+                               'æ': 'ae', 'Æ': 'ae', 'œ': 'oe', 'Œ': 'oe', 'ı': 'i', 'þ': 'th', 'ð': 'd'})
+NON_ALNUM_RE = re.compile(r'[^a-z0-9]+')
+TEAM_BONUS = 0.05
+
+
+def fold_name(name):
+    # Bỏ dấu, chữ thường, mọi ký tự không phải chữ/số thành một khoảng trắng.
+    if name is None or (isinstance(name, float) and np.isnan(name)):
+        return ""
+    text = str(name).translate(SPECIAL_FOLDS)
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return NON_ALNUM_RE.sub(' ', text.lower()).strip()
+
+
+def _ratio(a, b):
+    if _rapidfuzz_ratio is not None:
+        return _rapidfuzz_ratio(a, b) / 100.0
+    return SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+@lru_cache(maxsize=1 << 16)
+def _token_ratio(a, b):
+    # Các từ (họ, tên) lặp lại rất nhiều giữa các truy vấn nên được nhớ lại.
+    return _ratio(a, b)
+
+
+def _token_score(query_tokens, candidate_tokens):
+    # Ghép từng từ của tên ngắn hơn với từ giống nhất của tên kia (không phụ thuộc thứ tự);
+    # chữ viết tắt (một ký tự) khớp với từ có cùng chữ cái đầu. Tên thiếu bớt từ bị trừ nhẹ.
+    shorter, longer = sorted((query_tokens, candidate_tokens), key=len)
+    if not shorter:
+        return 0.0
+    total = 0.0
+    for token in shorter:
+        best = 0.0
+        for other in longer:
+            if token == other:
+                best = 1.0
+                break
+            if (len(token) == 1 or len(other) == 1) and token[0] == other[0]:
+                best = max(best, 0.9)
+            else:
+                best = max(best, _token_ratio(token, other))
+        total += best
+    coverage = len(shorter) / len(longer)
+    return total / len(shorter) * (0.7 + 0.3 * coverage)
+
+
+def name_similarity(query, candidate):
+    # query, candidate: tên đã qua fold_name.
+    if query == candidate:
+        return 1.0
+    query_tokens, candidate_tokens = query.split(), candidate.split()
+    score = _token_score(query_tokens, candidate_tokens)
+    if score < 1.0:
+        score = max(score, _ratio(query, candidate))
+    sorted_query, sorted_candidate = sorted(query_tokens), sorted(candidate_tokens)
+    if score < 1.0 and (sorted_query != query_tokens or sorted_candidate != candidate_tokens):
+        score = max(score, _ratio(' '.join(sorted_query), ' '.join(sorted_candidate)))
+    return score
+
+
+def _ngrams(folded, n):
+    padded = f" {folded} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+
+class NameIndex:
+    # Chỉ mục tên cầu thủ: n-gram ký tự (mặc định 3) -> danh sách id. Khi tra cứu, chỉ các tên chung
+    # nhiều n-gram nhất với truy vấn mới được chấm điểm; n-gram quá phổ biến (> max_postings tên)
+    # bị bỏ qua trừ khi truy vấn không còn n-gram nào khác, nên mỗi truy vấn không phải quét toàn bộ tên.
+    def __init__(self, names, teams=None, ngram=3, max_postings=2000, max_candidates=20):
+        self.names = list(names)
+        self.folded = [fold_name(name) for name in self.names]
+        self.teams = [fold_name(team) for team in teams] if teams is not None else [""] * len(self.names)
+        self.ngram = ngram
+        self.max_postings = max_postings
+        self.max_candidates = max_candidates
+        self._exact = {}
+        postings = {}
+        for idx, folded in enumerate(self.folded):
+            self._exact.setdefault(' '.join(sorted(folded.split())), []).append(idx)
+            for gram in _ngrams(folded, ngram):
+                postings.setdefault(gram, []).append(idx)
+        self._postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def candidates(self, folded_query):
+        lists = [self._postings[gram] for gram in _ngrams(folded_query, self.ngram) if gram in self._postings]
+        if not lists:
+            return np.empty(0, dtype=np.int32)
+        selective = [ids for ids in lists if len(ids) <= self.max_postings]
+        if not selective:
+            selective = sorted(lists, key=len)[:2]
+        ids, counts = np.unique(np.concatenate(selective), return_counts=True)
+        if len(ids) > self.max_candidates:
+            keep = np.argpartition(-counts, self.max_candidates - 1)[:self.max_candidates]
+            ids = ids[keep]
+        return ids
+
+    def _team_matches(self, idx, folded_team):
+        team = self.teams[idx]
+        return bool(folded_team) and bool(team) and (team == folded_team or team in folded_team or folded_team in team)
+
+    def match(self, name, team=None, top=1, min_score=DEFAULT_MIN_SCORE):
+        # Trả về tối đa `top` bộ (id, tên, điểm, cùng_đội) theo điểm giảm dần. Khi điểm tên gần bằng
+        # nhau, tên cùng đội được cộng TEAM_BONUS để thắng.
+        folded = fold_name(name)
+        if not folded:
+            return []
+        folded_team = fold_name(team) if team is not None else ""
+        exact = self._exact.get(' '.join(sorted(folded.split())), [])
+        scored = [(idx, 1.0) for idx in exact]
+        if len(exact) != 1 or top > 1:
+            seen = set(exact)
+            scored += [(idx, name_similarity(folded, self.folded[idx]))
+                       for idx in self.candidates(folded).tolist() if idx not in seen]
+        results = []
+        for idx, score in scored:
+            if score < min_score:
+                continue
+            same_team = self._team_matches(idx, folded_team)
+            results.append((idx, self.names[idx], score, same_team))
+        results.sort(key=lambda item: (min(1.0, item[2] + (TEAM_BONUS if item[3] else 0.0)), item[3]), reverse=True)
+        return results[:top]
+
+    def match_many(self, names, teams=None, min_score=DEFAULT_MIN_SCORE):
+        # Một dòng cho mỗi truy vấn: match_index là -1 khi không có ứng viên đủ điểm; ambiguous là True
+        # khi ứng viên thứ hai bằng điểm ứng viên tốt nhất (kể cả sau khi xét đội).
+        teams = list(teams) if teams is not None else [None] * len(names)
+        rows = []
+        for name, team in zip(names, teams):
+            best = self.match(name, team, top=2, min_score=min_score)
+            if best:
+                idx, matched, score, same_team = best[0]
+                ambiguous = len(best) > 1 and best[1][2] == score and best[1][3] == same_team
+                rows.append((idx, matched, score, same_team, ambiguous))
+            else:
+                rows.append((-1, None, 0.0, False, False))
+        return pd.DataFrame(rows, columns=['match_index', 'match', 'score', 'same_team', 'ambiguous'])
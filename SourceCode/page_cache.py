@@ -0,0 +1,94 @@
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+DEFAULT_CACHE_DIR = "page_cache"
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+
+class PageCache:
+    # Cache HTML trên đĩa: mỗi URL là một file gzip đặt tên theo SHA-256 của URL,
+    # thời điểm tải được lưu trong mtime của file.
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl_seconds=DEFAULT_TTL_SECONDS,
+                 max_bytes=DEFAULT_MAX_BYTES, offline=False, refresh=False):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self.refresh = refresh
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path(self, url):
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.html.gz")
+
+    def get(self, url):
+        # Ở chế độ offline, trang đã hết hạn vẫn được dùng lại vì không có cách nào tải mới.
+        if self.refresh and not self.offline:
+            return None
+        path = self._path(url)
+        try:
+            age = time.time() - os.path.getmtime(path)
+            if not self.offline and self.ttl_seconds is not None and age > self.ttl_seconds:
+                return None
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return f.read()
+        except (OSError, EOFError):
+            return None
+
+    def put(self, url, html):
+        if not html or self.offline:
+            return
+        path = self._path(url)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            f.write(html)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".html.gz"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(self.cache_dir, name))
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, name))
+                total += st.st_size
+            entries.sort()
+            for _, size, name in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                    total -= size
+                except OSError:
+                    pass
+
+
+def add_cache_arguments(parser):
+    parser.add_argument("--offline", action="store_true", help="Chỉ dùng các trang đã lưu trong cache, không khởi động trình duyệt")
+    parser.add_argument("--refresh", action="store_true", help="Bỏ qua cache và tải lại toàn bộ trang")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Thư mục lưu cache HTML")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL_SECONDS, help="Thời gian (giây) một trang trong cache còn hiệu lực")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024), help="Dung lượng tối đa của cache (MB)")
+
+
+def cache_from_args(args):
+    return PageCache(
+        cache_dir=args.cache_dir,
+        ttl_seconds=args.cache_ttl,
+        max_bytes=int(args.cache_max_mb * 1024 * 1024),
+        offline=args.offline,
+        refresh=args.refresh,
+    )
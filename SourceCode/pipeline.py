@@ -0,0 +1,218 @@
+import argparse
+import ast
+import hashlib
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from changeset import file_sha256
+from metrics import add_metrics_arguments, metrics_from_args, span
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = ".pipeline_state.json"
+MANIFEST_FILE = "pipeline_manifest.json"
+LOG_DIR = "pipeline_logs"
+
+# Mỗi bước: script, các bước phụ thuộc, file đầu vào (để hash) và file đầu ra phải tồn tại.
+# b1 lấy dữ liệu từ web, không có đầu vào cục bộ để so sánh nên luôn được chạy (trừ khi --skip-scrape).
+# Pipeline chỉ làm việc với results.csv ở thư mục hiện tại. Chế độ phân vùng (--leagues/--seasons) đọc và ghi
+# trong data/league=<giải>/season=<mùa> nên chạy ngoài pipeline, gọi trực tiếp từng script.
+PARTITION_FLAGS = ("--leagues", "--seasons", "--data-root")
+STAGES = {
+    "b1": {"script": "b1.py", "deps": [], "inputs": [], "outputs": ["results.csv"]},
+    "b2": {"script": "b2.py", "deps": ["b1"], "inputs": ["results.csv"], "outputs": ["bai2_results/results2.csv"]},
+    "b3": {"script": "b3.py", "deps": ["b1"], "inputs": ["results.csv"], "outputs": ["bai3_results/clusters.csv"]},
+    "b4": {"script": "b4 - y1.py", "deps": ["b1"], "inputs": ["results.csv"], "outputs": ["player_transfer_values.csv"]},
+}
+
+
+def local_imports(path):
+    # Các module của dự án (file .py cùng thư mục) mà script import trực tiếp.
+    with open(path, encoding="utf-8-sig") as f:
+        tree = ast.parse(f.read())
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            names.add(node.module.split('.')[0])
+    return sorted(name for name in names if os.path.exists(os.path.join(SOURCE_DIR, f"{name}.py")))
+
+
+def code_fingerprint(script):
+    # Hash của script cùng mọi module nội bộ nó dùng (đệ quy): sửa một module dùng chung
+    # cũng làm các bước phụ thuộc vào nó chạy lại.
+    digest = hashlib.sha256()
+    pending = [os.path.join(SOURCE_DIR, script)]
+    seen = set()
+    while pending:
+        path = pending.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        pending.extend(os.path.join(SOURCE_DIR, f"{name}.py") for name in local_imports(path))
+    for path in sorted(seen):
+        digest.update(os.path.basename(path).encode("utf-8"))
+        digest.update(file_sha256(path).encode("ascii"))
+    return digest.hexdigest()
+
+
+def input_fingerprint(stage, stage_args):
+    digest = hashlib.sha256(json.dumps(stage_args).encode("utf-8"))
+    for path in STAGES[stage]["inputs"]:
+        digest.update(path.encode("utf-8"))
+        digest.update((file_sha256(path) or "missing").encode("ascii"))
+    return digest.hexdigest()
+
+
+def topological_waves(stages):
+    # Chia các bước thành các đợt; các bước trong cùng một đợt không phụ thuộc nhau nên chạy song song.
+    remaining = {name: set(dep for dep in STAGES[name]["deps"] if dep in stages) for name in stages}
+    waves = []
+    while remaining:
+        ready = sorted(name for name, deps in remaining.items() if not deps)
+        if not ready:
+            raise ValueError(f"Phụ thuộc vòng giữa các bước: {sorted(remaining)}")
+        waves.append(ready)
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return waves
+
+
+def _load_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path, payload):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def run_stage(stage, stage_args):
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_path = os.path.join(LOG_DIR, f"{stage}.log")
+    command = [sys.executable, os.path.join(SOURCE_DIR, STAGES[stage]["script"])] + stage_args
+    env = dict(os.environ, MPLBACKEND=os.environ.get("MPLBACKEND", "Agg"), PYTHONIOENCODING="utf-8")
+    start = time.perf_counter()
+    # Khi bật --metrics, biến môi trường PERF_METRICS được kế thừa nên các bước ghi nối span vào cùng file.
+    with open(log_path, "w", encoding="utf-8") as log, span("stage", stage=stage) as stage_span:
+        returncode = subprocess.call(command, stdout=log, stderr=subprocess.STDOUT, env=env)
+        stage_span.set(returncode=returncode)
+    return returncode, time.perf_counter() - start, log_path
+
+
+def run_pipeline(stages=None, stage_args=None, force=False, jobs=None, dry_run=False):
+    stages = list(stages or STAGES)
+    stage_args = stage_args or {}
+    state = _load_json(STATE_FILE)
+    manifest = {"started_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "stages": {}}
+    run_start = time.perf_counter()
+    failed = set()
+
+    for wave in topological_waves(stages):
+        to_run = []
+        for stage in wave:
+            args = stage_args.get(stage, [])
+            entry = {"args": args, "code_sha256": code_fingerprint(STAGES[stage]["script"])}
+            manifest["stages"][stage] = entry
+            if any(dep in failed for dep in STAGES[stage]["deps"]):
+                entry["status"] = "blocked"
+                failed.add(stage)
+                continue
+            # Các file đầu vào được hash sau khi bước trước đã chạy xong, nên phản ánh đúng kết quả mới.
+            entry["input_sha256"] = input_fingerprint(stage, args)
+            previous = state.get(stage, {})
+            unchanged = (STAGES[stage]["inputs"] and previous.get("input_sha256") == entry["input_sha256"]
+                         and previous.get("code_sha256") == entry["code_sha256"]
+                         and all(os.path.exists(path) for path in STAGES[stage]["outputs"]))
+            if unchanged and not force:
+                entry["status"] = "skipped"
+                entry["seconds"] = 0.0
+                print(f"[{stage}] Không đổi so với lần chạy thành công trước, bỏ qua.")
+            elif dry_run:
+                entry["status"] = "would_run"
+            else:
+                to_run.append(stage)
+
+        if to_run:
+            print(f"Chạy song song: {', '.join(to_run)}")
+            with ThreadPoolExecutor(max_workers=jobs or len(to_run)) as executor:
+                results = dict(zip(to_run, executor.map(lambda name: run_stage(name, stage_args.get(name, [])), to_run)))
+            for stage in to_run:
+                returncode, seconds, log_path = results[stage]
+                entry = manifest["stages"][stage]
+                entry.update(returncode=returncode, seconds=round(seconds, 3), log=log_path)
+                missing_outputs = [path for path in STAGES[stage]["outputs"] if not os.path.exists(path)]
+                if returncode == 0 and not missing_outputs:
+                    entry["status"] = "ran"
+                    # input_sha256 lưu vào state là hash lúc bắt đầu bước này, ứng với đầu vào nó đã thực sự dùng.
+                    state[stage] = {"input_sha256": entry["input_sha256"], "code_sha256": entry["code_sha256"],
+                                    "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+                    print(f"[{stage}] Xong trong {seconds:.1f}s.")
+                else:
+                    entry["status"] = "failed"
+                    entry["missing_outputs"] = missing_outputs
+                    failed.add(stage)
+                    state.pop(stage, None)
+                    print(f"[{stage}] Lỗi (mã {returncode}), xem {log_path}.")
+            if not dry_run:
+                _write_json(STATE_FILE, state)
+
+    manifest["seconds"] = round(time.perf_counter() - run_start, 3)
+    manifest["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    if not dry_run:
+        _write_json(MANIFEST_FILE, manifest)
+    return manifest
+
+
+def parse_stage_args(values):
+    # Dạng "b2=--incremental --top-n 5".
+    stage_args = {}
+    for value in values or []:
+        stage, _, args = value.partition('=')
+        if stage not in STAGES:
+            raise SystemExit(f"Bước không hợp lệ: {stage}")
+        stage_args[stage] = shlex.split(args)
+        partition_flags = [arg for arg in stage_args[stage] if arg.split('=', 1)[0] in PARTITION_FLAGS]
+        if partition_flags:
+            raise SystemExit(f"{stage}: {' '.join(partition_flags)} không dùng được trong pipeline; chế độ phân vùng "
+                             f"chạy ngoài pipeline, hãy gọi trực tiếp {STAGES[stage]['script']}.")
+    return stage_args
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chạy b1 -> {b2, b3, b4}, bỏ qua các bước có đầu vào và mã nguồn không đổi",
+                                     epilog="Chỉ dùng results.csv ở thư mục hiện tại; chế độ phân vùng (--leagues/--seasons) "
+                                            "chạy ngoài pipeline.")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=None, help="Chỉ chạy các bước này")
+    parser.add_argument("--skip-scrape", action="store_true", help="Không chạy b1, dùng results.csv hiện có")
+    parser.add_argument("--force", action="store_true", help="Chạy lại mọi bước dù không có thay đổi")
+    parser.add_argument("--jobs", type=int, default=None, help="Số bước tối đa chạy song song")
+    parser.add_argument("--stage-args", nargs="+", default=None, metavar="STAGE=ARGS",
+                        help='Tham số riêng cho từng bước, ví dụ: b2="--incremental" b4="--offline"')
+    parser.add_argument("--dry-run", action="store_true", help="Chỉ cho biết bước nào sẽ chạy")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    metrics_from_args(args)
+
+    selected = args.stages or list(STAGES)
+    if args.skip_scrape:
+        selected = [stage for stage in selected if stage != "b1"]
+    manifest = run_pipeline(selected, parse_stage_args(args.stage_args), force=args.force, jobs=args.jobs,
+                            dry_run=args.dry_run)
+    for stage, entry in manifest["stages"].items():
+        print(f"{stage:>3} {entry['status']:>10} {entry.get('seconds', 0.0):>8.1f}s")
+    if any(entry["status"] in ("failed", "blocked") for entry in manifest["stages"].values()):
+        sys.exit(1)
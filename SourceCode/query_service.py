@@ -0,0 +1,391 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from crawl_plan import partitions_from_args
+from name_matcher import DEFAULT_MIN_SCORE, NameIndex, fold_name
+from stage_args import DEFAULT_CACHE_ENTRIES, RESULTS2_CSV, TRANSFERS_CSV, serve_parser
+from stats_loader import RESULTS_CSV, RESULTS_TYPED, float64_array, list_partitions, load_results, load_selected_results
+
+DEFAULT_TOP_N = 10
+MAX_TOP_N = 500
+GROUP_COLUMNS = {"team": "Squad", "position": "Position"}
+INFO_COLUMNS = ['League', 'Season', 'Player', 'Squad', 'Position']
+
+
+class QueryError(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _plain(value):
+    # Giá trị của pandas/NumPy -> kiểu JSON: NaN/NA thành null, số NumPy thành số Python.
+    if pd.isna(value):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _records(frame):
+    return [{col: _plain(value) for col, value in row.items()} for row in frame.to_dict("records")]
+
+
+def _row_indices(labels, rows=None):
+    # Nhãn -> mảng chỉ số dòng tăng dần; nhãn trống bị bỏ qua. rows: dòng của từng nhãn (mặc định 0..n-1).
+    labels = pd.Series(labels).reset_index(drop=True)
+    rows = np.arange(len(labels)) if rows is None else np.asarray(rows)
+    present = (labels.notna() & (labels != "")).to_numpy()
+    labels, rows = labels[present], rows[present]
+    return {key: np.unique(rows[positions]) for key, positions in labels.groupby(labels, sort=False).indices.items()}
+
+
+class Snapshot:
+    # Một phiên bản bất biến của các file đầu ra cùng chỉ mục theo cầu thủ (tên đã bỏ dấu), đội và vị trí.
+    # Khi file đổi, OutputStore dựng Snapshot mới rồi thay cả đối tượng, nên request đang chạy không thấy
+    # dữ liệu nửa cũ nửa mới.
+    def __init__(self, results, results2, transfers, generation):
+        self.results = results.reset_index(drop=True)
+        self.results2 = results2
+        self.transfers = transfers
+        self.generation = generation
+        self.player_rows = _row_indices(self.results['Player'].map(fold_name)) if 'Player' in self.results.columns else {}
+        self.team_rows = _row_indices(self.results['Squad']) if 'Squad' in self.results.columns else {}
+        self.position_rows = {}
+        if 'Position' in self.results.columns:
+            # Vị trí ghép ("DF,MF") được xếp vào chỉ mục của từng vị trí thành phần.
+            positions = self.results['Position']
+            tokens = positions.astype(object).where(positions.notna(), "").astype(str).str.split(',').explode().str.strip()
+            self.position_rows = _row_indices(tokens.to_numpy(), rows=tokens.index)
+        self.transfer_rows = _row_indices(self.transfers['Player'].map(fold_name)) if 'Player' in self.transfers.columns else {}
+        self.stat_columns = [col for col in self.results.columns
+                             if col not in INFO_COLUMNS + ['Nation'] and pd.api.types.is_numeric_dtype(self.results[col])]
+        # Các cột dưới dạng mảng object: dựng JSON cho vài dòng mà không phải cắt DataFrame gần 200 cột.
+        self._columns = {col: self.results[col].to_numpy(dtype=object) for col in self.results.columns}
+        self.info_columns = [col for col in INFO_COLUMNS if col in self.results.columns]
+        self.team_statistics = dict(zip(self.results2['Group'], _records(self.results2))) \
+            if 'Group' in self.results2.columns else {}
+        self._numeric = {}
+        self._name_index = None
+        self._lock = threading.Lock()
+
+    def rows_records(self, rows, columns=None):
+        columns = columns or list(self._columns)
+        return [{col: _plain(self._columns[col][row]) for col in columns} for row in rows]
+
+    def numeric(self, stat):
+        # Cột chỉ số dạng float64, tạo khi được hỏi lần đầu rồi dùng lại.
+        if stat not in self._numeric:
+            self._numeric[stat] = float64_array(self.results[stat])
+        return self._numeric[stat]
+
+    def find_player_rows(self, name, team=None):
+        rows = self.player_rows.get(fold_name(name))
+        if rows is not None:
+            return rows
+        # Tên không khớp chính xác: tìm gần đúng bằng NameIndex, chỉ dựng ở lần đầu cần đến.
+        with self._lock:
+            if self._name_index is None:
+                self._name_index = NameIndex(self.results['Player'].tolist(),
+                                             teams=self.results['Squad'].tolist() if 'Squad' in self.results.columns else None)
+        best = self._name_index.match(name, team, top=1, min_score=DEFAULT_MIN_SCORE)
+        if not best:
+            return np.empty(0, dtype=np.int64)
+        return self.player_rows.get(fold_name(best[0][1]), np.empty(0, dtype=np.int64))
+
+    def filtered_rows(self, positions=None, teams=None):
+        # Giao của các chỉ mục vị trí và đội; None khi không lọc.
+        rows = None
+        for index, keys in ((self.position_rows, positions), (self.team_rows, teams)):
+            if not keys:
+                continue
+            selected = np.unique(np.concatenate([index.get(key, np.empty(0, dtype=np.int64)) for key in keys]))
+            rows = selected if rows is None else np.intersect1d(rows, selected, assume_unique=True)
+        return rows
+
+    def player(self, name, team=None):
+        rows = self.find_player_rows(name, team)
+        if not len(rows):
+            raise QueryError(f"Không tìm thấy cầu thủ '{name}'", status=404)
+        names = {self._columns['Player'][row] for row in rows}
+        transfer_rows = np.unique(np.concatenate([self.transfer_rows.get(fold_name(player), np.empty(0, dtype=np.int64))
+                                                  for player in names]))
+        return {"player": self._columns['Player'][rows[0]], "rows": self.rows_records(rows),
+                "transfers": _records(self.transfers.iloc[transfer_rows])}
+
+    def team(self, name):
+        rows = self.team_rows.get(name)
+        if rows is None:
+            raise QueryError(f"Không tìm thấy đội '{name}'", status=404)
+        columns = self.info_columns + (['Minutes'] if 'Minutes' in self._columns else [])
+        return {"team": name, "players": self.rows_records(rows, columns), "statistics": self.team_statistics.get(name)}
+
+    def top(self, stat, n=DEFAULT_TOP_N, positions=None, teams=None, ascending=False):
+        # Như top_bottom_n của b2.py: bỏ ô trống, bằng điểm thì cầu thủ đứng trước trong bảng được xếp trước.
+        if stat not in self.stat_columns:
+            raise QueryError(f"Không có chỉ số '{stat}'")
+        rows = self.filtered_rows(positions, teams)
+        values = self.numeric(stat)
+        if rows is None:
+            rows = np.flatnonzero(~np.isnan(values))
+        else:
+            rows = rows[~np.isnan(values[rows])]
+        order = np.lexsort((rows, values[rows] if ascending else -values[rows]))[:n]
+        chosen = rows[order]
+        players = [dict(Rank=rank, **record)
+                   for rank, record in enumerate(self.rows_records(chosen, self.info_columns + [stat]), 1)]
+        return {"stat": stat, "order": "asc" if ascending else "desc", "count": len(rows), "players": players}
+
+    def aggregate(self, by, stats=None, positions=None, teams=None):
+        # Median/Mean/Std theo đội hoặc vị trí trên các dòng đã lọc, cùng cách tính với results2.csv của b2.py.
+        from b2 import compute_group_statistics
+
+        if by not in GROUP_COLUMNS or GROUP_COLUMNS[by] not in self.results.columns:
+            raise QueryError(f"Tham số by phải là một trong: {', '.join(GROUP_COLUMNS)}")
+        stats = stats or self.stat_columns
+        unknown = [stat for stat in stats if stat not in self.stat_columns]
+        if unknown:
+            raise QueryError(f"Không có chỉ số: {', '.join(unknown)}")
+        rows = self.filtered_rows(positions, teams)
+        df = self.results[[GROUP_COLUMNS[by]] + stats]
+        df = df if rows is None else df.iloc[rows]
+        if df.empty:
+            return {"by": by, "groups": []}
+        return {"by": by, "groups": _records(compute_group_statistics(df, stats, GROUP_COLUMNS[by]))}
+
+    def status(self):
+        return {"generation": self.generation, "players": len(self.player_rows), "rows": len(self.results),
+                "teams": len(self.team_rows), "positions": sorted(self.position_rows),
+                "results2_rows": len(self.results2), "transfer_rows": len(self.transfers)}
+
+
+class OutputStore:
+    # Nạp các file đầu ra một lần. current() so chữ ký (mtime, kích thước) của các file nguồn; file nào đổi thì
+    # nạp lại và dựng Snapshot mới với generation tăng thêm 1, làm mọi kết quả đã cache trước đó hết hiệu lực.
+    # File đang được ghi dở (đọc lỗi) thì giữ Snapshot cũ và thử lại ở request sau.
+    def __init__(self, results_path=RESULTS_CSV, results2_path=RESULTS2_CSV, transfers_path=TRANSFERS_CSV,
+                 partitions=None):
+        self.results_path = results_path
+        self.results2_path = results2_path
+        self.transfers_path = transfers_path
+        self.partitions = partitions
+        self._lock = threading.Lock()
+        self._signatures = {}
+        self._frames = {"results": pd.DataFrame(), "results2": pd.DataFrame(), "transfers": pd.DataFrame()}
+        self.snapshot = Snapshot(self._frames["results"], self._frames["results2"], self._frames["transfers"], 0)
+        self.current()
+
+    def _partition_paths(self, filename):
+        return [os.path.join(path, filename) for _, _, path in
+                list_partitions(self.partitions.root, self.partitions.leagues, self.partitions.seasons)]
+
+    def _sources(self):
+        if self.partitions is None:
+            results = [self.results_path, os.path.join(os.path.dirname(self.results_path), RESULTS_TYPED)]
+            transfers = [self.transfers_path]
+        else:
+            results = self._partition_paths(RESULTS_CSV) + self._partition_paths(RESULTS_TYPED)
+            transfers = self._partition_paths(TRANSFERS_CSV)
+        return {"results": results, "results2": [self.results2_path], "transfers": transfers}
+
+    @staticmethod
+    def _signature(paths):
+        signature = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    def _load(self, name):
+        if name == "results":
+            if self.partitions is not None:
+                return load_selected_results(partitions=self.partitions)
+            if not os.path.exists(self.results_path):
+                return pd.DataFrame()
+            return load_results(csv_path=self.results_path,
+                                typed_path=os.path.join(os.path.dirname(self.results_path), RESULTS_TYPED))
+        paths = [self.results2_path] if name == "results2" else self._sources()["transfers"]
+        frames = [pd.read_csv(path, encoding="utf-8-sig") for path in paths if os.path.exists(path)]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def current(self):
+        # Trả về (snapshot, có thay đổi hay không).
+        with self._lock:
+            changed = False
+            for name, paths in self._sources().items():
+                signature = self._signature(paths)
+                if self._signatures.get(name) == signature:
+                    continue
+                try:
+                    self._frames[name] = self._load(name)
+                except Exception as e:
+                    print(f"Không đọc được dữ liệu '{name}' (giữ bản cũ): {e}")
+                    continue
+                self._signatures[name] = signature
+                changed = True
+            if changed:
+                self.snapshot = Snapshot(self._frames["results"], self._frames["results2"], self._frames["transfers"],
+                                         self.snapshot.generation + 1)
+            return self.snapshot, changed
+
+
+class LRUCache:
+    # Cache kết quả đã mã hóa JSON theo (generation, endpoint, tham số); xóa toàn bộ khi dữ liệu đổi.
+    def __init__(self, max_entries=DEFAULT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses}
+
+
+def _list_param(params, name):
+    # ?position=FW&position=MF hoặc ?position=FW,MF
+    values = [item.strip() for value in params.get(name, []) for item in value.split(',')]
+    return [value for value in values if value] or None
+
+
+def _single_param(params, name, required=False):
+    values = params.get(name)
+    if not values:
+        if required:
+            raise QueryError(f"Thiếu tham số '{name}'")
+        return None
+    return values[-1]
+
+
+def _int_param(params, name, default, maximum):
+    text = _single_param(params, name)
+    if text is None:
+        return default
+    try:
+        value = int(text)
+    except ValueError:
+        raise QueryError(f"Tham số '{name}' phải là số nguyên") from None
+    if not 1 <= value <= maximum:
+        raise QueryError(f"Tham số '{name}' phải trong khoảng 1..{maximum}")
+    return value
+
+
+def run_query(snapshot, endpoint, params):
+    if endpoint == "/player":
+        return snapshot.player(_single_param(params, "name", required=True), _single_param(params, "team"))
+    if endpoint == "/team":
+        return snapshot.team(_single_param(params, "name", required=True))
+    if endpoint == "/top":
+        order = _single_param(params, "order") or "desc"
+        if order not in ("asc", "desc"):
+            raise QueryError("Tham số 'order' phải là asc hoặc desc")
+        return snapshot.top(_single_param(params, "stat", required=True), _int_param(params, "n", DEFAULT_TOP_N, MAX_TOP_N),
+                            positions=_list_param(params, "position"), teams=_list_param(params, "team"),
+                            ascending=order == "asc")
+    if endpoint == "/aggregate":
+        return snapshot.aggregate(_single_param(params, "by", required=True), stats=_list_param(params, "stat"),
+                                  positions=_list_param(params, "position"), teams=_list_param(params, "team"))
+    raise QueryError(f"Không có endpoint '{endpoint}'", status=404)
+
+
+def make_handler(store, cache):
+    class QueryHandler(BaseHTTPRequestHandler):
+        # HTTP/1.1 để client giữ kết nối giữa các request (mọi phản hồi đều có Content-Length). Header và body
+        # được gửi bằng hai lần ghi, nên tắt Nagle để body không phải chờ ACK trễ (~40 ms) của client.
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def _send(self, status, body, cache_state=None):
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            if cache_state:
+                self.send_header("X-Cache", cache_state)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            snapshot, changed = store.current()
+            if changed:
+                cache.clear()
+            if url.path == "/status":
+                body = dict(snapshot.status(), cache=cache.stats())
+                self._send(200, json.dumps(body, ensure_ascii=False).encode("utf-8"))
+                return
+            pairs = parse_qsl(url.query, keep_blank_values=True)
+            key = (snapshot.generation, url.path, tuple(sorted(pairs)))
+            body = cache.get(key)
+            if body is not None:
+                self._send(200, body, "HIT")
+                return
+            params = {}
+            for name, value in pairs:
+                params.setdefault(name, []).append(value)
+            try:
+                body = json.dumps(run_query(snapshot, url.path, params), ensure_ascii=False, allow_nan=False).encode("utf-8")
+            except QueryError as e:
+                self._send(e.status, json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8"))
+                return
+            cache.put(key, body)
+            self._send(200, body, "MISS")
+
+        def log_message(self, format, *args):
+            pass
+
+    return QueryHandler
+
+
+def main(argv=None, prog=None):
+    args = serve_parser(prog).parse_args(argv)
+
+    start = time.perf_counter()
+    store = OutputStore(args.results, args.results2, args.transfers, partitions=partitions_from_args(args))
+    status = store.snapshot.status()
+    print(f"Đã nạp {status['rows']} dòng cầu thủ, {status['results2_rows']} dòng thống kê đội, "
+          f"{status['transfer_rows']} giá trị chuyển nhượng trong {time.perf_counter() - start:.2f}s")
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(store, LRUCache(args.cache_entries)))
+    print(f"Đang phục vụ tại http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from page_cache import DEFAULT_CACHE_DIR, PageCache
+
+DEFAULT_ORIGIN = "https://www.footballtransfers.com"
+
+
+def make_handler(cache, origin, max_rps=None, retry_after=1, latency=0.0):
+    # Trả lại các trang đã ghi trong PageCache theo đường dẫn, để chạy thử scraper mà không cần mạng.
+    # Khi vượt quá max_rps request/giây, server trả 429 kèm Retry-After như site thật.
+    lock = threading.Lock()
+    window = {"start": time.monotonic(), "count": 0}
+
+    class ReplayHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if max_rps:
+                with lock:
+                    now = time.monotonic()
+                    if now - window["start"] >= 1.0:
+                        window["start"], window["count"] = now, 0
+                    window["count"] += 1
+                    throttled = window["count"] > max_rps
+                if throttled:
+                    self.send_response(429)
+                    self.send_header("Retry-After", str(retry_after))
+                    self.end_headers()
+                    return
+            if latency:
+                time.sleep(latency)
+            html = cache.get(origin + self.path.rstrip('/'))
+            if html is None:
+                self.send_error(404)
+                return
+            body = html.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ReplayHandler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Server cục bộ phát lại các trang đã ghi trong page_cache")
+    parser.add_argument("--port", type=int, default=8765, help="Cổng lắng nghe (0: để hệ điều hành chọn cổng trống)")
+    parser.add_argument("--origin", default=DEFAULT_ORIGIN, help="Origin của các URL đã được cache")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--max-rps", type=int, default=None, help="Trả 429 khi vượt quá số request/giây này")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="Độ trễ giả lập cho mỗi trang (giây)")
+    args = parser.parse_args()
+
+    cache = PageCache(args.cache_dir, offline=True)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port),
+                                 make_handler(cache, args.origin, args.max_rps, args.retry_after, args.latency))
+    print(f"Đang phát lại trang từ '{args.cache_dir}' tại http://127.0.0.1:{server.server_address[1]}", flush=True)
+    server.serve_forever()
@@ -0,0 +1,84 @@
+import numpy as np
+
+from stage_args import DEFAULT_MEMORY_MB, DEFAULT_SAMPLE_SIZE
+
+AUTO_EXACT_MAX_ROWS = 20000
+Z_SCORES = {0.90: 1.6449, 0.95: 1.9600, 0.99: 2.5758}
+
+
+def silhouette_values(X, codes, n_clusters, rows, memory_mb=DEFAULT_MEMORY_MB):
+    # Silhouette s(i) của các dòng `rows`, tính so với toàn bộ X. Khoảng cách được tính theo
+    # từng khối dòng sao cho ma trận khối không vượt quá memory_mb, không bao giờ dựng ma trận n x n.
+    from sklearn.metrics.pairwise import euclidean_distances
+
+    n = len(X)
+    onehot = np.zeros((n, n_clusters))
+    onehot[np.arange(n), codes] = 1.0
+    cluster_sizes = onehot.sum(axis=0)
+    chunk_rows = max(1, int(memory_mb * 1024 * 1024 // (n * 8 * 2)))
+    squared_norms = np.einsum('ij,ij->i', X, X)
+    values = np.empty(len(rows))
+    for start in range(0, len(rows), chunk_rows):
+        block = rows[start:start + chunk_rows]
+        distances = euclidean_distances(X[block], X, Y_norm_squared=squared_norms[np.newaxis, :])
+        sums = distances @ onehot
+        own = codes[block]
+        own_sizes = cluster_sizes[own]
+        a = sums[np.arange(len(block)), own] / np.maximum(own_sizes - 1, 1)
+        mean_to_other = sums / cluster_sizes
+        mean_to_other[np.arange(len(block)), own] = np.inf
+        b = mean_to_other.min(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            s = (b - a) / np.maximum(a, b)
+        s[own_sizes <= 1] = 0.0
+        values[start:start + len(block)] = np.nan_to_num(s)
+    return values
+
+
+def _stratified_sample(codes, n_clusters, sample_size, rng):
+    # Phân bổ mẫu theo tỉ lệ kích thước cụm, mỗi cụm ít nhất 2 điểm (nếu có đủ).
+    sizes = np.bincount(codes, minlength=n_clusters)
+    allocation = np.minimum(sizes, np.maximum(2, np.round(sample_size * sizes / sizes.sum()).astype(int)))
+    strata = []
+    for cluster in range(n_clusters):
+        members = np.flatnonzero(codes == cluster)
+        strata.append(np.sort(rng.choice(members, size=allocation[cluster], replace=False)))
+    return strata, sizes
+
+
+def evaluate_silhouette(X, labels, mode="auto", sample_size=DEFAULT_SAMPLE_SIZE, memory_mb=DEFAULT_MEMORY_MB,
+                        confidence=0.95, random_state=42):
+    # mode: "exact" (tính đủ mọi điểm, bộ nhớ giới hạn), "sample" (mẫu phân tầng theo cụm,
+    # kèm khoảng tin cậy) hoặc "auto" (exact khi số cầu thủ <= AUTO_EXACT_MAX_ROWS).
+    X = np.asarray(X, dtype="float64")
+    _, codes = np.unique(np.asarray(labels), return_inverse=True)
+    n_clusters = codes.max() + 1
+    n = len(X)
+    if n_clusters < 2 or n_clusters > n - 1:
+        raise ValueError(f"Số cụm phải nằm trong khoảng 2 đến n_samples - 1 (nhận được {n_clusters}).")
+    if mode == "auto":
+        mode = "exact" if n <= AUTO_EXACT_MAX_ROWS or n <= sample_size else "sample"
+
+    if mode == "exact":
+        score = float(silhouette_values(X, codes, n_clusters, np.arange(n), memory_mb).mean())
+        return {"score": score, "mode": "exact", "n": n, "sample_size": n,
+                "ci_low": score, "ci_high": score, "confidence": confidence}
+
+    rng = np.random.default_rng(random_state)
+    strata, sizes = _stratified_sample(codes, n_clusters, sample_size, rng)
+    rows = np.concatenate(strata)
+    values = silhouette_values(X, codes, n_clusters, rows, memory_mb)
+    weights = sizes / n
+    estimate = 0.0
+    variance = 0.0
+    offset = 0
+    for cluster, members in enumerate(strata):
+        stratum_values = values[offset:offset + len(members)]
+        offset += len(members)
+        estimate += weights[cluster] * stratum_values.mean()
+        if len(members) > 1:
+            finite_population = 1 - len(members) / sizes[cluster]
+            variance += weights[cluster] ** 2 * finite_population * stratum_values.var(ddof=1) / len(members)
+    margin = Z_SCORES.get(confidence, 1.96) * np.sqrt(variance)
+    return {"score": float(estimate), "mode": "sample", "n": n, "sample_size": int(len(rows)),
+            "ci_low": float(estimate - margin), "ci_high": float(estimate + margin), "confidence": confidence}
@@ -0,0 +1,183 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from cluster_model import ArtifactMismatchError, schema_signature
+from name_matcher import DEFAULT_MIN_SCORE, NameIndex, fold_name
+from stage_args import DEFAULT_INDEX, similar_parser
+
+INDEX_VERSION = 1
+DEFAULT_BLOCK_MB = 64
+INFO_COLUMNS = ['Player', 'Squad', 'Position', 'League', 'Season']
+
+
+class SimilarityIndex:
+    # Tìm cầu thủ gần nhất (khoảng cách Euclid) trong không gian đặc trưng đã impute và chuẩn hóa của b3.py.
+    # Với vài chục chiều, KD-tree hay ball tree gần như phải duyệt hết các lá, nên dùng brute force vector hóa:
+    # ||q - x||^2 = ||q||^2 - 2 q.x + ||x||^2 với ||x||^2 tính sẵn, một phép nhân ma trận float32 cho cả khối
+    # truy vấn; khối được chia sao cho ma trận khoảng cách không vượt quá block_mb.
+    def __init__(self, columns, X, info):
+        self.columns = list(columns)
+        self.X = np.ascontiguousarray(X, dtype="float32")
+        self.norms = np.einsum('ij,ij->i', self.X, self.X)
+        self.info = info.reset_index(drop=True)
+        self._folded = None
+        self._name_index = None
+        positions = self.info['Position'] if 'Position' in self.info.columns else pd.Series("", index=self.info.index)
+        # Vị trí FBref có thể ghép nhiều vị trí ("DF,MF"): lọc theo vị trí khớp khi có bất kỳ vị trí nào trùng.
+        self._position_masks = {}
+        for row, text in enumerate(positions):
+            for token in str(text).split(','):
+                token = token.strip()
+                if token:
+                    self._position_masks.setdefault(token, np.zeros(len(self.info), dtype=bool))[row] = True
+
+    def __len__(self):
+        return len(self.X)
+
+    @classmethod
+    def from_frame(cls, df_scaled, df_info):
+        # df_scaled: ma trận đặc trưng của b3.py (DataFrame, index trùng với df_info).
+        info = pd.DataFrame(index=df_scaled.index)
+        for col in INFO_COLUMNS:
+            if col in df_info.columns:
+                values = df_info.loc[df_scaled.index, col]
+                info[col] = values.astype(object).where(values.notna(), "").astype(str)
+        return cls(df_scaled.columns, df_scaled.to_numpy(dtype="float32"), info)
+
+    def save(self, path=DEFAULT_INDEX):
+        # File .npz không nén, không pickle: đọc lại nhanh và không thực thi mã khi nạp.
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        arrays = {f"info_{col}": self.info[col].to_numpy(dtype=str) for col in self.info.columns}
+        np.savez(path, version=np.asarray(INDEX_VERSION), columns=np.asarray(self.columns, dtype=str),
+                 schema=np.asarray(json.dumps(schema_signature(self.columns))), X=self.X, **arrays)
+
+    def filter_mask(self, positions=None, teams=None):
+        # None khi không lọc; ngược lại mảng bool các dòng được phép trả về.
+        mask = None
+        if positions:
+            mask = np.zeros(len(self), dtype=bool)
+            for position in positions:
+                if position in self._position_masks:
+                    mask |= self._position_masks[position]
+        if teams:
+            team_mask = self.info['Squad'].isin(list(teams)).to_numpy() if 'Squad' in self.info.columns \
+                else np.zeros(len(self), dtype=bool)
+            mask = team_mask if mask is None else mask & team_mask
+        return mask
+
+    def search(self, Q, k=10, positions=None, teams=None, exclude=None, block_mb=DEFAULT_BLOCK_MB):
+        # Trả về (chỉ số dòng, khoảng cách), mỗi mảng cỡ (số truy vấn, k); thiếu ứng viên thì -1 và NaN.
+        # exclude: với mỗi truy vấn, các dòng không được trả về (ví dụ chính cầu thủ đó).
+        Q = np.atleast_2d(np.asarray(Q, dtype="float32"))
+        n_queries = len(Q)
+        indices = np.full((n_queries, k), -1, dtype=np.int64)
+        distances = np.full((n_queries, k), np.nan)
+        if len(self) == 0 or k <= 0:
+            return indices, distances
+        blocked = self.filter_mask(positions, teams)
+        blocked = None if blocked is None else ~blocked
+        q_norms = np.einsum('ij,ij->i', Q, Q)
+        kk = min(k, len(self))
+        rows_per_block = max(1, int(block_mb * 1024 * 1024 // (4 * len(self))))
+        for start in range(0, n_queries, rows_per_block):
+            stop = min(start + rows_per_block, n_queries)
+            block = q_norms[start:stop, None] - 2 * (Q[start:stop] @ self.X.T) + self.norms[None, :]
+            if blocked is not None:
+                block[:, blocked] = np.inf
+            if exclude is not None:
+                for i in range(start, stop):
+                    if exclude[i] is not None and len(exclude[i]):
+                        block[i - start, exclude[i]] = np.inf
+            if kk < len(self):
+                candidates = np.argpartition(block, kk - 1, axis=1)[:, :kk]
+            else:
+                candidates = np.broadcast_to(np.arange(len(self)), block.shape)
+            order = np.argsort(np.take_along_axis(block, candidates, axis=1), axis=1, kind="stable")
+            chosen = np.take_along_axis(candidates, order, axis=1)
+            # Khoảng cách của k dòng được chọn tính lại trực tiếp (float64), không qua công thức khai triển.
+            diff = Q[start:stop, None, :].astype("float64") - self.X[chosen].astype("float64")
+            exact = np.sqrt(np.einsum('ijk,ijk->ij', diff, diff))
+            valid = np.isfinite(np.take_along_axis(block, chosen, axis=1))
+            indices[start:stop, :kk] = np.where(valid, chosen, -1)
+            distances[start:stop, :kk] = np.where(valid, exact, np.nan)
+        return indices, distances
+
+    def rows_for(self, name, team=None):
+        # Các dòng của một cầu thủ (có thể nhiều dòng khi chuyển đội hoặc nhiều mùa). Tên không khớp chính xác
+        # (sau khi bỏ dấu) thì tìm gần đúng bằng NameIndex (team giúp phân biệt tên trùng), chỉ dựng khi cần.
+        if self._folded is None:
+            self._folded = self.info['Player'].map(fold_name).to_numpy()
+        rows = np.flatnonzero(self._folded == fold_name(name))
+        if not len(rows):
+            if self._name_index is None:
+                self._name_index = NameIndex(self.info['Player'].tolist(),
+                                             teams=self.info['Squad'].tolist() if 'Squad' in self.info.columns else None)
+            best = self._name_index.match(name, team, top=1, min_score=DEFAULT_MIN_SCORE)
+            if not best:
+                return rows
+            rows = np.flatnonzero(self._folded == self._folded[best[0][0]])
+        return rows
+
+    def similar_to(self, names, k=10, positions=None, teams=None, block_mb=DEFAULT_BLOCK_MB):
+        # "Ai chơi giống X?": mỗi tên một truy vấn (dòng đầu tiên của cầu thủ), mọi dòng của chính cầu thủ đó bị loại.
+        found = [(name, self.rows_for(name)) for name in names]
+        missing = [name for name, rows in found if not len(rows)]
+        found = [(name, rows) for name, rows in found if len(rows)]
+        if not found:
+            return self.neighbours_frame([], np.empty((0, k), dtype=np.int64), np.empty((0, k))), missing
+        query_rows = np.asarray([rows[0] for _, rows in found])
+        indices, distances = self.search(self.X[query_rows], k, positions, teams,
+                                         exclude=[rows for _, rows in found], block_mb=block_mb)
+        labels = [self.info['Player'].iat[row] for row in query_rows]
+        return self.neighbours_frame(labels, indices, distances), missing
+
+    def neighbours_frame(self, labels, indices, distances):
+        query_pos, rank = np.nonzero(indices >= 0)
+        rows = indices[query_pos, rank]
+        result = pd.DataFrame({'Query': np.asarray(labels, dtype=object)[query_pos], 'Rank': rank + 1})
+        for col in self.info.columns:
+            result[col] = self.info[col].to_numpy()[rows]
+        result['Distance'] = distances[query_pos, rank].round(4)
+        return result
+
+
+def load_similarity_index(path=DEFAULT_INDEX):
+    # Từ chối chỉ mục khác phiên bản hoặc dựng trên schema cột khác với COLUMN_SCHEMA hiện tại (như cluster_model).
+    with np.load(path, allow_pickle=False) as data:
+        if "version" not in data or int(data["version"]) != INDEX_VERSION:
+            raise ArtifactMismatchError(f"Chỉ mục '{path}' không đúng phiên bản {INDEX_VERSION}.")
+        columns = data["columns"].tolist()
+        if json.loads(str(data["schema"])) != schema_signature(columns):
+            raise ArtifactMismatchError(f"Schema cột của chỉ mục '{path}' không khớp với COLUMN_SCHEMA hiện tại.")
+        info = pd.DataFrame({key[len("info_"):]: data[key].astype(object) for key in data.files if key.startswith("info_")})
+        return SimilarityIndex(columns, data["X"], info)
+
+
+def main(argv=None, prog=None):
+    args = similar_parser(prog).parse_args(argv)
+
+    try:
+        index = load_similarity_index(args.index)
+    except (OSError, ArtifactMismatchError) as e:
+        print(f"Lỗi khi đọc chỉ mục: {e} (chạy b3.py để tạo lại)")
+        return
+    start = time.perf_counter()
+    result, missing = index.similar_to(args.players, k=args.k, positions=args.positions, teams=args.teams)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    for name in missing:
+        print(f"Không tìm thấy cầu thủ '{name}' trong chỉ mục.")
+    if args.output:
+        result.to_csv(args.output, index=False, encoding='utf-8-sig')
+    else:
+        print(result.to_string(index=False))
+    print(f"Đã tìm {len(args.players) - len(missing)} cầu thủ trong chỉ mục {len(index)} dòng ({elapsed_ms:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
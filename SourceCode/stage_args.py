@@ -0,0 +1,131 @@
+import argparse
+
+import async_fetch
+from crawl_plan import add_partition_arguments
+from metrics import add_metrics_arguments
+from page_cache import add_cache_arguments
+
+# Tham số dòng lệnh của từng bước cùng các giá trị mặc định hiện trong đó. Module chỉ dùng thư viện chuẩn
+# và các module nhẹ, để "cli.py COMMAND --help" và lỗi tham số được báo trước khi nạp pandas/NumPy của bước.
+RESULTS_CSV = "results.csv"
+RESULTS2_CSV = "bai2_results/results2.csv"
+TRANSFERS_CSV = "player_transfer_values.csv"
+
+MAX_WORKERS = 3
+PER_HOST_DELAY = 1.0
+DEFAULT_CHUNKSIZE = 50000
+DEFAULT_EXACT_LIMIT = 10000
+DEFAULT_RELATIVE_ACCURACY = 0.001
+DEFAULT_MEMORY_MB = 256
+DEFAULT_SAMPLE_SIZE = 5000
+DEFAULT_MIN_SCORE = 0.88
+DEFAULT_INDEX = "bai3_results/similarity_index.npz"
+DEFAULT_PORT = 8770
+DEFAULT_CACHE_ENTRIES = 4096
+
+
+def scrape_parser(prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Thu thập thống kê cầu thủ từ FBref và lưu vào results.csv")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Số driver Chrome chạy song song")
+    parser.add_argument("--host-delay", type=float, default=PER_HOST_DELAY, help="Khoảng cách tối thiểu (giây) giữa hai lần tải cùng một host")
+    parser.add_argument("--incremental", action="store_true", help="So sánh với results.csv cũ và ghi changeset các cầu thủ thay đổi")
+    parser.add_argument("--refresh-partitions", action="store_true", help="Cào lại cả các phân vùng mùa cũ đã có dữ liệu")
+    add_partition_arguments(parser)
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
+    return parser
+
+
+def stats_parser(prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Phân tích thống kê cầu thủ từ results.csv")
+    parser.add_argument("--incremental", action="store_true", help="Chỉ tính lại thống kê của các đội có trong changeset của Bài 1")
+    parser.add_argument("--top-n", type=int, default=3, help="Số cầu thủ cao nhất/thấp nhất cho mỗi chỉ số")
+    parser.add_argument("--top-by", nargs="+", default=None, help="Cột nhóm thêm cho bảng top N, ví dụ: Position hoặc Squad Position")
+    parser.add_argument("--team-histograms", action="store_true", help="Vẽ thêm histogram cho từng đội")
+    parser.add_argument("--plot-workers", type=int, default=None, help="Số tiến trình vẽ biểu đồ (mặc định: số CPU)")
+    parser.add_argument("--compact", action="store_true",
+                        help="Giữ bảng thống kê ở dạng thu gọn (category, int nhỏ, float16/float32) và in dung lượng trước/sau")
+    parser.add_argument("--no-plots", action="store_true", help="Chỉ ghi top_3.txt và results2.csv, không vẽ histogram")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Đọc dữ liệu theo chunk và chỉ tính results2.csv (median qua sketch khi nhóm quá lớn)")
+    parser.add_argument("--inputs", nargs="+", default=None, help="Các file CSV đầu vào cho chế độ streaming (mặc định: results.csv)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Số dòng mỗi chunk ở chế độ streaming")
+    parser.add_argument("--jobs", type=int, default=1, help="Số tiến trình đọc song song các file ở chế độ streaming")
+    parser.add_argument("--save-state", default=None, help="Lưu trạng thái thống kê streaming để gộp về sau")
+    parser.add_argument("--merge-states", nargs="+", default=[], help="Gộp thêm các trạng thái đã lưu bằng --save-state")
+    parser.add_argument("--exact-limit", type=int, default=DEFAULT_EXACT_LIMIT,
+                        help="Số giá trị tối đa mỗi nhóm giữ nguyên để tính median chính xác")
+    parser.add_argument("--median-accuracy", type=float, default=DEFAULT_RELATIVE_ACCURACY,
+                        help="Sai số tương đối của median khi nhóm vượt --exact-limit")
+    add_partition_arguments(parser)
+    add_metrics_arguments(parser)
+    return parser
+
+
+def cluster_parser(prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Phân cụm cầu thủ bằng K-means và trực quan hóa bằng PCA")
+    parser.add_argument("--k-min", type=int, default=2, help="Giá trị k nhỏ nhất cần thử")
+    parser.add_argument("--k-max", type=int, default=10, help="Giá trị k lớn nhất cần thử")
+    parser.add_argument("--jobs", type=int, default=None, help="Số tiến trình chạy song song các giá trị k (mặc định: tất cả CPU)")
+    parser.add_argument("--silhouette-mode", choices=["auto", "exact", "sample"], default="auto",
+                        help="exact: tính đủ theo khối; sample: mẫu phân tầng kèm khoảng tin cậy; auto: tự chọn theo số cầu thủ")
+    parser.add_argument("--silhouette-sample-size", type=int, default=DEFAULT_SAMPLE_SIZE, help="Cỡ mẫu khi dùng chế độ sample")
+    parser.add_argument("--silhouette-memory-mb", type=float, default=DEFAULT_MEMORY_MB, help="Giới hạn bộ nhớ (MB) cho mỗi khối ma trận khoảng cách")
+    parser.add_argument("--streaming", action="store_true", help="Đọc dữ liệu theo chunk (IncrementalPCA, MiniBatchKMeans)")
+    parser.add_argument("--inputs", nargs="+", default=[RESULTS_CSV], help="Các file CSV đầu vào cho chế độ streaming")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Số dòng mỗi chunk ở chế độ streaming")
+    add_partition_arguments(parser)
+    parser.add_argument("--compact", action="store_true",
+                        help="Giữ bảng thống kê ở dạng thu gọn (category, int nhỏ, float16/float32) và in dung lượng trước/sau")
+    parser.add_argument("--no-plots", action="store_true", help="Không vẽ biểu đồ (không nạp matplotlib/seaborn), chỉ ghi nhãn cụm và model")
+    add_metrics_arguments(parser)
+    return parser
+
+
+def transfers_parser(prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Thu thập giá trị chuyển nhượng cầu thủ từ footballtransfers.com")
+    parser.add_argument("--backend", choices=["http", "selenium"], default="http",
+                        help="http: tải song song bằng aiohttp, chỉ dùng Selenium khi trang cần JavaScript")
+    parser.add_argument("--rate", type=float, default=async_fetch.DEFAULT_RATE, help="Số request/giây ban đầu cho mỗi host")
+    parser.add_argument("--concurrency", type=int, default=async_fetch.DEFAULT_CONCURRENCY, help="Số kết nối HTTP đồng thời tối đa")
+    parser.add_argument("--exhaustive", action="store_true", help="Cào toàn bộ các trang, không dừng sớm")
+    parser.add_argument("--lookup-teams", action="store_true",
+                        help="Tra trang đội bóng của những cầu thủ vẫn chưa tìm thấy sau khi cào danh sách")
+    parser.add_argument("--players", nargs="+", default=None, help="Chỉ tìm các cầu thủ này (chế độ tra cứu có mục tiêu)")
+    parser.add_argument("--teams", nargs="+", default=None, help="Chỉ tìm cầu thủ của các đội này")
+    parser.add_argument("--match-threshold", type=float, default=DEFAULT_MIN_SCORE,
+                        help="Điểm tương đồng tối thiểu (0-1) để ghép tên cầu thủ giữa hai nguồn")
+    parser.add_argument("--base-url", default=None, help="Thay TRANSFER_BASE_URL (ví dụ trỏ tới replay_server.py)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Giữ giá trị đã tìm được của các cầu thủ không có trong changeset của Bài 1, chỉ tìm cầu thủ mới/thay đổi "
+                             "và những người lần trước chưa tìm thấy (giá trị giữ lại không được cập nhật)")
+    add_partition_arguments(parser)
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
+    return parser
+
+
+def similar_parser(prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Tìm các cầu thủ có lối chơi giống nhất (chỉ mục do b3.py tạo)")
+    parser.add_argument("players", nargs="+", help="Tên cầu thủ cần tìm người giống (có thể nhiều tên)")
+    parser.add_argument("--k", type=int, default=10, help="Số cầu thủ giống nhất cho mỗi tên")
+    parser.add_argument("--positions", nargs="+", default=None, help="Chỉ trả về cầu thủ ở các vị trí này, ví dụ: FW MF")
+    parser.add_argument("--teams", nargs="+", default=None, help="Chỉ trả về cầu thủ của các đội này")
+    parser.add_argument("--index", default=DEFAULT_INDEX, help="File chỉ mục")
+    parser.add_argument("--output", default=None, help="Ghi kết quả ra CSV (mặc định: in ra màn hình)")
+    return parser
+
+
+def serve_parser(prog=None):
+    parser = argparse.ArgumentParser(
+        prog=prog, description="Server HTTP/JSON cục bộ tra cứu results.csv, results2.csv và player_transfer_values.csv",
+        epilog="Endpoint: /player?name=, /team?name=, /top?stat=&n=&position=&team=&order=asc|desc, "
+               "/aggregate?by=team|position&stat=&position=&team=, /status")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Cổng lắng nghe (0: để hệ điều hành chọn cổng trống)")
+    parser.add_argument("--results", default=RESULTS_CSV, help="File thống kê cầu thủ của Bài 1")
+    parser.add_argument("--results2", default=RESULTS2_CSV, help="File thống kê theo đội của Bài 2")
+    parser.add_argument("--transfers", default=TRANSFERS_CSV, help="File giá trị chuyển nhượng của Bài 4")
+    parser.add_argument("--cache-entries", type=int, default=DEFAULT_CACHE_ENTRIES, help="Số kết quả tối đa trong LRU cache")
+    add_partition_arguments(parser)
+    return parser
@@ -0,0 +1,257 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from column_schema import COLUMN_SCHEMA
+from stage_args import RESULTS_CSV
+
+RESULTS_TYPED = "results.arrow"
+PARTITION_ROOT = "data"
+MISSING_MARKERS = ['N/a', 'NaN', 'nan', 'None', '']
+MAX_DECIMALS = 6
+
+
+def _to_number(text, missing):
+    return pd.to_numeric(text.str.replace('%', '', regex=False).str.replace(',', '', regex=False).where(~missing), errors='coerce')
+
+
+def to_typed_frame(df):
+    # Chuyển bảng dạng chuỗi của results.csv sang kiểu khai báo trong COLUMN_SCHEMA: bỏ '%',
+    # dấu phẩy hàng nghìn, "N/a" thành null. Cột lạ (không có trong schema) mới phải đoán kiểu.
+    typed = {}
+    for col in df.columns:
+        series = df[col]
+        spec = COLUMN_SCHEMA.get(col)
+        if pd.api.types.is_numeric_dtype(series) and (spec is None or spec.dtype != 'str'):
+            typed[col] = series
+            continue
+        text = series.astype(str).str.strip()
+        missing = series.isna() | text.isin(MISSING_MARKERS)
+        if spec is not None:
+            if spec.dtype == 'str':
+                typed[col] = series.where(~missing, np.nan)
+                continue
+            numeric = _to_number(text, missing)
+            try:
+                typed[col] = numeric.astype(spec.dtype)
+            except (TypeError, ValueError):
+                typed[col] = numeric
+            continue
+        numeric = _to_number(text, missing)
+        if numeric.notna().any() or missing.all():
+            typed[col] = numeric
+        else:
+            typed[col] = series.where(~missing, np.nan)
+    return pd.DataFrame(typed, index=df.index)
+
+
+def write_typed_results(results_df, path=RESULTS_TYPED):
+    # File Arrow IPC không nén để có thể đọc bằng memory-map; pyarrow là phụ thuộc tùy chọn.
+    try:
+        import pyarrow as pa
+        import pyarrow.feather as feather
+    except ImportError:
+        print("Thông báo: chưa cài pyarrow, bỏ qua việc ghi results.arrow.")
+        return False
+    table = pa.Table.from_pandas(to_typed_frame(results_df), preserve_index=False)
+    feather.write_feather(table, path, compression="uncompressed")
+    return True
+
+
+def _typed_file_is_fresh(csv_path, typed_path):
+    if not os.path.exists(typed_path):
+        return False
+    if not os.path.exists(csv_path):
+        return True
+    return os.path.getmtime(typed_path) >= os.path.getmtime(csv_path)
+
+
+def load_results(columns=None, csv_path=RESULTS_CSV, typed_path=RESULTS_TYPED, memory_map=True):
+    # Đọc bảng thống kê đã có kiểu dữ liệu. Ưu tiên file Arrow (chỉ đọc các cột cần dùng),
+    # nếu không có hoặc cũ hơn results.csv thì đọc CSV rồi chuyển kiểu.
+    if _typed_file_is_fresh(csv_path, typed_path):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            pa = None
+        if pa is not None:
+            source = pa.memory_map(typed_path) if memory_map else pa.OSFile(typed_path)
+            table = pa.ipc.open_file(source).read_all()
+            if columns is not None:
+                table = table.select([col for col in columns if col in table.schema.names])
+            return table.to_pandas()
+    usecols = (lambda col: col in columns) if columns is not None else None
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False, usecols=usecols, encoding='utf-8-sig')
+    return to_typed_frame(df)
+
+
+NARROW_FLOATS = (np.float16, np.float32)
+
+
+def _restore_float(narrow):
+    # float16/float32 -> float64 đúng bằng số đã đọc từ CSV: mỗi giá trị được làm tròn về số chữ số thập phân d
+    # nhỏ nhất sao cho round(x, d) vẫn cho lại đúng giá trị float16/float32 đó. Không cần lưu thêm metadata, và
+    # vì chỉ phụ thuộc từng giá trị nên khôi phục một phần cột (một đội, các dòng chưa có sẵn) cũng đúng như cả cột.
+    values = narrow.astype("float64")
+    restored = values.copy()
+    pending = np.flatnonzero(np.isfinite(values))
+    for decimals in range(MAX_DECIMALS + 1):
+        if not len(pending):
+            break
+        rounded = np.round(values[pending], decimals)
+        done = rounded.astype(narrow.dtype) == narrow[pending]
+        restored[pending[done]] = rounded[done]
+        pending = pending[~done]
+    return restored
+
+
+def float64_array(series):
+    if series.dtype in NARROW_FLOATS:
+        return _restore_float(series.to_numpy())
+    return series.to_numpy(dtype="float64", na_value=np.nan)
+
+
+def float64_values(df, columns):
+    # Khối float64 của các cột chỉ số để tính toán; cột float16/float32 của bảng compact được khôi phục
+    # đúng giá trị gốc, nên kết quả thống kê giống hệt khi đọc bảng đầy đủ.
+    return pd.DataFrame({col: float64_array(df[col]) for col in columns}, index=df.index)
+
+
+def _smallest_int_dtype(values, nullable):
+    low, high = values.min(), values.max()
+    for bits in (8, 16, 32):
+        info = np.iinfo(f"int{bits}")
+        if info.min <= low and high <= info.max:
+            return f"Int{bits}" if nullable else f"int{bits}"
+    return "Int64" if nullable else "int64"
+
+
+def compact_frame(df):
+    # Cột chuỗi lặp lại nhiều (quốc tịch, đội, vị trí) thành category: mỗi chuỗi chỉ lưu một lần, các dòng
+    # giữ mã số; cột gần như không lặp (tên cầu thủ) giữ dạng chuỗi vì category còn tốn thêm bảng mã.
+    # Cột chỉ số toàn số nguyên thành int nhỏ nhất đủ chứa (Int* nếu có ô trống), cột số thực thành
+    # float16 rồi float32 khi _restore_float khôi phục được đúng từng giá trị (chỉ số FBref thường chỉ có
+    # 3 chữ số có nghĩa nên vừa float16), nếu không thì giữ float64.
+    compact = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype in NARROW_FLOATS or pd.api.types.is_bool_dtype(series):
+            compact[col] = series
+            continue
+        if not pd.api.types.is_numeric_dtype(series):
+            repeated = series.nunique() <= len(series) // 2
+            compact[col] = series.astype("category" if repeated else "str")
+            continue
+        values = series.to_numpy(dtype="float64", na_value=np.nan)
+        present = values[~np.isnan(values)]
+        if len(present) and np.array_equal(present, np.round(present)):
+            compact[col] = series.astype(_smallest_int_dtype(present, nullable=len(present) < len(values)))
+            continue
+        for dtype in NARROW_FLOATS:
+            narrow = values.astype(dtype)
+            if np.array_equal(_restore_float(narrow), values, equal_nan=True):
+                compact[col] = pd.Series(narrow, index=df.index)
+                break
+        else:
+            compact[col] = series
+    return pd.DataFrame(compact, index=df.index)
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+
+def _concat_compact(frames):
+    # Ghép các bảng compact mà không bung category thành chuỗi: hợp các category trước khi concat;
+    # cột có kiểu số thực khác nhau giữa các phân vùng được khôi phục về float64 rồi compact lại sau khi ghép.
+    frames = [frame.copy() for frame in frames]
+    for col in frames[0].columns:
+        dtypes = [frame[col].dtype for frame in frames if col in frame.columns]
+        if all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            categories = sorted(set().union(*(frame[col].cat.categories for frame in frames if col in frame.columns)))
+            for frame in frames:
+                if col in frame.columns:
+                    frame[col] = frame[col].cat.set_categories(categories)
+        elif any(dtype in NARROW_FLOATS for dtype in dtypes) and len(set(dtypes)) > 1:
+            for frame in frames:
+                if col in frame.columns:
+                    frame[col] = float64_array(frame[col])
+    return compact_frame(pd.concat(frames, ignore_index=True))
+
+
+def partition_dir(league, season, root=PARTITION_ROOT):
+    # Bố cục kiểu Hive: <root>/league=<giải>/season=<mùa>/results.csv (+ results.arrow).
+    return os.path.join(root, f"league={league}", f"season={season}")
+
+
+def list_partitions(root=PARTITION_ROOT, leagues=None, seasons=None):
+    # Cắt tỉa theo tên thư mục: phân vùng không được chọn không bị mở file nào.
+    # Trả về [(giải, mùa, thư mục)] theo thứ tự giải rồi mùa.
+    partitions = []
+    if not os.path.isdir(root):
+        return partitions
+    for league_entry in sorted(os.listdir(root)):
+        key, _, league = league_entry.partition('=')
+        if key != "league" or (leagues is not None and league not in leagues):
+            continue
+        league_path = os.path.join(root, league_entry)
+        for season_entry in sorted(os.listdir(league_path)):
+            key, _, season = season_entry.partition('=')
+            if key != "season" or (seasons is not None and season not in seasons):
+                continue
+            path = os.path.join(league_path, season_entry)
+            if os.path.exists(os.path.join(path, RESULTS_CSV)) or os.path.exists(os.path.join(path, RESULTS_TYPED)):
+                partitions.append((league, season, path))
+    return partitions
+
+
+def _read_partitions(root, leagues, seasons, columns, compact):
+    # Trả về (các bảng của từng phân vùng, tổng dung lượng MB khi chưa thu gọn).
+    partitions = list_partitions(root, leagues, seasons)
+    if not partitions:
+        raise FileNotFoundError(f"Không có phân vùng nào trong '{root}' khớp với giải {leagues or 'bất kỳ'}, mùa {seasons or 'bất kỳ'}.")
+    frames = []
+    full_mb = 0.0
+    for league, season, path in partitions:
+        df = load_results(columns, csv_path=os.path.join(path, RESULTS_CSV), typed_path=os.path.join(path, RESULTS_TYPED))
+        df.insert(0, "Season", season)
+        df.insert(0, "League", league)
+        if compact:
+            full_mb += memory_mb(df)
+            df = compact_frame(df)
+        frames.append(df)
+    return frames, full_mb
+
+
+def load_partitions(root=PARTITION_ROOT, leagues=None, seasons=None, columns=None, compact=False):
+    # Đọc và nối các phân vùng được chọn, thêm cột League và Season lấy từ tên thư mục.
+    # compact=True thu gọn từng phân vùng ngay sau khi đọc, nên bảng đầy đủ của cả kho không bao giờ nằm trong bộ nhớ.
+    frames, _ = _read_partitions(root, leagues, seasons, columns, compact)
+    return _concat_compact(frames) if compact else pd.concat(frames, ignore_index=True)
+
+
+def load_selected_results(columns=None, partitions=None, compact=False):
+    # partitions là PartitionSelection của crawl_plan, hoặc None để đọc results.csv như trước.
+    # compact=True in dung lượng bảng trước và sau khi thu gọn.
+    if partitions is None:
+        df = load_results(columns)
+        if not compact:
+            return df
+        before = memory_mb(df)
+        df = compact_frame(df)
+    else:
+        frames, before = _read_partitions(partitions.root, partitions.leagues, partitions.seasons, columns, compact)
+        if not compact:
+            return pd.concat(frames, ignore_index=True)
+        df = _concat_compact(frames)
+    after = memory_mb(df)
+    print(f"Bộ nhớ bảng thống kê: {before:.2f} MB -> {after:.2f} MB (giảm {before / max(after, 1e-9):.1f} lần)")
+    return df
+
+
+def partition_result_paths(partitions):
+    # Đường dẫn results.csv của các phân vùng được chọn (cho các chế độ đọc theo chunk).
+    return [os.path.join(path, RESULTS_CSV)
+            for _, _, path in list_partitions(partitions.root, partitions.leagues, partitions.seasons)
+            if os.path.exists(os.path.join(path, RESULTS_CSV))]
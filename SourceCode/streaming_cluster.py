@@ -0,0 +1,216 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from cluster_model import ClusterModel
+from column_schema import columns_for, stat_columns
+from silhouette_eval import evaluate_silhouette
+from stage_args import DEFAULT_CHUNKSIZE
+from stats_loader import RESULTS_CSV, to_typed_frame
+
+DEFAULT_SAMPLE_SIZE = 5000
+
+
+class RunningMoments:
+    # Trung bình và tổng bình phương độ lệch của từng cột, bỏ qua NaN, gộp giữa các chunk theo công thức của Chan.
+    # merge() gộp trạng thái tính ở nơi khác (tiến trình khác, phần dữ liệu khác) theo cùng công thức.
+    def __init__(self, n_features):
+        self.count = np.zeros(n_features)
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.n_rows = 0
+
+    def update(self, X):
+        present = ~np.isnan(X)
+        count = present.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, np.nansum(X, axis=0) / np.maximum(count, 1), 0.0)
+        m2 = np.nansum(np.where(present, X - mean, 0.0) ** 2, axis=0)
+        self._combine(len(X), count, mean, m2)
+
+    def merge(self, other):
+        self._combine(other.n_rows, other.count, other.mean, other.m2)
+
+    def _combine(self, n_rows, count, mean, m2):
+        self.n_rows += n_rows
+        total = self.count + count
+        delta = mean - self.mean
+        safe_total = np.maximum(total, 1)
+        self.mean = self.mean + delta * count / safe_total
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * count / safe_total
+        self.count = total
+
+    def imputed_variance(self):
+        # Sau khi điền giá trị trống bằng trung bình, các ô được điền không đóng góp độ lệch,
+        # nên phương sai (ddof=0, như StandardScaler) là m2 chia cho tổng số dòng.
+        return self.m2 / max(self.n_rows, 1)
+
+
+def iter_stat_frames(paths, columns, chunksize=DEFAULT_CHUNKSIZE):
+    # Đọc lần lượt từng file, mỗi lần một chunk, đã chuyển kiểu theo COLUMN_SCHEMA.
+    for path in paths:
+        reader = pd.read_csv(path, dtype=str, keep_default_na=False, encoding='utf-8-sig',
+                             usecols=lambda col: col in columns, chunksize=chunksize)
+        for chunk in reader:
+            yield to_typed_frame(chunk)
+
+
+def _iter_arrays(paths, columns, chunksize, min_rows):
+    # partial_fit của IncrementalPCA/MiniBatchKMeans cần đủ số dòng tối thiểu, nên chunk
+    # cuối quá nhỏ được gộp vào chunk liền trước.
+    previous = None
+    for frame in iter_stat_frames(paths, columns, chunksize):
+        X = frame.reindex(columns=columns).to_numpy(dtype="float64", na_value=np.nan)
+        if previous is not None and len(X) < min_rows:
+            previous = np.vstack([previous, X])
+            continue
+        if previous is not None:
+            yield previous
+        previous = X
+    if previous is not None:
+        yield previous
+
+
+def _fitted_preprocessing(columns, moments):
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import StandardScaler
+
+    imputer = SimpleImputer(strategy='mean').fit(pd.DataFrame([moments.mean], columns=columns))
+    variance = moments.imputed_variance()
+    scaler = StandardScaler()
+    scaler.mean_ = moments.mean.copy()
+    scaler.var_ = variance
+    scaler.scale_ = np.where(variance > 0, np.sqrt(variance), 1.0)
+    scaler.n_samples_seen_ = moments.n_rows
+    scaler.n_features_in_ = len(columns)
+    scaler.feature_names_in_ = np.asarray(columns, dtype=object)
+    return imputer, scaler
+
+
+def fit_streaming(paths, k_values, chunksize=DEFAULT_CHUNKSIZE, sample_size=DEFAULT_SAMPLE_SIZE,
+                  random_state=42, n_components=2):
+    # Lượt 1: trung bình/phương sai chạy cho imputer và scaler, cùng một mẫu ngẫu nhiên cố định cỡ
+    # (giữ sample_size dòng có khóa ngẫu nhiên nhỏ nhất). Lượt 2: IncrementalPCA và một
+    # MiniBatchKMeans cho mỗi k học từ từng chunk đã chuẩn hóa. Bộ nhớ chỉ phụ thuộc chunksize.
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.decomposition import IncrementalPCA
+
+    k_values = list(k_values)
+    candidate_cols = stat_columns()
+    header_cols = columns_for('cluster')
+    moments = RunningMoments(len(candidate_cols))
+    rng = np.random.default_rng(random_state)
+    sample = None
+    for frame in iter_stat_frames(paths, header_cols, chunksize):
+        X = frame.reindex(columns=candidate_cols).to_numpy(dtype="float64", na_value=np.nan)
+        moments.update(X)
+        frame = frame.assign(_sample_key=rng.random(len(frame)))
+        sample = frame if sample is None else pd.concat([sample, frame], ignore_index=True)
+        sample = sample.nsmallest(sample_size, '_sample_key')
+    if sample is None:
+        raise ValueError("Không có dữ liệu để phân cụm.")
+
+    keep = moments.count > 0
+    columns = [col for col, flag in zip(candidate_cols, keep) if flag]
+    kept_moments = RunningMoments(len(columns))
+    kept_moments.count, kept_moments.mean, kept_moments.m2 = moments.count[keep], moments.mean[keep], moments.m2[keep]
+    kept_moments.n_rows = moments.n_rows
+    imputer, scaler = _fitted_preprocessing(columns, kept_moments)
+
+    fill = kept_moments.mean
+    mean, scale = scaler.mean_, scaler.scale_
+    ipca = IncrementalPCA(n_components=n_components)
+    kmeans_by_k = {k: MiniBatchKMeans(n_clusters=k, random_state=random_state, n_init=3, batch_size=1024)
+                   for k in k_values}
+    min_rows = max([n_components] + k_values)
+    for X in _iter_arrays(paths, columns, chunksize, min_rows):
+        X = (np.where(np.isnan(X), fill, X) - mean) / scale
+        ipca.partial_fit(X)
+        for model in kmeans_by_k.values():
+            model.partial_fit(X)
+    sample = sample.drop(columns='_sample_key').sort_index().reset_index(drop=True)
+    return {"columns": columns, "imputer": imputer, "scaler": scaler, "pca": ipca,
+            "kmeans": kmeans_by_k, "sample": sample, "n_rows": moments.n_rows}
+
+
+def score_sample(fit, silhouette_fn=evaluate_silhouette):
+    # Inertia và silhouette cho từng k được tính trên mẫu đã giữ lại ở lượt 1.
+    results = []
+    for k, kmeans in fit["kmeans"].items():
+        model = ClusterModel(fit["columns"], fit["imputer"], fit["scaler"], kmeans, fit["pca"])
+        X = model.transform(fit["sample"])
+        labels = model.predict(fit["sample"])
+        inertia = float(((X - kmeans.cluster_centers_[labels]) ** 2).sum())
+        try:
+            info = silhouette_fn(X, labels)
+            silhouette = info["score"] if isinstance(info, dict) else info
+        except ValueError:
+            info, silhouette = None, -1
+        results.append({"k": k, "model": kmeans, "labels": labels, "inertia": inertia,
+                        "silhouette": silhouette, "silhouette_info": info})
+    return results
+
+
+def assign_streaming(model, paths, output_path, chunksize=DEFAULT_CHUNKSIZE):
+    # Lượt cuối: ghi Player/Squad, cụm và tọa độ PCA của mọi dòng ra CSV theo từng chunk.
+    header = True
+    n_rows = 0
+    for frame in iter_stat_frames(paths, columns_for('cluster'), chunksize):
+        predictions = model.predict_and_project(frame.reindex(columns=['Player', 'Squad'] + model.columns))
+        if 'Squad' in frame.columns:
+            predictions.insert(1, 'Squad', frame['Squad'])
+        predictions.to_csv(output_path, mode='w' if header else 'a', header=header, index=False, encoding='utf-8')
+        header = False
+        n_rows += len(predictions)
+    return n_rows
+
+
+def compare_with_batch(csv_path=RESULTS_CSV, k=3, chunksize=100):
+    # So sánh với đường batch hiện tại của b3.py trên cùng một file nhỏ.
+    from sklearn.cluster import KMeans
+    from sklearn.decomposition import PCA
+    from sklearn.impute import SimpleImputer
+    from sklearn.metrics import adjusted_rand_score
+    from sklearn.preprocessing import StandardScaler
+
+    from b3 import identify_statistic_columns_for_clustering
+    from stats_loader import load_results
+
+    df = load_results(columns=columns_for('cluster'), csv_path=csv_path, typed_path="")
+    cols = identify_statistic_columns_for_clustering(df)
+    imputer = SimpleImputer(strategy='mean').fit(df[cols])
+    scaler = StandardScaler().fit(pd.DataFrame(imputer.transform(df[cols]), columns=cols))
+    X = scaler.transform(pd.DataFrame(imputer.transform(df[cols]), columns=cols))
+    batch_kmeans = KMeans(n_clusters=k, init='k-means++', n_init='auto', random_state=42).fit(X)
+    batch_labels = batch_kmeans.labels_
+    batch_pca = PCA(n_components=2, random_state=42).fit(X)
+
+    fit = fit_streaming([csv_path], [k], chunksize=chunksize, sample_size=len(df))
+    stream = ClusterModel(fit["columns"], fit["imputer"], fit["scaler"], fit["kmeans"][k], fit["pca"])
+    stream_labels = stream.predict(df)
+    stream_X = stream.transform(df)
+    stream_inertia = ((stream_X - fit["kmeans"][k].cluster_centers_[stream_labels]) ** 2).sum()
+    cosines = np.abs(np.sum(batch_pca.components_ * fit["pca"].components_, axis=1))
+    return {
+        "same_columns": fit["columns"] == cols,
+        "imputer_max_diff": float(np.max(np.abs(fit["imputer"].statistics_ - imputer.statistics_))),
+        "scaler_mean_max_diff": float(np.max(np.abs(fit["scaler"].mean_ - scaler.mean_))),
+        "scaler_scale_max_rel_diff": float(np.max(np.abs(fit["scaler"].scale_ / scaler.scale_ - 1))),
+        "pca_component_cosines": cosines.round(4).tolist(),
+        "pca_explained_variance_ratio": [batch_pca.explained_variance_ratio_.round(4).tolist(),
+                                         fit["pca"].explained_variance_ratio_.round(4).tolist()],
+        # Cùng dữ liệu, KMeans với seed khác nhau cũng chỉ đạt ARI khoảng 0.8, nên inertia là thước đo chính.
+        "inertia_ratio": float(stream_inertia / batch_kmeans.inertia_),
+        "adjusted_rand_index": float(adjusted_rand_score(batch_labels, stream_labels)),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="So sánh phân cụm streaming với đường batch của b3.py trên dữ liệu nhỏ")
+    parser.add_argument("--input", default=RESULTS_CSV)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--chunksize", type=int, default=100)
+    args = parser.parse_args()
+    for key, value in compare_with_batch(args.input, args.k, args.chunksize).items():
+        print(f"{key}: {value}")
@@ -0,0 +1,303 @@
+import argparse
+import math
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from column_schema import columns_for, stat_columns
+from stats_loader import RESULTS_CSV, list_partitions
+from stage_args import DEFAULT_EXACT_LIMIT, DEFAULT_RELATIVE_ACCURACY
+from streaming_cluster import DEFAULT_CHUNKSIZE, RunningMoments, iter_stat_frames
+
+# Sai số của results2.csv ở chế độ streaming so với compute_group_statistics của b2.py:
+# - Mean, Std: chính xác tới sai số làm tròn dấu phẩy động (gộp theo công thức Welford/Chan, tương đối ~1e-12),
+#   nên sau khi làm tròn 2 chữ số chỉ có thể lệch 0.01 khi giá trị thật nằm sát ranh giới làm tròn.
+# - Median: chính xác khi nhóm có không quá exact_limit giá trị của chỉ số; nhóm lớn hơn dùng sketch với
+#   |median sketch - median thật| <= relative_accuracy * (|x_lo| + |x_hi|) / 2, trong đó x_lo, x_hi là hai
+#   giá trị ở giữa (trùng nhau khi số giá trị lẻ).
+MIN_MAGNITUDE = 1e-9
+STATE_VERSION = 1
+MEASURES = ["Median", "Mean", "Std"]
+
+
+class QuantileSketch:
+    # Median gộp được giữa các chunk và tiến trình. Khi còn ít giá trị thì giữ nguyên chúng (median chính xác);
+    # vượt exact_limit thì chuyển sang sketch log-bucket kiểu DDSketch: x > 0 rơi vào ô k = ceil(log_gamma(x)),
+    # gamma = (1 + a) / (1 - a), mỗi ô được đại diện bằng 2 * gamma^k / (gamma + 1), nên giá trị trả về ở mọi hạng
+    # lệch tương đối không quá a so với giá trị thật ở hạng đó. Gộp hai sketch là cộng số đếm của từng ô,
+    # kết quả không phụ thuộc thứ tự gộp (khác t-digest, không có sai số tích lũy theo thứ tự dữ liệu).
+    def __init__(self, exact_limit=DEFAULT_EXACT_LIMIT, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        self.exact_limit = exact_limit
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.count = 0
+        self.values = []
+        self.n_values = 0
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+
+    @property
+    def exact(self):
+        return self.values is not None
+
+    def add(self, values):
+        if not len(values):
+            return
+        self.count += len(values)
+        if self.exact:
+            self.values.append(values)
+            self.n_values += len(values)
+            if self.n_values > self.exact_limit:
+                self._to_buckets()
+        else:
+            self._add_to_buckets(values)
+
+    def _to_buckets(self):
+        values = np.concatenate(self.values) if self.values else np.empty(0)
+        self.values = None
+        self.n_values = 0
+        self._add_to_buckets(values)
+
+    def _add_to_buckets(self, values):
+        magnitude = np.abs(values)
+        self.zeros += int((magnitude <= MIN_MAGNITUDE).sum())
+        for store, selected in ((self.positive, values > MIN_MAGNITUDE), (self.negative, values < -MIN_MAGNITUDE)):
+            if not selected.any():
+                continue
+            keys = np.ceil(np.log(magnitude[selected]) / self.log_gamma).astype(np.int64)
+            keys, counts = np.unique(keys, return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                store[key] = store.get(key, 0) + count
+
+    def merge(self, other):
+        if (other.exact_limit, other.relative_accuracy) != (self.exact_limit, self.relative_accuracy):
+            raise ValueError("Không gộp được hai sketch có exact_limit/relative_accuracy khác nhau.")
+        if other.exact:
+            for values in other.values:
+                self.add(values)
+            return
+        if self.exact:
+            self._to_buckets()
+        self.count += other.count
+        self.zeros += other.zeros
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+
+    def median(self):
+        if self.count == 0:
+            return np.nan
+        if self.exact:
+            return float(np.median(np.concatenate(self.values)))
+        # Thứ tự tăng dần: ô âm có |x| lớn trước, rồi số 0, rồi ô dương. Số chẵn giá trị: trung bình hai hạng giữa.
+        negative_keys = sorted(self.negative, reverse=True)
+        positive_keys = sorted(self.positive)
+        scale = 2 / (self.gamma + 1)
+        bucket_values = np.concatenate([-scale * np.exp(np.asarray(negative_keys, dtype="float64") * self.log_gamma),
+                                        [0.0], scale * np.exp(np.asarray(positive_keys, dtype="float64") * self.log_gamma)])
+        bucket_counts = np.asarray([self.negative[key] for key in negative_keys] + [self.zeros]
+                                   + [self.positive[key] for key in positive_keys])
+        ends = np.cumsum(bucket_counts)
+        ranks = [(self.count - 1) // 2, self.count // 2]
+        return float(bucket_values[np.searchsorted(ends, ranks, side="right")].mean())
+
+
+class GroupStatistics:
+    # Trạng thái một lượt của results2.csv: dòng "all" và mỗi đội có RunningMoments (mean/std) và một
+    # QuantileSketch (median) cho từng chỉ số. Hai trạng thái gộp được bằng merge(), nên các phần của một kho
+    # dữ liệu lớn có thể được tính ở các tiến trình khác nhau (hoặc các máy khác nhau qua save/load) rồi ghép lại.
+    # Khóa nhóm là (đội, mùa): các phần của cùng một đội ở cùng một mùa được gộp vào nhau.
+    def __init__(self, stat_cols, exact_limit=DEFAULT_EXACT_LIMIT, relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+        self.stat_cols = list(stat_cols)
+        self.exact_limit = exact_limit
+        self.relative_accuracy = relative_accuracy
+        self.overall = self._new_state()
+        self.groups = {}
+
+    def _new_state(self):
+        return (RunningMoments(len(self.stat_cols)),
+                [QuantileSketch(self.exact_limit, self.relative_accuracy) for _ in self.stat_cols])
+
+    @staticmethod
+    def _update_state(state, X):
+        moments, sketches = state
+        moments.update(X)
+        for j, sketch in enumerate(sketches):
+            column = X[:, j]
+            sketch.add(column[~np.isnan(column)])
+
+    def update(self, frame, teams, season=None):
+        # Dòng không có đội chỉ được tính vào "all" (như groupby của pandas).
+        X = frame.reindex(columns=self.stat_cols).to_numpy(dtype="float64", na_value=np.nan)
+        self._update_state(self.overall, X)
+        codes, names = pd.factorize(pd.Series(teams, index=frame.index))
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+        for code, name in enumerate(names):
+            key = (name, season)
+            if key not in self.groups:
+                self.groups[key] = self._new_state()
+            self._update_state(self.groups[key], X[order[bounds[code]:bounds[code + 1]]])
+
+    @staticmethod
+    def _merge_state(state, other):
+        state[0].merge(other[0])
+        for sketch, other_sketch in zip(state[1], other[1]):
+            sketch.merge(other_sketch)
+
+    def merge(self, other):
+        if other.stat_cols != self.stat_cols:
+            raise ValueError("Không gộp được hai trạng thái có danh sách chỉ số khác nhau.")
+        self._merge_state(self.overall, other.overall)
+        for name, state in other.groups.items():
+            if name in self.groups:
+                self._merge_state(self.groups[name], state)
+            else:
+                self.groups[name] = state
+        return self
+
+    @property
+    def n_rows(self):
+        return self.overall[0].n_rows
+
+    def analyzed_columns(self):
+        # Giống identify_statistic_columns của b2.py: chỉ giữ chỉ số có dữ liệu cho hơn một nửa số dòng.
+        count = self.overall[0].count
+        return [col for j, col in enumerate(self.stat_cols) if count[j] > self.n_rows / 2]
+
+    def to_frame(self):
+        # Cùng định dạng với results2.csv của b2.py: Group, rồi Median/Mean/Std của từng chỉ số, làm tròn 2 chữ số.
+        columns = self.analyzed_columns()
+        index = [self.stat_cols.index(col) for col in columns]
+        # Như b2.py: khi dữ liệu có nhiều mùa, cùng một đội ở các mùa khác nhau là các nhóm riêng "Đội (mùa)".
+        several_seasons = len({season for _, season in self.groups}) > 1
+        labels = [team if season is None or not several_seasons else f"{team} ({season})" for team, season in self.groups]
+        rows = []
+        for name, (moments, sketches) in zip(["all"] + labels, [self.overall] + list(self.groups.values())):
+            count = moments.count[index]
+            mean = np.where(count > 0, moments.mean[index], np.nan)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                std = np.where(count > 1, np.sqrt(moments.m2[index] / (count - 1)), np.nan)
+            row = {"Group": name}
+            for position, (col, j) in enumerate(zip(columns, index)):
+                row[f"Median of {col}"] = sketches[j].median()
+                row[f"Mean of {col}"] = mean[position]
+                row[f"Std of {col}"] = std[position]
+            rows.append(row)
+        result = pd.DataFrame(rows, columns=["Group"] + [f"{measure} of {col}" for col in columns for measure in MEASURES])
+        numeric = result.columns[1:]
+        result[numeric] = result[numeric].astype("float64").round(2)
+        return result
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump({"version": STATE_VERSION, "state": self}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            payload = pickle.load(f)
+        if not isinstance(payload, dict) or payload.get("version") != STATE_VERSION:
+            raise ValueError(f"File trạng thái không đúng phiên bản {STATE_VERSION}: {path}")
+        return payload["state"]
+
+
+def sources_from_partitions(partitions):
+    # [(đường dẫn results.csv, mùa)] của các phân vùng được chọn.
+    return [(os.path.join(path, RESULTS_CSV), season)
+            for _, season, path in list_partitions(partitions.root, partitions.leagues, partitions.seasons)
+            if os.path.exists(os.path.join(path, RESULTS_CSV))]
+
+
+def aggregate_file(path, season=None, chunksize=DEFAULT_CHUNKSIZE, exact_limit=DEFAULT_EXACT_LIMIT,
+                   relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+    state = GroupStatistics(stat_columns(), exact_limit, relative_accuracy)
+    for frame in iter_stat_frames([path], columns_for('stats'), chunksize):
+        teams = frame['Squad'] if 'Squad' in frame.columns else pd.Series(np.nan, index=frame.index)
+        state.update(frame, teams, season)
+    return state
+
+
+def _aggregate_source(job):
+    (path, season), options = job
+    return aggregate_file(path, season, **options)
+
+
+def aggregate_sources(sources, chunksize=DEFAULT_CHUNKSIZE, workers=1, exact_limit=DEFAULT_EXACT_LIMIT,
+                      relative_accuracy=DEFAULT_RELATIVE_ACCURACY):
+    # Mỗi file một trạng thái riêng (song song khi workers > 1), sau đó gộp theo đúng thứ tự file,
+    # nên thứ tự các đội trong results2.csv không phụ thuộc số tiến trình.
+    options = {"chunksize": chunksize, "exact_limit": exact_limit, "relative_accuracy": relative_accuracy}
+    jobs = [((path, season), options) for path, season in sources]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as executor:
+            states = list(executor.map(_aggregate_source, jobs))
+    else:
+        states = [_aggregate_source(job) for job in jobs]
+    if not states:
+        raise ValueError("Không có file đầu vào nào.")
+    merged = states[0]
+    for state in states[1:]:
+        merged.merge(state)
+    return merged
+
+
+def compare_with_batch(csv_path=RESULTS_CSV, chunksize=100, exact_limit=0):
+    # So sánh với compute_group_statistics của b2.py trên cùng một file. exact_limit=0 buộc mọi median đi
+    # qua sketch để kiểm tra cận sai số; sai số cho phép được tính từ hai giá trị giữa thật của từng ô.
+    from b2 import compute_group_statistics, identify_statistic_columns
+    from stats_loader import float64_values, load_results
+
+    df = load_results(columns=columns_for('stats'), csv_path=csv_path, typed_path="")
+    stat_cols = identify_statistic_columns(df, exclude_cols=['Player', 'Nation', 'Squad', 'Position'])
+    batch = compute_group_statistics(df, stat_cols, 'Squad').set_index("Group")
+    parts = [df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize)]
+    states = []
+    for part in parts:
+        state = GroupStatistics(stat_columns(), exact_limit=exact_limit)
+        state.update(part, part['Squad'])
+        states.append(state)
+    stream = states[0]
+    for state in states[1:]:
+        stream.merge(state)
+    stream = stream.to_frame().set_index("Group")
+
+    values = float64_values(df, stat_cols)
+    groups = {"all": values, **{name: part for name, part in values.groupby(df['Squad'], sort=False)}}
+    allowed = {}
+    for name, part in groups.items():
+        ordered = np.sort(part.to_numpy(), axis=0)
+        counts = part.notna().sum().to_numpy()
+        lo = np.take_along_axis(ordered, np.maximum((counts - 1) // 2, 0)[None, :], axis=0)[0]
+        hi = np.take_along_axis(ordered, np.maximum(counts // 2, 0)[None, :], axis=0)[0]
+        # Cả hai phía đều đã làm tròn 2 chữ số, nên cộng thêm 0.01.
+        allowed[name] = DEFAULT_RELATIVE_ACCURACY * (np.abs(lo) + np.abs(hi)) / 2 + 0.01
+    median_cols = [f"Median of {col}" for col in stat_cols]
+    median_error = (stream.loc[batch.index, median_cols] - batch[median_cols]).abs()
+    bound = pd.DataFrame([allowed[name] for name in batch.index], index=batch.index, columns=median_cols)
+    other_cols = [col for col in batch.columns if col not in median_cols]
+    return {
+        "same_columns": list(stream.columns) == list(batch.columns),
+        "same_groups": list(stream.index) == list(batch.index),
+        "mean_std_max_abs_diff": float(np.nanmax((stream.loc[batch.index, other_cols] - batch[other_cols]).abs().to_numpy())),
+        "median_max_abs_diff": float(np.nanmax(median_error.to_numpy())),
+        "median_within_bound": bool(((median_error <= bound) | median_error.isna()).all().all()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="So sánh thống kê streaming (results2.csv) với đường batch của b2.py")
+    parser.add_argument("--input", default=RESULTS_CSV)
+    parser.add_argument("--chunksize", type=int, default=100)
+    parser.add_argument("--exact-limit", type=int, default=0, help="0: mọi median đều đi qua sketch")
+    args = parser.parse_args()
+    for key, value in compare_with_batch(args.input, args.chunksize, args.exact_limit).items():
+        print(f"{key}: {value}")
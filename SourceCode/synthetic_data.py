@@ -0,0 +1,181 @@
+import html
+
+import numpy as np
+import pandas as pd
+
+from column_schema import COLUMN_SCHEMA, OUTPUT_COLUMNS
+
+CATEGORY_STATS = {
+    "standard": ['goals', 'assists', 'cards_yellow', 'cards_red', 'xg', 'xg_assist',
+                 'progressive_carries', 'progressive_passes', 'progressive_passes_received',
+                 'goals_per90', 'assists_per90', 'xg_per90'],
+    "keepers": ['gk_goals_against_per90', 'gk_save_pct', 'gk_clean_sheets_pct', 'gk_pens_save_pct'],
+    "shooting": ['goals', 'shots_on_target_pct', 'shots_on_target_per90', 'goals_per_shot', 'average_shot_distance', 'xg'],
+    "passing": ['passes_completed', 'passes_pct', 'passes_progressive_distance', 'passes_pct_short',
+                'passes_pct_medium', 'passes_pct_long', 'assisted_shots', 'passes_into_final_third',
+                'passes_into_penalty_area', 'crosses_into_penalty_area', 'progressive_passes'],
+    "passing_types": ['passes_live', 'passes_dead', 'crosses', 'passes_completed'],
+    "gca": ['sca', 'sca_per90', 'gca', 'gca_per90'],
+    "defense": ['tackles', 'tackles_won', 'challenges_attempted', 'challenges_lost', 'blocks',
+                'blocked_shots', 'blocked_passes', 'interceptions'],
+    "possession": ['touches', 'touches_def_pen_area', 'touches_def_3rd', 'touches_mid_3rd', 'touches_att_3rd',
+                   'touches_att_pen_area', 'take_ons_attempted', 'take_ons_successful_pct', 'take_ons_tackled_pct',
+                   'carries', 'carries_progressive_distance', 'carries_into_final_third', 'carries_into_penalty_area',
+                   'carries_miscontrols', 'carries_dispossessed', 'passes_received'],
+    "misc": ['fouls', 'fouled', 'offsides', 'crosses', 'ball_recoveries', 'aerials_won', 'aerials_lost', 'aerials_won_pct'],
+}
+
+NATIONS = ['eng ENG', 'fr FRA', 'es ESP', 'br BRA', 'de GER', 'pt POR', 'ar ARG', 'nl NED']
+POSITIONS = ['GK', 'DF', 'MF', 'FW', 'DF,MF', 'MF,FW', 'FW,MF']
+FIRST_NAMES = ['Adam', 'Ben', 'Carlos', 'David', 'Erling', 'Felix', 'Gabriel', 'Harry', 'Ivan', 'James',
+               'Kai', 'Luis', 'Mohamed', 'Nico', 'Oscar', 'Pedro', 'Rodri', 'Son', 'Thomas', 'Virgil']
+NAME_FIRST = FIRST_NAMES + ['Martin', 'Łukasz', 'Vinícius', 'Iñaki', 'Rúben', 'Jérémy', 'Dušan', 'Bjørn',
+                           'Joško', 'Matías', 'Sébastien', 'Kaoru', 'Youssef', 'Ángel', 'Çağlar', 'Heung-min']
+SURNAME_SYLLABLES = ['al', 'ber', 'ca', 'do', 'fer', 'gar', 'hen', 'ko', 'lo', 'mar', 'nez', 'ov', 'pe', 'ri',
+                     'san', 'to', 'vić', 'wa', 'ze', 'ström', 'ø', 'gaard', 'mé', 'son', 'ski', 'ić', 'ez', 'ra']
+
+
+def make_player_frame(n_players, n_teams=20, seed=0, transfer_rate=0.0):
+    # transfer_rate: tỉ lệ cầu thủ chuyển đội giữa mùa, FBref liệt kê họ một dòng cho mỗi đội.
+    rng = np.random.default_rng(seed)
+    players = pd.Series([f"{FIRST_NAMES[i % len(FIRST_NAMES)]} Player{i}" for i in range(n_players)])
+    nation_idx = rng.integers(0, len(NATIONS), n_players)
+    nations = [NATIONS[i].replace(' ', '') for i in nation_idx]
+    minutes = rng.integers(0, 3420, n_players)
+    games = np.maximum(1, minutes // 80)
+    df = pd.DataFrame({
+        'player': players,
+        'nationality': nations,
+        'position': [POSITIONS[i] for i in rng.integers(0, len(POSITIONS), n_players)],
+        'team': [f"Team {i}" for i in rng.integers(0, n_teams, n_players)],
+        'age': [f"{a}-{d:03d}" for a, d in zip(rng.integers(17, 38, n_players), rng.integers(0, 365, n_players))],
+        'games': games.astype(str),
+        'games_starts': (games // 2).astype(str),
+        'minutes': [f"{m:,}" for m in minutes],
+    })
+    moved = df[rng.random(n_players) < transfer_rate].copy()
+    moved['team'] = [f"Team {i}" for i in rng.integers(0, n_teams, len(moved))]
+    moved['minutes'] = [f"{m:,}" for m in rng.integers(0, 1700, len(moved))]
+    return pd.concat([df, moved], ignore_index=True)
+
+
+def make_category_tables(n_players, n_teams=20, seed=0, missing_rate=0.05, transfer_rate=0.0):
+    # Các bảng có dạng giống kết quả extract_table_from_html_fbref: mọi giá trị là chuỗi,
+    # có cột 'ranker'/'matches' chung và một số cột trùng giữa các bảng như trên FBref.
+    rng = np.random.default_rng(seed + 1)
+    base = make_player_frame(n_players, n_teams, seed, transfer_rate)
+    tables = {}
+    for category, stats in CATEGORY_STATS.items():
+        if category == "keepers":
+            df = base[base['position'] == 'GK'].reset_index(drop=True)
+        else:
+            df = base
+        df = df.copy()
+        df.insert(0, 'ranker', [str(i + 1) for i in range(len(df))])
+        for stat in dict.fromkeys(stats):
+            values = np.round(rng.random(len(df)) * 100, 1).astype(str)
+            values[rng.random(len(df)) < missing_rate] = ''
+            df[stat] = values
+        df['matches'] = 'Matches'
+        tables[category] = df
+    return tables
+
+
+def make_player_names(n_names, seed=0):
+    # Tên có dấu, có gạch nối và đủ đa dạng để thử bộ ghép tên ở quy mô lớn; mọi tên là duy nhất.
+    rng = np.random.default_rng(seed)
+    names = set()
+    result = []
+    while len(result) < n_names:
+        n_syllables = rng.integers(2, 5, n_names)
+        for count in n_syllables:
+            surname = ''.join(SURNAME_SYLLABLES[i] for i in rng.integers(0, len(SURNAME_SYLLABLES), count)).capitalize()
+            name = f"{NAME_FIRST[rng.integers(0, len(NAME_FIRST))]} {surname}"
+            if name not in names:
+                names.add(name)
+                result.append(name)
+                if len(result) == n_names:
+                    break
+    return result
+
+
+def make_fbref_table_html(df, table_id, filler_kb=200):
+    # Trang có dạng như FBref: bảng nằm trong comment của table_wrapper, có các dòng thead lặp lại
+    # mỗi 25 dòng. df là một bảng của make_category_tables.
+    columns = [col for col in df.columns if col != 'ranker']
+    header = ''.join(f'<th data-stat="{col}">{col}</th>' for col in ['ranker'] + columns)
+    values = {col: df[col].astype(str).map(html.escape).tolist() for col in columns}
+    rows = []
+    for i in range(len(df)):
+        if i and i % 25 == 0:
+            rows.append(f'<tr class="thead">{header}</tr>')
+        cells = [f'<th scope="row" class="right" data-stat="ranker">{i + 1}</th>']
+        for col in columns:
+            value = values[col][i]
+            if col in ('player', 'team', 'matches'):
+                value = f'<a href="/en/{col}/{i:08x}/">{value}</a>'
+            cells.append(f'<td data-stat="{col}">{value}</td>')
+        rows.append(f'<tr>{"".join(cells)}</tr>')
+    table = (f'<table class="min_width sortable stats_table" id="{table_id}"><thead><tr>{header}</tr></thead>'
+             f'<tbody>{"".join(rows)}</tbody></table>')
+    filler = '<div class="filter"><a href="#">link</a><span>text</span></div>\n' * (filler_kb * 1024 // 56)
+    return (f'<html><body>{filler}<div id="all_{table_id}" class="table_wrapper">'
+            f'<div class="placeholder"></div>\n<!--\n{table}\n-->\n</div>{filler}</body></html>')
+
+
+def make_fbref_pages(n_players, seed=0, filler_kb=200):
+    # Một trang cho mỗi bảng trong URL_CONFIG của b1.py (table_id dạng "stats_<category>").
+    tables = make_category_tables(n_players, seed=seed)
+    return {category: make_fbref_table_html(df, f"stats_{category}", filler_kb) for category, df in tables.items()}
+
+
+TRANSFERS_TABLE_CLASS = 'table table-hover no-cursor table-striped leaguetable mvp-table similar-players-table mb-0'
+
+
+def make_transfers_page(players, teams, seed=0):
+    # Trang danh sách của footballtransfers.com với đúng các class mà b4 đọc.
+    rng = np.random.default_rng(seed)
+    skills = np.round(rng.uniform(50, 95, len(players)), 1)
+    values = np.round(rng.uniform(0.5, 150, len(players)), 1)
+    rows = ''.join(
+        f'<tr><td class="td-rank">{i + 1}</td><td><div class="table-skill__skill">{skill}</div>'
+        f'<div class="table-skill__pot">{min(99.0, skill + 5)}</div></td>'
+        f'<td class="td-player"><a href="/en/players/{i}"><span class="d-none">{html.escape(player)}</span></a></td>'
+        f'<td><span class="td-team__teamname">{html.escape(team)}</span></td>'
+        f'<td><span class="player-tag">€{value}M</span></td></tr>'
+        for i, (player, team, skill, value) in enumerate(zip(players, teams, skills, values)))
+    return f'<html><body><table class="{TRANSFERS_TABLE_CLASS}"><tbody>{rows}</tbody></table></body></html>'
+
+
+def make_results_frame(n_players, n_teams=20, seed=0, missing_rate=0.05):
+    # Bảng có các cột của results.csv ở dạng đã chuyển kiểu (như to_typed_frame), sinh trực tiếp
+    # theo COLUMN_SCHEMA nên đủ nhanh cho hàng triệu dòng. Ghi ra CSV bằng to_csv(na_rep="N/a").
+    rng = np.random.default_rng(seed)
+    first = np.array(NAME_FIRST, dtype=object)[rng.integers(0, len(NAME_FIRST), n_players)]
+    data = {
+        'Player': [f"{name} Player{i}" for i, name in enumerate(first)],
+        'Nation': np.array([n.split()[1] for n in NATIONS], dtype=object)[rng.integers(0, len(NATIONS), n_players)],
+        'Squad': np.array([f"Team {i}" for i in range(n_teams)], dtype=object)[rng.integers(0, n_teams, n_players)],
+        'Position': np.array(POSITIONS, dtype=object)[rng.integers(0, len(POSITIONS), n_players)],
+        'Age': rng.integers(17, 38, n_players),
+    }
+    minutes = rng.integers(91, 3420, n_players)
+    for name in OUTPUT_COLUMNS:
+        spec = COLUMN_SCHEMA[name]
+        if name in data:
+            continue
+        if spec.dtype == 'str':
+            data[name] = np.full(n_players, np.nan)
+            continue
+        if name == 'Minutes':
+            data[name] = minutes
+            continue
+        if spec.unit == 'percent':
+            values = np.round(rng.uniform(0, 100, n_players), 1)
+        elif spec.dtype == 'float64':
+            values = np.round(rng.gamma(2.0, 1.5, n_players), 2)
+        else:
+            values = rng.poisson(minutes / 90 * rng.uniform(0.05, 3.0), n_players).astype('float64')
+        values[rng.random(n_players) < missing_rate] = np.nan
+        data[name] = pd.array(values, dtype=spec.dtype) if spec.dtype == 'Int64' else values
+    return pd.DataFrame(data, columns=OUTPUT_COLUMNS)
@@ -0,0 +1,44 @@
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+SOURCE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Các module nằm phẳng trong SourceCode/ và được import theo tên, như khi chạy script từ thư mục đó.
+sys.path.insert(0, SOURCE_DIR)
+
+
+def load_script(filename, module_name):
+    # Script có tên không import được trực tiếp (ví dụ "b4 - y1.py").
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SOURCE_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def child_env():
+    # Tiến trình con không ghi vào file metrics của lần chạy pytest (nếu có).
+    return {key: value for key, value in os.environ.items() if key != "PERF_METRICS"}
+
+
+@pytest.fixture
+def replay_server():
+    # Chạy replay_server.py trên cổng do hệ điều hành chọn; trả về hàm start(cache_dir, origin, *args) -> URL gốc.
+    servers = []
+
+    def start(cache_dir, origin, *args):
+        server = subprocess.Popen([sys.executable, os.path.join(SOURCE_DIR, "replay_server.py"), "--port", "0",
+                                   "--origin", origin, "--cache-dir", str(cache_dir), *map(str, args)],
+                                  stdout=subprocess.PIPE, text=True, encoding="utf-8", env=child_env())
+        servers.append(server)
+        match = re.search(r"http://127\.0\.0\.1:(\d+)", server.stdout.readline())
+        assert match, "replay_server.py không in ra địa chỉ"
+        return f"http://127.0.0.1:{match.group(1)}"
+
+    yield start
+    for server in servers:
+        server.terminate()
+        server.wait()
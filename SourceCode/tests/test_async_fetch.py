@@ -0,0 +1,41 @@
+import re
+import time
+
+import pytest
+
+from page_cache import PageCache
+
+pytest.importorskip("aiohttp")
+
+from async_fetch import fetch_pages  # noqa: E402
+
+ORIGIN = "https://replay.test"
+PATHS = [f"/en/players/player-{i}" for i in range(6)]
+MAX_RPS = 2
+RETRY_AFTER = 1
+
+
+@pytest.fixture
+def replay_url(tmp_path, replay_server):
+    # Ghi vài trang vào PageCache rồi phát lại chúng, trả 429 khi vượt quá MAX_RPS request/giây.
+    cache_dir = tmp_path / "cache"
+    cache = PageCache(str(cache_dir))
+    for path in PATHS:
+        cache.put(ORIGIN + path, f"<html><body><h1>{path}</h1></body></html>")
+    return replay_server(cache_dir, ORIGIN, "--max-rps", MAX_RPS, "--retry-after", RETRY_AFTER)
+
+
+def test_fetch_pages_backs_off_on_429(replay_url, capsys):
+    urls = [replay_url + path for path in PATHS]
+    start = time.monotonic()
+    pages, need_browser = fetch_pages(urls, rate=20, max_rate=40, max_concurrency=len(urls), retries=5)
+    elapsed = time.monotonic() - start
+
+    assert need_browser == []
+    assert pages == {url: f"<html><body><h1>{path}</h1></body></html>" for url, path in zip(urls, PATHS)}
+    throttled = re.findall(r"429 từ .*, chờ ([\d.]+)s", capsys.readouterr().out)
+    # Tốc độ ban đầu vượt --max-rps nên phải có 429, và client chờ đúng Retry-After trước khi thử lại.
+    assert throttled
+    assert all(float(wait) == RETRY_AFTER for wait in throttled)
+    assert elapsed >= RETRY_AFTER
+    assert len(throttled) < len(urls) * 2
@@ -0,0 +1,69 @@
+import argparse
+
+import pytest
+
+from name_matcher import DEFAULT_MIN_SCORE, NameIndex
+from page_cache import PageCache
+from synthetic_data import TRANSFERS_TABLE_CLASS, make_player_names, make_transfers_page
+
+from conftest import load_script
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("bs4")
+
+b4 = load_script("b4 - y1.py", "b4_y1")
+
+ORIGIN = "https://replay.test"
+LISTING = "/en/players/premier-league"
+PAGE_ROWS = 5
+# Trang 3 có bảng nhưng không trích xuất được dòng nào (đổi markup, trang kiểm tra bot);
+# trang 5 ngắn hơn trang đầy đủ nên là trang cuối của danh sách.
+PAGES = {1: PAGE_ROWS, 2: PAGE_ROWS, 3: 0, 4: PAGE_ROWS, 5: 3}
+NAMES = make_player_names(sum(PAGES.values()))
+
+
+def page_players(page):
+    start = sum(PAGES[previous] for previous in PAGES if previous < page)
+    return NAMES[start:start + PAGES[page]]
+
+
+def page_path(page):
+    return LISTING if page == 1 else f"{LISTING}/{page}"
+
+
+@pytest.fixture
+def listing_urls(tmp_path, replay_server):
+    recorded = PageCache(str(tmp_path / "recorded"))
+    for page in PAGES:
+        players = page_players(page)
+        html = make_transfers_page(players, ["Team A"] * len(players), seed=page) if players else \
+            f'<html><body><table class="{TRANSFERS_TABLE_CLASS}"><tbody></tbody></table></body></html>'
+        recorded.put(ORIGIN + page_path(page), html)
+    base_url = replay_server(tmp_path / "recorded", ORIGIN)
+    return [base_url + page_path(page) for page in PAGES]
+
+
+def test_blank_middle_page_does_not_end_listing(tmp_path, listing_urls, capsys):
+    targets = page_players(1)[:1] + page_players(4)[:1] + page_players(5)[-1:]
+    matcher = NameIndex(targets, teams=["Team A"] * len(targets))
+    unmatched = set(range(len(matcher)))
+    args = argparse.Namespace(offline=False, backend="http", rate=50.0, concurrency=1)
+    rows, processed = b4.scrape_pages(listing_urls, PageCache(str(tmp_path / "cache")), args, {"driver": None},
+                                      unmatched, b4.page_match_finder(matcher, DEFAULT_MIN_SCORE))
+
+    assert unmatched == set()
+    assert processed == len(PAGES)
+    assert {row["Player"] for row in rows} == {name for page in PAGES for name in page_players(page)}
+    assert "Không trích xuất được dữ liệu nào" in capsys.readouterr().out
+
+
+def test_short_page_ends_listing(tmp_path, listing_urls):
+    # Cầu thủ không có trên trang nào: dừng ở trang ngắn (trang 5), không cần biết còn trang nào sau đó.
+    matcher = NameIndex(["Nobody Anywhere"], teams=["Team B"])
+    unmatched = {0}
+    args = argparse.Namespace(offline=False, backend="http", rate=50.0, concurrency=1)
+    extra_url = listing_urls[0] + "/6"
+    rows, processed = b4.scrape_pages(listing_urls + [extra_url], PageCache(str(tmp_path / "cache")), args,
+                                      {"driver": None}, unmatched, b4.page_match_finder(matcher, DEFAULT_MIN_SCORE))
+    assert processed == len(PAGES)
+    assert unmatched == {0}
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from changeset import diff_results, is_empty_changeset
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=['Player', 'Squad', 'Minutes'])
+
+
+def test_same_name_on_two_teams():
+    # Hai cầu thủ cùng tên "Danilo": một người rời giải, người còn lại đổi số phút.
+    old = frame([("Danilo", "Nott'ham Forest", "900"), ("Danilo", "Juventus", "1200"), ("Alisson", "Liverpool", "2700")])
+    new = frame([("Danilo", "Nott'ham Forest", "990"), ("Alisson", "Liverpool", "2700")])
+    changeset = diff_results(old, new)
+    assert changeset == {"added": [], "changed": ["Danilo"], "removed": ["Danilo"],
+                         "teams": ["Juventus", "Nott'ham Forest"]}
+
+
+def test_transfer_marks_both_teams():
+    old = frame([("Jadon Sancho", "Manchester Utd", "300")])
+    new = frame([("Jadon Sancho", "Chelsea", "300")])
+    changeset = diff_results(old, new)
+    assert changeset["added"] == ["Jadon Sancho"] and changeset["removed"] == ["Jadon Sancho"]
+    assert changeset["teams"] == ["Chelsea", "Manchester Utd"]
+
+
+def test_unchanged_tables():
+    old = frame([("Danilo", "Nott'ham Forest", "900"), ("Danilo", "Juventus", "1200")])
+    assert is_empty_changeset(diff_results(old, old.iloc[::-1]))
+
+
+def test_duplicate_key_is_rejected():
+    old = frame([("Danilo", "Juventus", "900")])
+    new = frame([("Danilo", "Juventus", "900"), ("Danilo", "Juventus", "1200")])
+    with pytest.raises(ValueError, match="Danilo / Juventus"):
+        diff_results(old, new)
@@ -0,0 +1,112 @@
+import functools
+import threading
+import time
+import urllib.request
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from driver_pool import DriverPool
+
+PAGES = {f"page{i}.html": f"<html><body><table id='stats'><tr><td>{i}</td></tr></table></body></html>"
+         for i in range(8)}
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class StubDriver:
+    # Thay cho Chrome: get() tải trang bằng urllib, page_source trả lại HTML vừa tải.
+    def __init__(self):
+        self.page_source = ""
+        self.quit_calls = 0
+
+    def get(self, url):
+        with urllib.request.urlopen(url, timeout=10) as response:
+            self.page_source = response.read().decode("utf-8")
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+class StubFactory:
+    # delay: thời gian khởi tạo giả lập, để các luồng khác kịp giữ chỗ trong pool trong lúc một lần tạo đang chạy.
+    def __init__(self, fail_on=(), delay=0.0):
+        self.fail_on = set(fail_on)
+        self.delay = delay
+        self.calls = 0
+        self.created = []
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        time.sleep(self.delay if call not in self.fail_on else self.delay / 2)
+        if call in self.fail_on:
+            raise RuntimeError(f"không khởi tạo được driver (lần {call})")
+        driver = StubDriver()
+        with self._lock:
+            self.created.append(driver)
+        return driver
+
+
+@pytest.fixture
+def site(tmp_path):
+    for name, html in PAGES.items():
+        (tmp_path / name).write_text(html, encoding="utf-8")
+    handler = functools.partial(QuietHandler, directory=str(tmp_path))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def fetch_page(driver, key, url):
+    driver.get(url)
+    return driver.page_source
+
+
+def run_pool(factory, base_url, max_workers=3):
+    tasks = {name: f"{base_url}/{name}" for name in PAGES}
+    with DriverPool(factory, max_workers=max_workers, per_host_delay=0) as pool:
+        return dict(pool.fetch_all(tasks, fetch_page))
+
+
+def test_fetch_all_reuses_bounded_drivers(site):
+    factory = StubFactory()
+    results = run_pool(factory, site)
+    assert results == PAGES
+    assert 1 <= len(factory.created) <= 3
+    assert all(driver.quit_calls == 1 for driver in factory.created)
+
+
+def test_failed_factory_keeps_other_slots(site):
+    # Lần tạo driver đầu tiên lỗi trong khi hai lần tạo khác đang chạy: chỉ trang đó mất,
+    # các driver còn lại vẫn được dùng và đều được đóng.
+    factory = StubFactory(fail_on={1}, delay=0.2)
+    results = run_pool(factory, site)
+    assert sum(html is None for html in results.values()) == 1
+    assert {key: html for key, html in results.items() if html is not None} == \
+        {key: PAGES[key] for key, html in results.items() if html is not None}
+    assert factory.created
+    assert all(driver.quit_calls == 1 for driver in factory.created)
+
+
+def test_failing_factory_does_not_block(site):
+    # Chỉ một chỗ và lần tạo đầu lỗi: các tác vụ đang chờ phải tự tạo lại driver thay vì chờ mãi.
+    factory = StubFactory(fail_on={1})
+    results = run_pool(factory, site, max_workers=1)
+    assert sum(html is None for html in results.values()) == 1
+    assert len(factory.created) == 1 and factory.created[0].quit_calls == 1
+
+
+def test_always_failing_factory(site):
+    factory = StubFactory(fail_on=range(1, 100))
+    results = run_pool(factory, site, max_workers=2)
+    assert set(results) == set(PAGES)
+    assert all(html is None for html in results.values())
@@ -0,0 +1,82 @@
+import sys
+
+import pytest
+
+from conftest import load_script
+from name_matcher import NameIndex, fold_name
+
+NAMES = ["Martin Ødegaard", "Vinícius Júnior", "Heung-min Son", "Bruno Fernandes", "Bruno Guimarães",
+         "Danilo", "Danilo", "Rodrigo Moreno", "Rodrigo Moreira"]
+TEAMS = ["Arsenal", "Real Madrid", "Tottenham", "Manchester Utd", "Newcastle",
+         "Nott'ham Forest", "Juventus", "Leeds United", "Boca Juniors"]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return NameIndex(NAMES, TEAMS)
+
+
+def best_name(index, name, team=None):
+    matches = index.match(name, team)
+    return matches[0][1] if matches else None
+
+
+def test_fold_name():
+    assert fold_name("Martin Ødegaard") == "martin odegaard"
+    assert fold_name("Łukasz Fabiański") == "lukasz fabianski"
+    assert fold_name("Heung-min Son") == "heung min son"
+    assert fold_name(float("nan")) == ""
+
+
+def test_accents(index):
+    assert best_name(index, "Martin Odegaard") == "Martin Ødegaard"
+    assert best_name(index, "Vinicius Junior") == "Vinícius Júnior"
+
+
+def test_swapped_order(index):
+    assert index.match("Son Heung-min") == [(2, "Heung-min Son", 1.0, False)]
+
+
+def test_abbreviated_first_name(index):
+    assert best_name(index, "B. Fernandes") == "Bruno Fernandes"
+    assert best_name(index, "B. Guimaraes") == "Bruno Guimarães"
+
+
+def test_team_breaks_tie(index):
+    # Hai "Danilo" cùng điểm tên: không có đội thì mơ hồ, có đội thì chọn đúng người.
+    rows = index.match_many(["Danilo", "Danilo", "Danilo"], [None, "Juventus", "Nott'ham Forest"])
+    assert rows['match_index'].tolist() == [5, 6, 5]
+    assert rows['ambiguous'].tolist() == [True, False, False]
+    # Điểm tên gần bằng nhau (chênh dưới TEAM_BONUS): ứng viên cùng đội thắng.
+    assert best_name(index, "Rodrigo Morena") == "Rodrigo Moreno"
+    assert best_name(index, "Rodrigo Morena", "Boca Juniors") == "Rodrigo Moreira"
+
+
+def test_max_candidates_cutoff():
+    names = [f"Player {i:03d}" for i in range(100)]
+    index = NameIndex(names, max_candidates=5)
+    candidates = index.candidates(fold_name("Player 042x"))
+    assert len(candidates) == 5 and 42 in candidates.tolist()
+    assert best_name(index, "Player 042x") == "Player 042"
+
+
+def test_no_match(index):
+    assert index.match("Zlatan Ibrahimović") == []
+    row = index.match_many(["Zlatan Ibrahimović"]).iloc[0]
+    assert row['match_index'] == -1 and row['match'] is None
+    assert index.match("") == []
+
+
+def test_difflib_fallback(monkeypatch):
+    # Không có rapidfuzz: _ratio dùng difflib.SequenceMatcher và kết quả ghép tên vẫn như trên.
+    monkeypatch.setitem(sys.modules, "rapidfuzz", None)
+    monkeypatch.setitem(sys.modules, "rapidfuzz.fuzz", None)
+    matcher = load_script("name_matcher.py", "name_matcher_difflib")
+    assert matcher._rapidfuzz_ratio is None
+    assert matcher._ratio("moreno", "morena") == pytest.approx(5 / 6)
+    index = matcher.NameIndex(NAMES, TEAMS)
+    assert best_name(index, "Martin Odegaard") == "Martin Ødegaard"
+    assert best_name(index, "Son Heung-min") == "Heung-min Son"
+    assert best_name(index, "B. Fernandes") == "Bruno Fernandes"
+    assert best_name(index, "Rodrigo Morena", "Boca Juniors") == "Rodrigo Moreira"
+    assert index.match("Zlatan Ibrahimović") == []
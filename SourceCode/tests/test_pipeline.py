@@ -0,0 +1,73 @@
+import pytest
+
+import pipeline
+
+# Các bước giả: a đọc seed.txt, b và c đọc đầu ra của a. a và b import module dùng chung shared.py, c thì không.
+# b ghi đầu ra rồi mới thoát với mã lỗi khi có file fail_b, để kiểm tra bước lỗi không được ghi nhận là thành công.
+STUB_SCRIPTS = {
+    "shared.py": "def transform(text):\n    return text.upper()\n",
+    "a.py": "import shared\n\nwith open('seed.txt') as f:\n    text = f.read()\n"
+            "with open('a.out', 'w') as f:\n    f.write(shared.transform(text))\n",
+    "b.py": "import os\nimport sys\n\nfrom shared import transform\n\nwith open('a.out') as f:\n    text = f.read()\n"
+            "with open('b.out', 'w') as f:\n    f.write(transform(text) + '!')\n"
+            "sys.exit(1 if os.path.exists('fail_b') else 0)\n",
+    "c.py": "with open('a.out') as f:\n    text = f.read()\nwith open('c.out', 'w') as f:\n    f.write(text[::-1])\n",
+}
+STUB_STAGES = {
+    "a": {"script": "a.py", "deps": [], "inputs": ["seed.txt"], "outputs": ["a.out"]},
+    "b": {"script": "b.py", "deps": ["a"], "inputs": ["a.out"], "outputs": ["b.out"]},
+    "c": {"script": "c.py", "deps": ["a"], "inputs": ["a.out"], "outputs": ["c.out"]},
+}
+
+
+@pytest.fixture
+def stub_pipeline(tmp_path, monkeypatch):
+    for name, source in STUB_SCRIPTS.items():
+        (tmp_path / name).write_text(source, encoding="utf-8")
+    (tmp_path / "seed.txt").write_text("danilo", encoding="utf-8")
+    monkeypatch.setattr(pipeline, "SOURCE_DIR", str(tmp_path))
+    monkeypatch.setattr(pipeline, "STAGES", STUB_STAGES)
+    monkeypatch.delenv("PERF_METRICS", raising=False)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def statuses(manifest):
+    return {stage: entry["status"] for stage, entry in manifest["stages"].items()}
+
+
+def test_second_run_skips_every_stage(stub_pipeline):
+    assert statuses(pipeline.run_pipeline()) == {"a": "ran", "b": "ran", "c": "ran"}
+    assert (stub_pipeline / "b.out").read_text() == "DANILO!"
+    assert statuses(pipeline.run_pipeline()) == {"a": "skipped", "b": "skipped", "c": "skipped"}
+    assert statuses(pipeline.run_pipeline(force=True)) == {"a": "ran", "b": "ran", "c": "ran"}
+
+
+def test_helper_edit_reruns_importing_stages(stub_pipeline):
+    pipeline.run_pipeline()
+    with open(stub_pipeline / "shared.py", "a", encoding="utf-8") as f:
+        f.write("# sửa module dùng chung\n")
+    # a.out không đổi nên c (không import shared) vẫn được bỏ qua.
+    assert statuses(pipeline.run_pipeline()) == {"a": "ran", "b": "ran", "c": "skipped"}
+
+
+def test_failed_stage_is_not_recorded(stub_pipeline):
+    pipeline.run_pipeline()
+    (stub_pipeline / "seed.txt").write_text("alisson", encoding="utf-8")
+    (stub_pipeline / "fail_b").touch()
+    manifest = pipeline.run_pipeline()
+    assert statuses(manifest) == {"a": "ran", "b": "failed", "c": "ran"}
+    assert manifest["stages"]["b"]["returncode"] == 1
+    assert "b" not in pipeline._load_json(pipeline.STATE_FILE)
+    # b.out đã được ghi, đầu vào và mã nguồn không đổi, nhưng lần lỗi không được coi là thành công.
+    assert statuses(pipeline.run_pipeline()) == {"a": "skipped", "b": "failed", "c": "skipped"}
+    (stub_pipeline / "fail_b").unlink()
+    assert statuses(pipeline.run_pipeline()) == {"a": "skipped", "b": "ran", "c": "skipped"}
+    assert statuses(pipeline.run_pipeline()) == {"a": "skipped", "b": "skipped", "c": "skipped"}
+
+
+def test_failed_dependency_blocks_dependents(stub_pipeline):
+    (stub_pipeline / "seed.txt").unlink()
+    manifest = pipeline.run_pipeline()
+    assert statuses(manifest) == {"a": "failed", "b": "blocked", "c": "blocked"}
+    assert manifest["stages"]["a"]["missing_outputs"] == ["a.out"]
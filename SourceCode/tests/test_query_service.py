@@ -0,0 +1,57 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import urllib.request
+from urllib.parse import quote
+
+import pytest
+
+from conftest import SOURCE_DIR, child_env
+from synthetic_data import make_results_frame
+
+
+def write_results(df, path):
+    df.to_csv(path, index=False, na_rep="N/a", encoding="utf-8-sig")
+
+
+@pytest.fixture
+def service(tmp_path):
+    # query_service.py trên cổng do hệ điều hành chọn, đọc results.csv trong tmp_path.
+    df = make_results_frame(40, seed=3)
+    write_results(df, tmp_path / "results.csv")
+    server = subprocess.Popen([sys.executable, os.path.join(SOURCE_DIR, "query_service.py"), "--port", "0"],
+                              cwd=tmp_path, stdout=subprocess.PIPE, text=True, encoding="utf-8", env=child_env())
+    try:
+        lines = [server.stdout.readline(), server.stdout.readline()]
+        match = re.search(r"http://127\.0\.0\.1:(\d+)", lines[1])
+        assert match, f"query_service.py không in ra địa chỉ: {lines}"
+        yield f"http://127.0.0.1:{match.group(1)}", df, tmp_path
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def get(url):
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return response.headers["X-Cache"], json.loads(response.read().decode("utf-8"))
+
+
+def test_cache_hit_and_reload_after_rewrite(service):
+    base_url, df, workdir = service
+    player = df['Player'].iloc[0]
+    url = f"{base_url}/player?name={quote(player)}"
+
+    cache_state, body = get(url)
+    assert cache_state == "MISS"
+    assert body["rows"][0]["Minutes"] == df['Minutes'].iloc[0]
+    assert get(url) == ("HIT", body)
+
+    # Số phút có nhiều chữ số hơn mọi giá trị cũ nên kích thước file chắc chắn đổi.
+    df.loc[0, 'Minutes'] = 123456
+    write_results(df, workdir / "results.csv")
+    cache_state, body = get(url)
+    assert cache_state == "MISS"
+    assert body["rows"][0]["Minutes"] == 123456
+    assert get(f"{base_url}/status")[1]["generation"] == 2
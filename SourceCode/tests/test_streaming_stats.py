@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stage_args import DEFAULT_RELATIVE_ACCURACY
+from streaming_stats import GroupStatistics
+
+STAT_COLS = ["Goals", "Minutes", "Delta"]
+
+
+@pytest.fixture(scope="module")
+def frame():
+    # Có NaN, số 0 và số âm để đi qua mọi loại ô của sketch; số dòng mỗi đội không đều nhau.
+    rng = np.random.default_rng(7)
+    n = 3001
+    df = pd.DataFrame({
+        "Squad": rng.choice(["Arsenal", "Chelsea", "Everton"], n, p=[0.5, 0.3, 0.2]),
+        "Goals": rng.poisson(3, n).astype("float64"),
+        "Minutes": np.round(rng.uniform(90, 3420, n), 1),
+        "Delta": rng.normal(0.5, 4.0, n),
+    })
+    for col in STAT_COLS:
+        df.loc[rng.random(n) < 0.1, col] = np.nan
+    return df
+
+
+def merged_state(df, tmp_path, exact_limit):
+    # Hai nửa được tính riêng, lưu ra file, nạp lại và gộp, như khi chạy trên hai máy.
+    paths = []
+    for i, part in enumerate((df.iloc[:1200], df.iloc[1200:])):
+        state = GroupStatistics(STAT_COLS, exact_limit=exact_limit)
+        state.update(part, part["Squad"])
+        paths.append(tmp_path / f"part{i}.pkl")
+        state.save(paths[-1])
+    return GroupStatistics.load(paths[0]).merge(GroupStatistics.load(paths[1]))
+
+
+def group_states(state, df):
+    return {"all": (state.overall, df), **{team: (state.groups[(team, None)], part) for team, part in df.groupby("Squad")}}
+
+
+@pytest.mark.parametrize("exact_limit", [10 ** 6, 0])
+def test_merged_state_matches_pandas(frame, tmp_path, exact_limit):
+    state = merged_state(frame, tmp_path, exact_limit)
+    assert state.n_rows == len(frame)
+    assert sorted(state.groups) == [("Arsenal", None), ("Chelsea", None), ("Everton", None)]
+    for name, ((moments, sketches), part) in group_states(state, frame).items():
+        values = part[STAT_COLS]
+        np.testing.assert_array_equal(moments.count, values.notna().sum().to_numpy())
+        np.testing.assert_allclose(moments.mean, values.mean().to_numpy(), rtol=1e-12)
+        np.testing.assert_allclose(np.sqrt(moments.m2 / (moments.count - 1)), values.std().to_numpy(), rtol=1e-12)
+        for col, sketch in zip(STAT_COLS, sketches):
+            column = np.sort(values[col].dropna().to_numpy())
+            median = sketch.median()
+            if exact_limit:
+                assert sketch.exact and median == np.median(column), (name, col)
+            else:
+                # Cận sai số ghi ở đầu streaming_stats.py, tính từ hai giá trị giữa thật.
+                lo, hi = column[(len(column) - 1) // 2], column[len(column) // 2]
+                bound = DEFAULT_RELATIVE_ACCURACY * (abs(lo) + abs(hi)) / 2
+                assert not sketch.exact and abs(median - np.median(column)) <= bound + 1e-12, (name, col)
+
+
+def test_to_frame_rows(frame, tmp_path):
+    result = merged_state(frame, tmp_path, 0).to_frame()
+    # Thứ tự nhóm như groupby(sort=False) của b2.py: theo lần xuất hiện đầu tiên.
+    assert result["Group"].tolist() == ["all"] + frame["Squad"].unique().tolist()
+    assert list(result.columns[1:4]) == ["Median of Goals", "Mean of Goals", "Std of Goals"]
+    assert result.loc[0, "Mean of Minutes"] == round(frame["Minutes"].mean(), 2)